@@ -0,0 +1,83 @@
+import functools
+import os
+import threading
+import time
+from flask import jsonify
+import metrics
+
+# Compute-heavy routes (lineup generation) share a small pool of execution
+# slots with a bounded wait queue, so they can't take every worker thread away
+# from the cheap cached reads. Routes without the decorator are never queued.
+HEAVY_MAX_CONCURRENT = int(os.environ.get("HEAVY_MAX_CONCURRENT", "2"))
+HEAVY_MAX_QUEUE = int(os.environ.get("HEAVY_MAX_QUEUE", "8"))
+HEAVY_QUEUE_TIMEOUT = float(os.environ.get("HEAVY_QUEUE_TIMEOUT", "10"))
+RETRY_AFTER_SECONDS = int(os.environ.get("HEAVY_RETRY_AFTER", "2"))
+
+metrics.describe("admission_queue_depth", "Requests waiting for a heavy-route slot.")
+metrics.describe("admission_in_flight", "Requests currently holding a heavy-route slot.")
+metrics.describe("admission_wait_seconds", "Time spent waiting for a heavy-route slot.")
+metrics.describe("admission_rejected_total", "Heavy-route requests rejected with 429.")
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout):
+        self.name = name
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+
+    def _publish(self):
+        metrics.set_gauge("admission_queue_depth", self._waiting, pool=self.name)
+        metrics.set_gauge("admission_in_flight", self._running, pool=self.name)
+
+    def acquire(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    metrics.inc("admission_rejected_total", pool=self.name, reason="queue_full")
+                    return False
+                self._waiting += 1
+                self._publish()
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+            with self._lock:
+                self._waiting -= 1
+                self._publish()
+            if not acquired:
+                metrics.inc("admission_rejected_total", pool=self.name, reason="timeout")
+                return False
+
+        metrics.observe("admission_wait_seconds", time.perf_counter() - start, pool=self.name)
+        with self._lock:
+            self._running += 1
+            self._publish()
+        return True
+
+    def release(self):
+        with self._lock:
+            self._running -= 1
+            self._publish()
+        self._slots.release()
+
+
+heavy_limiter = ConcurrencyLimiter("heavy", HEAVY_MAX_CONCURRENT, HEAVY_MAX_QUEUE, HEAVY_QUEUE_TIMEOUT)
+
+
+def limit_concurrency(limiter=heavy_limiter):
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if not limiter.acquire():
+                resp = jsonify({"error": "Server busy, please retry shortly."})
+                resp.status_code = 429
+                resp.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+                return resp
+            try:
+                return f(*args, **kwargs)
+            finally:
+                limiter.release()
+        return wrapper
+    return decorator
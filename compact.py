@@ -0,0 +1,80 @@
+import datetime
+import numpy as np
+import pandas as pd
+
+# Game-log dates are stored as int32 days since 1970-01-01; missing dates use
+# the smallest int32 so they still sort last in a descending sort.
+MISSING_DAY = np.iinfo(np.int32).min
+EPOCH = datetime.date(1970, 1, 1)
+
+# Object columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_DISTINCT_RATIO = 0.5
+
+
+def day_dates(days):
+    # datetime.date for day numbers, None where missing
+    days = np.asarray(days)
+    out = (np.datetime64(EPOCH, "D") + days.astype("timedelta64[D]")).astype(object)
+    out[days == MISSING_DAY] = None
+    return out
+
+
+def day_strings(days):
+    # YYYY-MM-DD for day numbers, None where missing
+    days = np.asarray(days)
+    out = (np.datetime64(EPOCH, "D") + days.astype("timedelta64[D]")).astype(str).astype(object)
+    out[days == MISSING_DAY] = None
+    return out
+
+
+def to_day_numbers(values):
+    days = pd.to_datetime(values).values.astype("datetime64[D]").astype(np.int64)
+    days[pd.isna(values)] = MISSING_DAY
+    return days.astype(np.int32)
+
+
+def day_to_date(day):
+    if day is None or pd.isna(day) or int(day) == MISSING_DAY:
+        return None
+    return EPOCH + datetime.timedelta(days=int(day))
+
+
+def lower_keys(series):
+    # Lowercased values for case-insensitive grouping. For categoricals only
+    # the categories are lowercased; missing values stay missing.
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        lowered = series.cat.categories.astype(str).str.lower().to_numpy(object)
+        codes = series.cat.codes.to_numpy()
+        keys = np.full(len(series), np.nan, dtype=object)
+        keys[codes >= 0] = lowered[codes[codes >= 0]]
+        return keys
+    return series.str.lower().to_numpy(object)
+
+
+def _is_string_column(col):
+    values = col.dropna()
+    return len(values) > 0 and values.map(type).eq(str).all()
+
+
+def compact_frame(df, date_columns=()):
+    # Categoricals for repetitive strings; integers downcast to the smallest
+    # type that holds them; floats only go to float32 when every value
+    # round-trips exactly, so the API output is unchanged.
+    for col in df.columns:
+        series = df[col]
+        if col in date_columns:
+            df[col] = to_day_numbers(series)
+        elif series.dtype == object:
+            if _is_string_column(series) and series.nunique() <= CATEGORY_MAX_DISTINCT_RATIO * len(series):
+                df[col] = series.astype("category")
+        elif pd.api.types.is_integer_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            df[col] = pd.to_numeric(series, downcast="integer")
+        elif series.dtype == np.float64:
+            narrowed = series.astype(np.float32)
+            if np.array_equal(narrowed.to_numpy(np.float64), series.to_numpy(), equal_nan=True):
+                df[col] = narrowed
+    return df
+
+
+def deep_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
@@ -0,0 +1,385 @@
+import datetime
+import gc
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+import pandas as pd
+import metrics
+import xlsx_reader
+from compact import compact_frame, deep_bytes
+
+logger = logging.getLogger(__name__)
+
+NBA_FILE_PATH = "output/NBA_PropAnalysis_Output.xlsx"
+MLB_FILE_PATH = "output/MLB_PropAnalysis_Output.xlsx"
+
+# Sheets the API reads from each workbook
+WORKBOOKS = {
+    "NBA": {
+        "path": NBA_FILE_PATH,
+        "sheets": ["All_Picks", "Last10_GameLogs", "Last10vsOpp_GameLogs"],
+        # Read when the workbook has them; older slates don't
+        "optional": ["Spreads", "League Averages"],
+    },
+    "MLB": {
+        "path": MLB_FILE_PATH,
+        "sheets": ["All_Picks", "Last 10 Batters", "Last 10 Pitchers"],
+    },
+}
+
+# "fast" streams the sheets with xlsx_reader; "openpyxl" uses pd.read_excel
+XLSX_READER = os.environ.get("XLSX_READER", "fast")
+
+# Earlier and later slates sit next to the current workbooks, one directory
+# per date: output/slates/2025-06-24/MLB_PropAnalysis_Output.xlsx. The
+# undated files above are the current slate, which is always kept loaded;
+# dated slates are loaded on demand (?date=) and the least recently used
+# ones are dropped once everything loaded exceeds the memory budget.
+SLATE_DIR = os.environ.get("SLATE_DIR", "output/slates")
+SLATE_MEMORY_BUDGET = int(float(os.environ.get("SLATE_MEMORY_BUDGET_MB", "512")) * 1024 * 1024)
+
+# Approximate Python object overhead of a small DataFrame
+FRAME_OVERHEAD_BYTES = 1024
+COLUMN_OVERHEAD_BYTES = 200
+
+# (sport, slate) -> snapshot, least recently used first; slate None is current
+_snapshots = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+# key -> in-progress load shared by every concurrent caller
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+metrics.describe("dataset_loads_total", "Workbook parses performed.")
+metrics.describe("dataset_sheets_reused_total", "Sheets kept from the previous snapshot on reload because their XML was unchanged.")
+metrics.describe("slate_evictions_total", "Dated slates dropped from memory to stay under the slate memory budget.")
+metrics.describe("dataset_loads_coalesced_total", "Requests that waited on another request's in-progress parse instead of parsing themselves.")
+
+# Per-request switch used by the profiler to measure the cold path. A
+# gthread worker runs several requests at once, so it's per context rather
+# than a module flag.
+_uncached = ContextVar("data_store_uncached", default=False)
+
+# Set by preload_all(): the gunicorn master owns reloads, so forked workers
+# keep serving the shared snapshot instead of re-parsing it themselves.
+_frozen = False
+
+
+class SlateNotFound(LookupError):
+    pass
+
+
+def parse_slate(value):
+    # ?date= value -> slate key; empty means the current slate. Raises
+    # ValueError for anything that isn't a YYYY-MM-DD date.
+    if not value:
+        return None
+    return datetime.date.fromisoformat(value).isoformat()
+
+
+def workbook_path(sport, slate=None):
+    path = WORKBOOKS[sport]["path"]
+    if slate is None:
+        return path
+    return os.path.join(SLATE_DIR, slate, os.path.basename(path))
+
+
+def workbook_version(sport, slate=None):
+    st = os.stat(workbook_path(sport, slate))
+    return f"{st.st_mtime_ns}-{st.st_size}"
+
+
+def available_slates(sport):
+    if not os.path.isdir(SLATE_DIR):
+        return []
+    name = os.path.basename(WORKBOOKS[sport]["path"])
+    return sorted(
+        (d for d in os.listdir(SLATE_DIR) if os.path.isfile(os.path.join(SLATE_DIR, d, name))),
+        reverse=True,
+    )
+
+
+def _prepare_sheet(sport, sheet, df):
+    date_columns = ()
+    if sport == "NBA" and sheet in ("Last10_GameLogs", "Last10vsOpp_GameLogs"):
+        df["Player"] = df["Player"].astype(str).str.strip()
+        date_columns = ("Date",)
+    elif sport == "MLB" and sheet != "All_Picks":
+        df.columns = df.columns.str.strip().str.lower()
+        date_columns = ("date",)
+    return compact_frame(df, date_columns=date_columns)
+
+
+def _read_sheets(path, sheets, known=None, optional=()):
+    # Returns (frames, checksums); frames only holds the sheets that changed
+    # since `known`. The read_excel path has no checksums and reads everything.
+    # Optional sheets the workbook doesn't have are left out of both.
+    if XLSX_READER != "openpyxl":
+        try:
+            return xlsx_reader.read_sheets(path, sheets, known=known, optional=optional)
+        except Exception as e:
+            logger.warning("⚠️ Fast xlsx reader failed on %s (%s), falling back to read_excel", path, e)
+    with pd.ExcelFile(path) as book:
+        return {
+            sheet: book.parse(sheet) for sheet in sheets
+            if sheet in book.sheet_names or sheet not in optional
+        }, {}
+
+
+def load_snapshot(sport, version=None, previous=None, slate=None):
+    # With a previous snapshot of the same workbook, sheets whose XML is
+    # unchanged keep their parsed frame, and derived values that only depend
+    # on unchanged sheets are carried over instead of being rebuilt.
+    sport = sport.upper()
+    book = WORKBOOKS[sport]
+    if version is None:
+        version = workbook_version(sport, slate)
+    known = previous["checksums"] if previous is not None else None
+    sheets = {}
+    compaction = {}
+    reused = set()
+    with metrics.stage("workbook_load"):
+        optional = book.get("optional", [])
+        parsed, checksums = _read_sheets(workbook_path(sport, slate), book["sheets"] + optional, known, optional)
+        for sheet in book["sheets"] + optional:
+            if sheet not in parsed and sheet not in checksums:
+                continue
+            if sheet not in parsed:
+                sheets[sheet] = previous["sheets"][sheet]
+                compaction[sheet] = previous["compaction"][sheet]
+                reused.add(sheet)
+                continue
+            df = parsed[sheet]
+            before = deep_bytes(df)
+            sheets[sheet] = _prepare_sheet(sport, sheet, df)
+            after = deep_bytes(sheets[sheet])
+            compaction[sheet] = {"raw_bytes": before, "compact_bytes": after}
+            change = round(100 * (after - before) / before) if before else 0
+            trend = "📈 " if change > 0 else "📉 " if change < 0 else ""
+            logger.info(
+                "%s%s/%s: %.2f MB -> %.2f MB (%s%%)",
+                trend, sport, sheet, before / 1e6, after / 1e6, f"{change:+d}" if change else "0",
+            )
+
+    derived_values = {}
+    derived_depends = {}
+    if reused:
+        # An optional sheet appearing or going away invalidates everything,
+        # whatever the sheets a value read say
+        present = frozenset(sheets)
+        for name, depends in previous["derived_depends"].items():
+            if name in previous["derived"] and depends[1] == present and reused.issuperset(depends[0]):
+                derived_values[name] = previous["derived"][name]
+                derived_depends[name] = depends
+        metrics.inc("dataset_sheets_reused_total", len(reused), sport=sport)
+        logger.info(
+            "♻️ %s: reused %d unchanged sheet(s) and %d derived value(s)",
+            sport, len(reused), len(derived_values),
+        )
+    metrics.inc("dataset_loads_total", sport=sport)
+    logger.info("✅ %s workbook parsed (slate %s, version %s)", sport, slate or "current", version)
+    return {
+        "sport": sport,
+        "slate": slate,
+        "version": version,
+        "sheets": sheets,
+        "checksums": checksums,
+        "derived": derived_values,
+        "derived_depends": derived_depends,
+        "compaction": compaction,
+    }
+
+
+def _single_flight(key, fn):
+    # The first caller for a key runs fn(); callers that arrive while it is
+    # running wait for it and share its result. Returns (result, was_shared).
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = {"done": threading.Event(), "result": None, "error": None}
+            _inflight[key] = call
+
+    if not leader:
+        call["done"].wait()
+        if call["error"] is not None:
+            raise call["error"]
+        return call["result"], True
+
+    try:
+        call["result"] = fn()
+        return call["result"], False
+    except Exception as e:
+        call["error"] = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        call["done"].set()
+
+
+def _frame_bytes(df):
+    # Frames inside indexes share their categories and strings with the sheet
+    # they came from, so only codes/values plus per-column object overhead
+    # (measured with tracemalloc) are counted.
+    total = df.index.nbytes + FRAME_OVERHEAD_BYTES
+    for _, col in df.items():
+        values = col.array
+        total += values.codes.nbytes if isinstance(col.dtype, pd.CategoricalDtype) else values.nbytes
+    return total + COLUMN_OVERHEAD_BYTES * df.shape[1]
+
+
+def _estimate_bytes(value):
+    # Rough footprint of a derived value, for the slate memory budget
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, pd.DataFrame):
+        return _frame_bytes(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_estimate_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def snapshot_bytes(snap):
+    # Compacted sheets plus derived values; sizes of derived values are
+    # cached since they never change once built
+    sizes = snap.setdefault("derived_bytes", {})
+    for name, value in list(snap["derived"].items()):
+        if name not in sizes:
+            sizes[name] = _estimate_bytes(value)
+    return sum(c["compact_bytes"] for c in snap["compaction"].values()) + sum(sizes.values())
+
+
+def _touch(key):
+    with _snapshots_lock:
+        if key in _snapshots:
+            _snapshots.move_to_end(key)
+
+
+def _evict(keep):
+    # Drops least recently used dated slates until everything loaded fits the
+    # budget. Current slates are pinned, and the slate just requested stays
+    # even if it alone is over budget.
+    with _snapshots_lock:
+        total = sum(snapshot_bytes(snap) for snap in _snapshots.values())
+        for key in list(_snapshots):
+            if total <= SLATE_MEMORY_BUDGET:
+                break
+            if key[1] is None or key == keep:
+                continue
+            size = snapshot_bytes(_snapshots.pop(key))
+            total -= size
+            metrics.inc("slate_evictions_total", sport=key[0])
+            logger.info("🗑️ Evicted %s slate %s (%.1f MB)", key[0], key[1], size / 1e6)
+
+
+def _load_and_publish(sport, version, slate=None):
+    key = (sport, slate)
+
+    def load():
+        snap = load_snapshot(sport, version, previous=_snapshots.get(key), slate=slate)
+        with _snapshots_lock:
+            _snapshots[key] = snap
+            _snapshots.move_to_end(key)
+        _evict(keep=key)
+        return snap
+
+    snap, shared = _single_flight(("snapshot", sport, slate, version), load)
+    if shared:
+        metrics.inc("dataset_loads_coalesced_total", sport=sport)
+    return snap
+
+
+@contextmanager
+def uncached(enabled=True):
+    # Within this block the current request re-parses workbooks and rebuilds
+    # derived values without reading or replacing the shared caches.
+    token = _uncached.set(enabled)
+    try:
+        yield
+    finally:
+        _uncached.reset(token)
+
+
+def get_snapshot(sport, slate=None):
+    sport = sport.upper()
+    if slate is not None and not os.path.isfile(workbook_path(sport, slate)):
+        raise SlateNotFound(f"No {sport} slate for {slate}")
+    if _uncached.get():
+        return load_snapshot(sport, slate=slate)
+    key = (sport, slate)
+    snap = _snapshots.get(key)
+    if snap is not None and _frozen and slate is None:
+        return snap
+
+    version = workbook_version(sport, slate)
+    if snap is not None and snap["version"] == version:
+        _touch(key)
+        return snap
+    return _load_and_publish(sport, version, slate)
+
+
+def derived(snap, name, build, depends=None):
+    # Per-snapshot cache for anything computed from the parsed sheets (API
+    # payloads, indexes). Entries are dropped together with their snapshot,
+    # unless they list the sheets they read in depends: those are carried
+    # over to the next snapshot when none of those sheets changed and it has
+    # the same set of sheets.
+    if _uncached.get():
+        return build(snap)
+    cache = snap["derived"]
+    if name in cache:
+        return cache[name]
+
+    def compute():
+        value = build(snap)
+        if depends is not None:
+            snap["derived_depends"][name] = (frozenset(depends), frozenset(snap["sheets"]))
+        cache[name] = value
+        return value
+
+    value, _ = _single_flight(("derived", snap["sport"], snap["slate"], snap["version"], name), compute)
+    return value
+
+
+def loaded_snapshots():
+    with _snapshots_lock:
+        return list(_snapshots.values())
+
+
+def changed_sports():
+    # Only the current slates are watched; dated slates are re-checked on access
+    changed = []
+    for sport in WORKBOOKS:
+        snap = _snapshots.get((sport, None))
+        if snap is None or snap["version"] != workbook_version(sport):
+            changed.append(sport)
+    return changed
+
+
+# =========================
+# 🧊 PRELOAD (gunicorn master)
+# =========================
+def preload_all(warm=None):
+    # Parse every workbook once in the master process before workers fork.
+    # gc.freeze() moves the parsed objects into the permanent generation so the
+    # workers' garbage collector never writes to those pages, keeping them
+    # shared copy-on-write instead of being duplicated into every worker.
+    global _frozen
+    gc.unfreeze()
+    for sport in WORKBOOKS:
+        version = workbook_version(sport)
+        snap = _snapshots.get((sport, None))
+        if snap is None or snap["version"] != version:
+            _load_and_publish(sport, version)
+    if warm is not None:
+        warm()
+    gc.collect()
+    gc.freeze()
+    _frozen = True
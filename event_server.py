@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import os
+import resource
+from urllib.parse import parse_qs, urlsplit
+
+import events
+
+logger = logging.getLogger(__name__)
+
+# /events for gunicorn deployments: `python event_server.py` (gunicorn.conf.py
+# starts it next to the workers) tails the events file in one asyncio loop.
+# An open stream is a coroutine waiting on a condition, a socket and a few
+# KB, so idle clients don't take worker threads and streams aren't cut
+# short. Route /events to SSE_BIND at the proxy, or set SSE_URL for the
+# app's /events to redirect there (CORS is open, as on the app).
+BIND = os.environ.get("SSE_BIND", "0.0.0.0:5051")
+MAX_CONNECTIONS = int(os.environ.get("SSE_MAX_CONNECTIONS", "10000"))
+# Seconds a client gets to send its request headers
+HEADER_TIMEOUT = 10
+
+_open = 0
+
+
+def _response(status, body=b"", headers=()):
+    lines = [f"HTTP/1.1 {status}", "Access-Control-Allow-Origin: *", "Connection: close", *headers]
+    if body:
+        lines += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+async def _read_request(reader):
+    # (method, path, query, headers) of a request without a body
+    request_line = (await reader.readline()).decode("latin-1")
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    method, target, _ = request_line.split(" ", 2)
+    url = urlsplit(target)
+    return method, url.path, parse_qs(url.query), headers
+
+
+def _last_event_id(query, headers):
+    # Last-Event-ID header, or ?lastEventId= for a client sent here by redirect
+    value = headers.get("last-event-id") or (query.get("lastEventId") or [None])[0]
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+async def _stream(writer, changed, last_id):
+    # Same sequence as events.stream(): retry, hello, replay after last_id,
+    # then new events, with a heartbeat comment while idle
+    writer.write(_response("200 OK", headers=(
+        "Content-Type: text/event-stream", "Cache-Control: no-cache", "X-Accel-Buffering: no",
+    )))
+    writer.write(f"retry: {events.RETRY_MS}\n\n".encode())
+    writer.write(events.format_event("hello", events.versions(events.after(0))).encode())
+    if last_id is None:
+        last_id = events.newest_id()
+    while True:
+        async with changed:
+            pending = events.after(last_id)
+            if not pending:
+                try:
+                    await asyncio.wait_for(changed.wait(), events.HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                pending = events.after(last_id)
+        if not pending:
+            writer.write(b": keepalive\n\n")
+        for entry in pending:
+            writer.write(events.format_event(entry["event"], entry["data"], entry["id"]).encode())
+            last_id = entry["id"]
+        await writer.drain()
+
+
+async def _handle(reader, writer, changed):
+    global _open
+    try:
+        try:
+            method, path, query, headers = await asyncio.wait_for(_read_request(reader), HEADER_TIMEOUT)
+        except (ValueError, asyncio.TimeoutError):
+            writer.write(_response("400 Bad Request", b'{"error": "Bad request"}'))
+            return
+        if path != "/events":
+            writer.write(_response("404 Not Found", b'{"error": "Not found"}'))
+            return
+        if method == "OPTIONS":
+            writer.write(_response("204 No Content", headers=("Access-Control-Allow-Headers: Last-Event-ID",)))
+            return
+        if method != "GET":
+            writer.write(_response("405 Method Not Allowed", b'{"error": "Method not allowed"}'))
+            return
+        if _open >= MAX_CONNECTIONS:
+            writer.write(_response(
+                "503 Service Unavailable", b'{"error": "Too many open event streams"}',
+                (f"Retry-After: {events.RETRY_MS // 1000}",),
+            ))
+            return
+        _open += 1
+        try:
+            await _stream(writer, changed, _last_event_id(query, headers))
+        finally:
+            _open -= 1
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _tail(changed):
+    # The one watcher: polls the events file and wakes every stream
+    stamp = None
+    while True:
+        current = events.file_stamp()
+        if current != stamp:
+            stamp = current
+            try:
+                if events.load_new():
+                    async with changed:
+                        changed.notify_all()
+            except Exception as e:
+                logger.warning("⚠️ Reading %s failed: %s", events.EVENTS_FILE, e)
+        await asyncio.sleep(events.POLL_SECONDS)
+
+
+def _raise_file_limit():
+    # Every stream is a descriptor; the soft limit is often 1024
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = MAX_CONNECTIONS + 64
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        limit = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+        if limit < wanted:
+            logger.warning("⚠️ Open file limit %d caps event streams below %d", limit, MAX_CONNECTIONS)
+
+
+async def serve(bind=BIND):
+    host, _, port = bind.rpartition(":")
+    changed = asyncio.Condition()
+    events.load_new()
+    tail = asyncio.create_task(_tail(changed))
+    server = await asyncio.start_server(lambda r, w: _handle(r, w, changed), host or None, int(port), backlog=1024)
+    logger.info("📡 Serving /events on %s (up to %d streams)", bind, MAX_CONNECTIONS)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        tail.cancel()
+
+
+if __name__ == "__main__":
+    from log_utils import configure_logging
+
+    configure_logging()
+    _raise_file_limit()
+    asyncio.run(serve())
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Server-Sent Events for /events. Snapshots are published where the
+# workbooks are reloaded, which under gunicorn is the master, so events go
+# through a small append-only file that the streaming processes tail.
+# Under gunicorn the streams are served by event_server.py, an asyncio
+# process where an idle stream is a coroutine rather than a thread. The
+# app's own /events (flask run, or gunicorn without SSE_URL) streams from a
+# request thread, so a process takes at most MAX_STREAMS of them and ends
+# each after STREAM_SECONDS; EventSource reconnects by itself and
+# Last-Event-ID replays anything published in between.
+EVENTS_FILE = os.environ.get("SSE_EVENTS_FILE", "output/events.jsonl")
+# Events kept in the file and replayed to clients reconnecting with Last-Event-ID
+EVENTS_KEPT = int(os.environ.get("SSE_EVENTS_KEPT", "100"))
+HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", "15"))
+POLL_SECONDS = float(os.environ.get("SSE_POLL_SECONDS", "1"))
+MAX_STREAMS = int(os.environ.get("SSE_MAX_STREAMS", "16"))
+# event_server.py's public /events URL; the app's /events redirects there
+SSE_URL = os.environ.get("SSE_URL")
+STREAM_SECONDS = float(os.environ.get("SSE_STREAM_SECONDS", "300"))
+# Client reconnect delay sent with each stream
+RETRY_MS = 5000
+
+_recent = deque(maxlen=EVENTS_KEPT)
+# Created with the watcher, in the process that streams: the app is
+# imported in the gunicorn master and threads don't survive the fork
+_changed = None
+_watcher_pid = None
+_watcher_lock = threading.Lock()
+_write_lock = threading.Lock()
+_streams = 0
+_streams_lock = threading.Lock()
+
+
+def publish(event, data):
+    # Appends an event; the file is trimmed to the last EVENTS_KEPT once it
+    # holds twice that many, plus the newest snapshot event of any payload
+    # not among them (what versions() reads after a restart)
+    entry = {"id": time.time_ns() // 1000, "event": event, "data": data}
+    os.makedirs(os.path.dirname(EVENTS_FILE) or ".", exist_ok=True)
+    with _write_lock:
+        with open(EVENTS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        lines = _read_lines()
+        if len(lines) > 2 * EVENTS_KEPT:
+            kept = set(versions(_entries(lines[-EVENTS_KEPT:])))
+            newest = {}
+            for line, old in zip(lines[:-EVENTS_KEPT], _entries(lines[:-EVENTS_KEPT], keep_bad=True)):
+                if old is not None and old["event"] == "snapshot" and old["data"]["payload"] not in kept:
+                    newest[old["data"]["payload"]] = (old["id"], line)
+            tmp = f"{EVENTS_FILE}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(line + "\n" for _, line in sorted(newest.values()))
+                f.writelines(line + "\n" for line in lines[-EVENTS_KEPT:])
+            os.replace(tmp, EVENTS_FILE)
+    logger.info("📣 Published %s event %s", event, entry["id"])
+    return entry
+
+
+def _entries(lines, keep_bad=False):
+    # Parsed events; unreadable lines are skipped (None with keep_bad)
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            if keep_bad:
+                entries.append(None)
+    return entries
+
+
+def _read_lines():
+    try:
+        with open(EVENTS_FILE, encoding="utf-8") as f:
+            return [line.rstrip("\n") for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def file_stamp():
+    # Changes whenever the events file is appended to or rewritten
+    try:
+        st = os.stat(EVENTS_FILE)
+        return st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+
+def load_new():
+    # New events from the file into _recent; True when there were any
+    last_id = newest_id()
+    added = False
+    for entry in _entries(_read_lines()):
+        if entry["id"] > last_id:
+            _recent.append(entry)
+            last_id = entry["id"]
+            added = True
+    return added
+
+
+def _watch(changed):
+    stamp = None
+    while True:
+        current = file_stamp()
+        if current != stamp:
+            stamp = current
+            try:
+                with changed:
+                    if load_new():
+                        changed.notify_all()
+            except Exception as e:
+                logger.warning("⚠️ Reading %s failed: %s", EVENTS_FILE, e)
+        time.sleep(POLL_SECONDS)
+
+
+def _ensure_watcher():
+    # Started by the first stream, so it runs in the worker (after fork)
+    global _changed, _watcher_pid
+    with _watcher_lock:
+        if _watcher_pid == os.getpid():
+            return _changed
+        _watcher_pid = os.getpid()
+        _changed = threading.Condition()
+        load_new()
+        watcher = threading.Thread(target=_watch, args=(_changed,), name="sse-events", daemon=True)
+    watcher.start()
+    return _changed
+
+
+def format_event(event, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def after(last_id):
+    # Loaded events newer than last_id
+    return [entry for entry in list(_recent) if entry["id"] > last_id]
+
+
+def newest_id():
+    return _recent[-1]["id"] if _recent else 0
+
+
+def versions(entries=None):
+    # Payload -> version of its newest snapshot event, from the file unless
+    # entries are given
+    if entries is None:
+        entries = _entries(_read_lines())
+    return {entry["data"]["payload"]: entry["data"]["version"] for entry in entries if entry["event"] == "snapshot"}
+
+
+def open_stream():
+    # Claims one of the worker's MAX_STREAMS slots; False when they're all taken
+    global _streams
+    with _streams_lock:
+        if _streams >= MAX_STREAMS:
+            return False
+        _streams += 1
+        return True
+
+
+def _close_stream():
+    global _streams
+    with _streams_lock:
+        _streams -= 1
+
+
+def stream(hello, last_id=None):
+    # Generator of SSE text for a slot taken with open_stream(): the hello
+    # event, anything published after last_id (a reconnecting client's
+    # Last-Event-ID), then new events as they arrive, with a comment line
+    # as heartbeat while idle. The heartbeat is also what notices a client
+    # that went away: the failed write closes the generator and frees the slot.
+    try:
+        changed = _ensure_watcher()
+        deadline = time.monotonic() + STREAM_SECONDS
+        yield f"retry: {RETRY_MS}\n\n"
+        yield format_event("hello", hello)
+        if last_id is None:
+            last_id = newest_id()
+        while time.monotonic() < deadline:
+            with changed:
+                pending = after(last_id)
+                if not pending:
+                    changed.wait(min(HEARTBEAT_SECONDS, max(deadline - time.monotonic(), 0)))
+                    pending = after(last_id)
+            if not pending:
+                yield ": keepalive\n\n"
+                continue
+            for entry in pending:
+                yield format_event(entry["event"], entry["data"], entry["id"])
+                last_id = entry["id"]
+    finally:
+        _close_stream()
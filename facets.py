@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+# Props payload field -> the All_Picks column behind it, for the
+# dashboard's filter dropdowns
+COLUMNS = {
+    "Team": "Team",
+    "Opponent": "Opponent",
+    "Tag": "Tag",
+    "Prop Type": "Prop Type",
+    "Player Type": "Player Type",
+    "Home/Away": "Home/Away",
+    "GameTime": "GameTime",
+    "MomentumTag": "Momentum Tag",
+    "MomentumPattern": "Momentum Pattern",
+    "ConfirmedMomentum": "Confirmed Momentum",
+    "GuruPotential": "Guru Potential",
+    "ZGuruTag": "Z-GURU Tag",
+    "GuruConflict": "Guru Conflict",
+    "LeanDirection": "Lean Direction",
+    "GuruPick": "Guru Pick",
+    "GuruMagic": "Guru Magic",
+    "IsGuruPick": "IsGuru Pick",
+    "Sport": "Sport",
+}
+# The dashboard's time-of-day buckets: name, first and last start hour
+TIME_WINDOWS = [("Early", 0, 15), ("Afternoon", 15, 17), ("Evening", 17, 20), ("Late", 20, 24)]
+
+
+def _scalar(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _blank(value):
+    return pd.isna(value) or str(value).strip().lower() in ("", "nan")
+
+
+def _listing(pairs):
+    return sorted(
+        ({"value": _scalar(value), "count": int(count)} for value, count in pairs if count and not _blank(value)),
+        key=lambda facet: str(facet["value"]),
+    )
+
+
+def value_counts(values):
+    # (value, count) pairs; categorical columns are counted on their codes
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(values.cat.categories))
+        return list(zip(values.cat.categories, counts))
+    counts = values.dropna().value_counts(sort=False)
+    return list(zip(counts.index, counts.to_numpy()))
+
+
+def game_counts(picks):
+    # "A vs B" with the teams sorted, the dashboard's game key
+    pairs = pd.DataFrame({"team": picks["Team"], "opponent": picks["Opponent"]}).value_counts()
+    games = {}
+    for (team, opponent), count in pairs.items():
+        if count and not _blank(team) and not _blank(opponent):
+            game = " vs ".join(sorted([str(team).strip(), str(opponent).strip()]))
+            games[game] = games.get(game, 0) + count
+    return list(games.items())
+
+
+def _start_hour(value):
+    try:
+        return pd.to_datetime(str(value).strip(), format="%I:%M %p").hour
+    except ValueError:
+        return None
+
+
+def time_window_counts(times):
+    # GameTime counts folded into TIME_WINDOWS; "TBD" and the like are left out
+    windows = dict.fromkeys((name for name, _, _ in TIME_WINDOWS), 0)
+    for value, count in value_counts(times):
+        hour = _start_hour(value)
+        if hour is None:
+            continue
+        for name, first, last in TIME_WINDOWS:
+            if first <= hour < last:
+                windows[name] += count
+    return [(name, windows[name]) for name, _, _ in TIME_WINDOWS]
+
+
+def snapshot_facets(snap):
+    # Over the same rows the props payload has (NBA drops untagged picks)
+    picks = snap["sheets"]["All_Picks"]
+    if snap["sport"] == "NBA":
+        picks = picks[picks["Tag"].notna().to_numpy()]
+    facets = {
+        field: _listing(value_counts(picks[column]))
+        for field, column in COLUMNS.items()
+        if column in picks.columns
+    }
+    if "Team" in picks.columns and "Opponent" in picks.columns:
+        facets["Game"] = _listing(game_counts(picks))
+    if "GameTime" in picks.columns:
+        facets["TimeWindow"] = [
+            {"value": name, "count": int(count)} for name, count in time_window_counts(picks["GameTime"])
+        ]
+    return {"sport": snap["sport"], "slate": snap["slate"], "total": len(picks), "facets": facets}
@@ -1,322 +1,658 @@
-from flask import Flask, request, jsonify
+import logging
+from collections import Counter
+from flask import Flask, Response, redirect, request, jsonify
 from flask_cors import CORS
+from werkzeug.wsgi import wrap_file
 import pandas as pd
 import numpy as np
-from lineup_generator import generate_lineups_from_config
+from lineup_generator import WEIGHT_MODES, generate_lineups_from_config, lineup_table
+import data_store
+from data_store import get_snapshot, derived, parse_slate, SlateNotFound
+from admission import limit_concurrency
+import metrics
+from log_utils import configure_logging, warn_rate_limited
+from profiling import ProfilerMiddleware, token_ok
+import memory_report
+import snapshot_store
+import history_db
+from compact import day_dates, day_strings, lower_keys
+from stat_maps import stat_values
+import hit_rates
+import rolling_stats
+import volatility
+import projections
+import facets
+import player_search
+import top_picks
+import prop_changes
+import events
+import wire_formats
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True, resources={r"/*": {"origins": ["https://playswithguru.com", "http://localhost:3000"]}})
+app.wsgi_app = ProfilerMiddleware(app.wsgi_app)
+
+
+@app.before_request
+def start_request_timing():
+    metrics.begin_request()
+
+
+@app.after_request
+def add_server_timing(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    stages, total = metrics.end_request(route, request.method, response.status_code)
+    response.headers["Server-Timing"] = metrics.server_timing_header(stages, total)
+    return response
+
+
+def recent_games(snap, sheet, player_col, date_col):
+    # Lowercased player -> that player's 10 most recent rows in a game-log
+    # sheet. Built once per sheet and kept across reloads that leave the
+    # sheet unchanged, instead of filtering the whole sheet for every pick.
+    def build(s):
+        df = s["sheets"].get(sheet)
+        if df is None or df.empty:
+            return {}
+        groups = df.groupby(lower_keys(df[player_col]), sort=False).indices
+        return {
+            key: df.iloc[rows].sort_values(date_col, ascending=False).head(10)
+            for key, rows in groups.items()
+        }
+
+    return derived(snap, f"recent_games:{sheet}", build, depends=(sheet,))
+
+
+def ranked_games(snap, sheet, player_col, date_col):
+    # The same rows as one frame, for the vectorized line stats
+    return derived(
+        snap, f"ranked_games:{sheet}",
+        lambda s: hit_rates.ranked_games(s["sheets"][sheet], recent_games(s, sheet, player_col, date_col)),
+        depends=(sheet,),
+    )
+
+
+# Game-log sheets behind each sport's per-pick fields: role -> sheet, plus
+# the dedicated head-to-head sheet when the workbook has one
+PICK_LOGS = {
+    "NBA": ({"": "Last10_GameLogs"}, "Last10vsOpp_GameLogs", "Player", "Date"),
+    "MLB": ({"Batter": "Last 10 Batters", "Pitcher": "Last 10 Pitchers"}, None, "player", "date"),
+}
+
+
+# Game-log column matched against a pick's opponent when there's no
+# head-to-head sheet
+LOG_OPPONENT = {"NBA": None, "MLB": "opponent"}
+
+
+def pick_keys(snap):
+    # One row per All_Picks row with the keys the vectorized fields join on.
+    # MLB props use the log for their Player Type, or whichever log has the
+    # player when it's blank (the same choice as mlb_props_table).
+    picks = snap["sheets"]["All_Picks"]
+    player_keys = picks["Player"].astype(object).astype(str).str.lower()
+    if snap["sport"] == "MLB":
+        ptypes = picks.get("Player Type", pd.Series("", index=picks.index)).astype(object).astype(str)
+        blank = ptypes == ""
+        ptypes = ptypes.mask(blank & player_keys.isin(list(recent_games(snap, "Last 10 Batters", "player", "date"))), "Batter")
+        roles = np.where(ptypes == "Batter", "Batter", "Pitcher")
+        prop_types = picks["Prop Type"].astype(object).astype(str).to_numpy()
+    else:
+        roles = ""
+        prop_types = picks["Prop Type"].astype(object).to_numpy()
+    return pd.DataFrame({
+        "player_key": player_keys.to_numpy(),
+        "prop_type": prop_types,
+        "line": picks["Prop Value"].to_numpy(),
+        "opponent": picks["Opponent"].astype(object).astype(str).to_numpy(),
+        "team": picks["Team"].astype(object).astype(str).to_numpy(),
+        "role": roles,
+    })
+
+
+def pick_logs(snap):
+    # role -> ranked_games() frame, and the head-to-head frames (or None)
+    roles, vs_sheet, player_col, date_col = PICK_LOGS[snap["sport"]]
+    logs = {role: ranked_games(snap, sheet, player_col, date_col) for role, sheet in roles.items()}
+    vs_logs = {"": ranked_games(snap, vs_sheet, player_col, date_col)} if vs_sheet else None
+    return logs, vs_logs
+
+
+def pick_volatility(snap):
+    # volatility FIELDS for every All_Picks row, kept with the snapshot so
+    # each lineup request just attaches the columns
+    def build(s):
+        with metrics.stage("volatility"):
+            return volatility.volatility(pick_keys(s), pick_logs(s)[0], s["sport"])
+
+    return derived(snap, "volatility", build, depends=tuple(snap["sheets"]))
+
+
+def pick_projections(snap):
+    # projections FIELDS for every All_Picks row, built once per snapshot
+    def build(s):
+        with metrics.stage("projections"):
+            keys = pick_keys(s)
+            logs, vs_logs = pick_logs(s)
+            rolling = rolling_stats.lookup(rolling_stats.rolling_table(s), keys["role"], keys["player_key"], keys["prop_type"])
+            return projections.projections(
+                keys, rolling, logs, s["sport"],
+                vs_logs=vs_logs,
+                opponent_col=LOG_OPPONENT[s["sport"]],
+                spreads=s["sheets"].get("Spreads"),
+                league=s["sheets"].get("League Averages"),
+            )
+
+    return derived(snap, "projections", build, depends=tuple(snap["sheets"]))
+
+
+def pick_line_stats(snap):
+    # hit_rates FIELDS for every All_Picks row, built once per snapshot
+    def build(s):
+        with metrics.stage("line_stats"):
+            logs, vs_logs = pick_logs(s)
+            return hit_rates.line_stats(pick_keys(s), logs, s["sport"], opponent_col=LOG_OPPONENT[s["sport"]], vs_logs=vs_logs)
+
+    return derived(snap, "line_stats", build, depends=tuple(snap["sheets"]))
+
+
+def pick_table(snap):
+    # Every pick with what /top-picks ranks on, scored once per snapshot
+    def build(s):
+        picks = s["sheets"]["All_Picks"]
+        confidence = pd.to_numeric(picks["Confidence"], errors="coerce").fillna(0)
+        final = picks["Final Projection"] if "Final Projection" in picks.columns else picks.get("FinalAdjustedScore")
+        table = pd.DataFrame({
+            "Sport": s["sport"],
+            "Player": picks["Player"].astype(object).to_numpy(),
+            "Team": picks["Team"].astype(object).to_numpy(),
+            "Opponent": picks["Opponent"].astype(object).to_numpy(),
+            "Prop Type": picks["Prop Type"].astype(object).to_numpy(),
+            "Prop Value": pd.to_numeric(picks["Prop Value"], errors="coerce").to_numpy(),
+            "Tag": picks["Tag"].astype(object).to_numpy(),
+            # Same 0-10 scale as the payloads
+            "Confidence": confidence.where(confidence > 1, confidence * 10).round(2).to_numpy(),
+            "WinProbability": pd.to_numeric(picks["WinProbability"], errors="coerce").to_numpy(),
+            "Final Projection": pd.to_numeric(final, errors="coerce").to_numpy() if final is not None else np.nan,
+            "Projection": pick_projections(s)["Projection"].to_numpy(),
+            "Last10HitRate": pick_line_stats(s)["Last10HitRate"].to_numpy(),
+        })
+        return top_picks.score_table(table)
 
-NBA_FILE_PATH = "output/NBA_PropAnalysis_Output.xlsx"
-MLB_FILE_PATH = "output/MLB_PropAnalysis_Output.xlsx"
+    return derived(snap, "pick_table", build, depends=tuple(snap["sheets"]))
 
-def extract_nba_last10_stats():
-    try:
-        df = pd.read_excel(NBA_FILE_PATH, sheet_name="Last10_GameLogs")
-        df["Player"] = df["Player"].astype(str).str.strip()
-        df["Date"] = pd.to_datetime(df["Date"]).dt.date
-        return df
-    except Exception as e:
-        print(f"❌ Error loading NBA last10 stats: {e}")
-        return pd.DataFrame()
 
-def extract_nba_last10_vsOpp_stats():
-    try:
-        df = pd.read_excel(NBA_FILE_PATH, sheet_name="Last10vsOpp_GameLogs")
-        df["Player"] = df["Player"].astype(str).str.strip()
-        df["Date"] = pd.to_datetime(df["Date"]).dt.date
-        return df
-    except Exception as e:
-        print(f"❌ Error loading NBA last10 vsOpp stats: {e}")
-        return pd.DataFrame()
-
-
-def enrich_last10_from_df(player, prop_type, source_df):
-    col_map = {
-        "Points": "Points",
-        "Rebounds": "Rebounds",
-        "Assists": "Assists",
-        "Pts+Rebs": ["Points", "Rebounds"],
-        "Pts+Asts": ["Points", "Assists"],
-        "Rebs+Asts": ["Rebounds", "Assists"],
-        "Pts+Rebs+Asts": ["Points", "Rebounds", "Assists"],
-        "3-PT Attempted": "3PT Attempted",
-        "3-PT Made": "3PT Made",
-        "Turnovers": "Turnovers",
-        "Blocked Shots": "Blocks",
-        "Steals": "Steals",
-        "Free Throws Attempted": "Free Throws Attempted",
-        "Free Throws Made": "Free Throws Made",
-        "Offensive Rebounds": "OREB",
-        "Defensive Rebounds": "DREB",
-        "Personal Fouls": "PF",
-        "Fantasy Score": "FantasyScore_PP",
-        "FG Attempted": "Field Goals Attempted",
-        "FG Made": "Field Goals Made",
-        "Two Pointers Made": lambda row: row.get("Field Goals Made", 0) - row.get("3PT Made", 0),
-        "Two Pointers Attempted": lambda row: row.get("Field Goals Attempted", 0) - row.get("3PT Attempted", 0)
-    }
-
-    if source_df.empty:
-        return []
-    
-    subset = source_df[source_df["Player"].str.lower() == player.lower()]
-    if subset.empty:
-        return []
-
-    subset = subset.sort_values("Date", ascending=False).head(10)
-    results = []
-    for _, row in subset.iterrows():
-        if prop_type in col_map:
-            stat_def = col_map[prop_type]
-            if callable(stat_def):
-                value = stat_def(row)
-            elif isinstance(stat_def, list):
-                value = sum([row.get(col, 0) for col in stat_def])
-            else:
-                value = row.get(stat_def, 0)
-        else:
-            value = None
-
-        results.append({
-            "Date": row["Date"],
-            "Team": row["Team"],
-            "Opponent": row["Opponent"],
-            "Home/Away": "home" if str(row["Matchup"]).startswith(row["Team"]) else "away",
-            "Matchup": row["Matchup"],
-            "Value": round(value, 2) if pd.notna(value) else None
-        })
+def rolling_fields(snap, roles, player_keys, prop_types):
+    # rolling_stats figures for each pick
+    with metrics.stage("rolling_stats"):
+        return rolling_stats.lookup(rolling_stats.rolling_table(snap), roles, player_keys, prop_types)
 
-    return results
 
+def json_payload(records):
+    with metrics.stage("serialize"):
+        return jsonify(records).get_data()
 
-@app.route("/props")
-def get_nba_props():
+
+def render_payload(snap, build):
+    with metrics.stage("record_build"):
+        records = build(snap)
+    return json_payload(records)
+
+
+def payload_body(snap, name, build):
+    # Serialized payloads are cached per snapshot, so repeat reads skip both
+    # the record build and the JSON encoding. They only read the snapshot's
+    # sheets, so a reload that changes none of them keeps the payload.
+    return derived(snap, name, lambda s: render_payload(s, build), depends=tuple(snap["sheets"]))
+
+
+def cached_json_response(snap, name, build):
+    return Response(payload_body(snap, name, build), mimetype=app.json.mimetype)
+
+
+def change_table(snap, name):
+    # Per-record JSON and hashes of a props payload. The table carries over
+    # reloads that leave the sheets alone; recording the version does not,
+    # since the version number moves with the workbook either way.
+    def build(s):
+        with metrics.stage("change_table"):
+            return prop_changes.record_table(payload_body(s, name, PAYLOADS[name][1]), app.json.dumps)
+
+    table = derived(snap, f"changes:{name}", build, depends=tuple(snap["sheets"]))
+    if snap["slate"] is None:
+        derived(snap, f"changes_published:{name}", lambda s: publish_snapshot(s, name, table))
+    return table
+
+
+def publish_snapshot(snap, name, table):
+    # A new current snapshot: remembered for ?since= and announced on
+    # /events with what changed against the last one. A fresh process has
+    # no history, so the last version announced is read from the events
+    # file: a restart on an unchanged workbook announces nothing.
+    version = prop_changes.version_number(snap)
+    previous = prop_changes.latest(name)
+    if previous is None:
+        previous = events.versions().get(name)
+    if previous == version:
+        prop_changes.remember(name, version, table)
+        return False
+    changes = prop_changes.diff(name, previous, table) if previous is not None else None
+    prop_changes.remember(name, version, table)
+    events.publish("snapshot", prop_changes.event(name, snap["sport"], version, previous, changes, table))
+    return True
+
+
+def wire_format():
+    # ?format=rows|columnar|msgpack|arrow, else negotiated from Accept
+    fmt = wire_formats.negotiate(request.args.get("format"), request.accept_mimetypes)
+    if fmt is None:
+        raise ValueError(f"format must be one of {', '.join(wire_formats.FORMATS)}")
+    return fmt
+
+
+def serve_payload(name):
+    # ?date=YYYY-MM-DD serves that day's slate; without it the current one,
+    # which comes from the prebuilt snapshot when SNAPSHOT_DIR is set (row
+    # JSON only; the other encodings are built from the workbook snapshot).
     try:
-        print("🚀 /props endpoint hit")
-        props_df = pd.read_excel(NBA_FILE_PATH, sheet_name="All_Picks")
-        last10_df = extract_nba_last10_stats()
-        last10vsOpp_df = extract_nba_last10_vsOpp_stats()
-        props_df = props_df[props_df["Tag"].notna()].copy()
-        print("✅ NBA props loaded")
-
-        props = []
-        for _, row in props_df.iterrows():
-            conf = row.get("Confidence", 0)
-            try:
-                conf = float(conf)
-                if conf <= 1:
-                    conf *= 10
-            except:
-                conf = 0
+        slate = parse_slate(request.args.get("date"))
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+    try:
+        fmt = wire_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if snapshot_store.SNAPSHOT_DIR and slate is None and fmt == "rows":
+        response = prebuilt_response(name)
+        response.vary.add("Accept")
+        return response
+    sport, build = PAYLOADS[name]
+    try:
+        snap = get_snapshot(sport, slate)
+    except SlateNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    if fmt == "rows":
+        response = cached_json_response(snap, name, build)
+    else:
+        response = Response(encoded_payload(snap, name, fmt), mimetype=wire_formats.MIMETYPES[fmt])
+    response.vary.add("Accept")
+    if slate is None:
+        change_table(snap, name)
+        response.headers["X-Props-Version"] = str(prop_changes.version_number(snap))
+    return response
+
+
+def serve_changes(name):
+    # Records of the current slate added, modified or removed since the
+    # version in ?since= (a previous X-Props-Version / version). With
+    # SNAPSHOT_DIR set, both sides come from the prebuilt change tables.
+    since = request.args.get("since", type=int)
+    if since is None and request.args.get("since"):
+        return jsonify({"error": "since must be a version number"}), 400
+    changes = None
+    if snapshot_store.SNAPSHOT_DIR:
+        prebuilt = snapshot_store.current()
+        table = prebuilt.change_table(name)
+        version = prebuilt.payload_version(name)
+        with metrics.stage("changes_diff"):
+            old = prebuilt.previous_table(name, since) if since is not None else None
+            if old is not None:
+                changes = prop_changes.compare(old, table)
+    else:
+        snap = get_snapshot(PAYLOADS[name][0])
+        table = change_table(snap, name)
+        version = prop_changes.version_number(snap)
+        with metrics.stage("changes_diff"):
+            if since is not None:
+                changes = prop_changes.diff(name, since, table)
+    with metrics.stage("changes_diff"):
+        body = prop_changes.render(version, since, table, changes)
+    response = Response(body, mimetype=app.json.mimetype)
+    response.headers["X-Props-Version"] = str(version)
+    return response
+
+
+def prebuilt_response(name):
+    # SNAPSHOT_DIR mode: the payload file is streamed from the build output
+    # (sendfile under gunicorn), gzipped when the client accepts it, with an
+    # ETag for revalidation.
+    snap = snapshot_store.current()
+    encoding = "gzip" if request.accept_encodings["gzip"] else "identity"
+    opened = snap.open(name, encoding)
+    if opened is None:
+        encoding, opened = "identity", snap.open(name)
+    body, size = opened
+    response = Response(wrap_file(request.environ, body), mimetype=app.json.mimetype, direct_passthrough=True)
+    response.headers["Content-Length"] = str(size)
+    response.headers["Vary"] = "Accept-Encoding"
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.set_etag(snap.etag(name))
+    if snap.payload_version(name) is not None:
+        response.headers["X-Props-Version"] = str(snap.payload_version(name))
+    return response.make_conditional(request)
+
+
+def sheet_column(df, col, default=None):
+    # row.get(col, default) for a whole column
+    if col in df.columns:
+        return df[col]
+    return pd.Series([default] * len(df), index=df.index, dtype=object)
+
+
+def payload_confidence(values):
+    # Confidence on the payloads' 0-10 scale; anything that isn't a number is 0
+    conf = pd.to_numeric(values, errors="coerce")
+    conf = conf.mask(conf.isna() & values.notna(), 0)
+    return conf.mask(conf <= 1, conf * 10).round(2)
+
+
+def nba_log_fields(games):
+    # NBA Last10Stats fields for every row of a ranked_games() frame
+    return pd.DataFrame({
+        "Date": day_dates(games["Date"]),
+        "Team": games["Team"],
+        "Opponent": games["Opponent"],
+        "Home/Away": ["home" if str(m).startswith(t) else "away" for m, t in zip(games["Matchup"], games["Team"])],
+        "Matchup": games["Matchup"],
+    })
+
+
+def mlb_log_fields(games):
+    # MLB Last10Stats fields for every row of a ranked_games() frame
+    team, opponent = sheet_column(games, "team", ""), sheet_column(games, "opponent", "")
+    if "matchup" in games.columns:
+        matchup = games["matchup"]
+    else:
+        matchup = team.astype(object).astype(str) + " vs. " + opponent.astype(object).astype(str)
+    return pd.DataFrame({
+        "Date": day_strings(games["date"]),
+        "Opponent": opponent,
+        "HomeAway": sheet_column(games, "home/away", "Home"),
+        "Team": team,
+        "Matchup": matchup,
+    })
+
+
+def log_stats(keys, logs, sport, log_fields, unmapped=None):
+    # Last10Stats for every pick as (offsets, games): the rows of pick i are
+    # games[offsets[i]:offsets[i + 1]], most recent first. Each prop type's
+    # values are computed once over the whole log; picks of a prop type with
+    # no stat column get None values and are counted in unmapped.
+    picks = keys.reset_index(drop=True).assign(pick=np.arange(len(keys)))
+    pieces = []
+    for role, rows in picks.groupby("role", sort=False).indices.items():
+        games = logs.get(role)
+        if games is None:
+            continue
+        pairs = picks.iloc[rows][["pick", "player_key", "prop_type"]].merge(
+            pd.DataFrame({"player_key": games["player_key"].to_numpy(), "rank": games["rank"].to_numpy(), "row": np.arange(len(games))}),
+            on="player_key",
+        )
+        values = np.full(len(pairs), np.nan)
+        for prop_type, idx in pairs.groupby("prop_type", sort=False).indices.items():
+            stat = stat_values(games, sport, prop_type)
+            if stat is not None:
+                values[idx] = stat.to_numpy(np.float64)[pairs["row"].to_numpy()[idx]]
+            elif unmapped is not None:
+                unmapped[prop_type] += pairs["pick"].iloc[idx].nunique()
+        fields = log_fields(games).take(pairs["row"].to_numpy()).reset_index(drop=True)
+        pieces.append(fields.assign(Value=np.round(values, 2), pick=pairs["pick"].to_numpy(), rank=pairs["rank"].to_numpy()))
+    if not pieces:
+        return np.zeros(len(picks) + 1, dtype=np.int32), pd.DataFrame()
+    games = pd.concat(pieces, ignore_index=True).sort_values(["pick", "rank"], kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(games["pick"], minlength=len(picks)))]).astype(np.int32)
+    return offsets, games.drop(columns=["pick", "rank"]).reset_index(drop=True)
+
+
+def payload_extras(frame, snap, keys, rolling, rows=slice(None)):
+    # The vectorized per-pick fields (hit_rates, rolling_stats, projections)
+    # and PropId; stats are in pick order
+    extras = (pick_line_stats(snap)[rows], rolling[rolling_stats.PAYLOAD_FIELDS].round(3), pick_projections(snap)[rows])
+    for stats in extras:
+        for field in stats.columns:
+            frame[field] = stats[field].to_numpy()
+    for field in ("LineStreak", "SeasonGames"):
+        if field in frame.columns:
+            frame[field] = frame[field].astype("Int64")
+    frame["PropId"] = prop_changes.prop_ids(frame, snap["sport"]).to_numpy()
+    return frame
+
+
+def nba_props_table(snap):
+    # The NBA props payload column by column, as (frame, list fields);
+    # untagged picks are left out
+    picks = snap["sheets"]["All_Picks"]
+    tagged = picks["Tag"].notna().to_numpy()
+    df = picks[tagged].reset_index(drop=True)
+    keys = pick_keys(snap)[tagged]
+    rolling = rolling_fields(snap, keys["role"], keys["player_key"], keys["prop_type"])
+    season, last5, last10 = (
+        rolling_stats.fill_missing(df[col], rolling[field]).to_numpy(np.float64)
+        for col, field in (("Season_Avg", "SeasonAvg"), ("Last5_Avg", "Last5Avg"), ("Last10_Avg", "Last10Avg"))
+    )
+    # Against the season average, or last 5 against last 10 without one
+    no_season = season == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        last5_vs = np.where(no_season, np.where(last10 != 0, (last5 - last10) / last10, 0), np.where(last5 != 0, (last5 - season) / season, 0))
+        last10_vs = np.where(no_season, 0, np.where(last10 != 0, (last10 - season) / season, 0))
+
+    team, opponent = sheet_column(df, "Team", ""), sheet_column(df, "Opponent", "")
+    if "Matchup" in df.columns:
+        matchup = df["Matchup"]
+    else:
+        matchup = team.astype(object).astype(str) + " vs " + opponent.astype(object).astype(str)
+    game_time = sheet_column(df, "GameTime", "")
+    final = df["Final Projection"] if "Final Projection" in df.columns else sheet_column(df, "FinalAdjustedScore")
+    frame = pd.DataFrame({
+        "Player": sheet_column(df, "Player", ""),
+        "Team": team,
+        "Team Name": sheet_column(df, "Team Name", ""),
+        "Opponent": opponent,
+        "Opponent Name": sheet_column(df, "Opponent Name", ""),
+        "Player Type": sheet_column(df, "Player Type", "UNKNOWN"),
+        "Prop Type": sheet_column(df, "Prop Type", ""),
+        "Prop Value": sheet_column(df, "Prop Value", ""),
+        "Tag": df["Tag"],
+        "MomentumTag": sheet_column(df, "Momentum Tag", ""),
+        "MomentumPattern": sheet_column(df, "Momentum Pattern", ""),
+        "ConfirmedMomentum": sheet_column(df, "Confirmed Momentum", ""),
+        "GuruPotential": sheet_column(df, "Guru Potential", ""),
+        "ZGuruTag": sheet_column(df, "Z-GURU Tag", ""),
+        "GuruConflict": sheet_column(df, "Guru Conflict"),
+        "LeanDirection": sheet_column(df, "Lean Direction"),
+        "Confidence": payload_confidence(sheet_column(df, "Confidence", 0)),
+        "RiskNote": sheet_column(df, "Risk Note"),
+        "AI Commentary": sheet_column(df, "AI Commentary"),
+        "GuruPick": sheet_column(df, "Guru Pick"),
+        "GuruMagic": sheet_column(df, "Guru Magic"),
+        "Sport": sheet_column(df, "Sport"),
+        "IsGuruPick": sheet_column(df, "IsGuru Pick"),
+        "WinProbability": sheet_column(df, "WinProbability", 0),
+        "GameTime": game_time.astype(object).astype(str).where(game_time.notna(), ""),
+        "Home/Away": sheet_column(df, "Home/Away", "home"),
+        "Matchup": matchup,
+        "Final Projection": final,
+        "Last5_vs_Season": np.round(last5_vs, 5),
+        "Last10_vs_Season": np.round(last10_vs, 5),
+    })
+    frame = payload_extras(frame, snap, keys, rolling, tagged)
+    logs, vs_logs = pick_logs(snap)
+    lists = {"Last10Stats": log_stats(keys, logs, "NBA", nba_log_fields)}
+    if vs_logs is not None:
+        lists["Last10vsOppStats"] = log_stats(keys, vs_logs, "NBA", nba_log_fields)
+    return frame, lists
+
+
+def build_nba_props(snap):
+    return wire_formats.rows(*payload_table(snap, "props"))
 
-            season_avg = row.get("Season_Avg", None)
-            last5_avg = row.get("Last5_Avg", None)
-            last10_avg = row.get("Last10_Avg", None)
 
-            try:
-                if season_avg in [None, 0] and last10_avg not in [None, 0]:
-                    last5_vs_season = (last5_avg - last10_avg) / last10_avg
-                    last10_vs_season = 0
-                elif season_avg not in [None, 0]:
-                    last5_vs_season = (last5_avg - season_avg) / season_avg if last5_avg not in [None, 0] else 0
-                    last10_vs_season = (last10_avg - season_avg) / season_avg if last10_avg not in [None, 0] else 0
-                else:
-                    last5_vs_season = 0
-                    last10_vs_season = 0
-            except:
-                last5_vs_season = 0
-                last10_vs_season = 0
-
-            props.append({
-                "Player": row.get("Player", ""),
-                "Team": row.get("Team", ""),
-                "Team Name": row.get("Team Name", ""),
-                "Opponent": row.get("Opponent", ""),
-                "Opponent Name": row.get("Opponent Name", ""),
-                "Player Type": row.get("Player Type", "UNKNOWN"),
-                "Prop Type": row.get("Prop Type", row.get("PropType", "")),
-                "Prop Value": row.get("Prop Value", row.get("PropValue", "")),
-                "Tag": row.get("Tag", ""),
-                "MomentumTag": row.get("Momentum Tag",""),
-                "MomentumPattern": row.get("Momentum Pattern",""),
-                "ConfirmedMomentum": row.get("Confirmed Momentum",""),
-                "GuruPotential": row.get("Guru Potential",""),
-                "ZGuruTag": row.get("Z-GURU Tag",""),
-                "GuruConflict": row.get("Guru Conflict"),
-                "LeanDirection": row.get("Lean Direction"),
-                "Confidence": round(conf, 2),
-                "RiskNote": row.get("Risk Note"),
-                "AI Commentary": row.get("AI Commentary"),
-                "GuruPick": row.get("Guru Pick"),
-                "GuruMagic": row.get("Guru Magic"),
-                "Sport": row.get("Sport"),
-                "IsGuruPick": row.get("IsGuru Pick"),
-                "WinProbability": row.get("WinProbability", 0),
-                "GameTime": str(row.get("GameTime", "")) if pd.notna(row.get("GameTime")) else "",
-                "Home/Away": row.get("Home/Away", "home"),
-                "Matchup": row.get("Matchup", f"{row.get('Team', '')} vs {row.get('Opponent', '')}"),
-                "Final Projection": row.get("Final Projection", row.get("FinalAdjustedScore", None)),
-                "Last10Stats": enrich_last10_from_df(row.get("Player", ""), row.get("Prop Type", row.get("PropType", "")),last10_df),
-                "Last10vsOppStats":enrich_last10_from_df(row.get("Player", ""), row.get("Prop Type", row.get("PropType", "")),last10vsOpp_df),
-                "Last5_vs_Season": round(last5_vs_season, 5),
-                "Last10_vs_Season": round(last10_vs_season, 5)
-            })
-
-        return jsonify(pd.DataFrame(props).replace({np.nan: None}).to_dict(orient="records"))
+@app.route("/props")
+def get_nba_props():
+    try:
+        logger.debug("🚀 /props endpoint hit")
+        return serve_payload("props")
     except Exception as e:
-        print(f"❌ Error loading NBA props: {e}")
+        warn_rate_limited(logger, "nba-props-error", "❌ Error loading NBA props: %s", e)
         return jsonify({"error": str(e)})
 
 
+def mlb_props_table(snap):
+    # The MLB props payload column by column, as (frame, list fields)
+    df = snap["sheets"]["All_Picks"]
+    keys = pick_keys(snap)
+    rolling = rolling_fields(snap, keys["role"], keys["player_key"], keys["prop_type"])
+
+    def text(col):
+        return sheet_column(df, col, "").astype(object).astype(str)
+
+    # A blank Player Type is whichever log has the player, batters first
+    ptypes = text("Player Type")
+    blank = ptypes == ""
+    ptypes = ptypes.mask(blank & keys["player_key"].isin(list(recent_games(snap, "Last 10 Pitchers", "player", "date"))).to_numpy(), "Pitcher")
+    ptypes = ptypes.mask(blank & keys["player_key"].isin(list(recent_games(snap, "Last 10 Batters", "player", "date"))).to_numpy(), "Batter")
+    team, opponent = text("Team"), text("Opponent")
+    frame = pd.DataFrame({
+        "Player": text("Player"),
+        "Team": team,
+        "Team Name": text("Team Name"),
+        "Opponent": opponent,
+        "Opponent Name": text("Opponent Name"),
+        "Prop Type": text("Prop Type"),
+        "Player Type": ptypes,
+        "Prop Value": sheet_column(df, "Prop Value", ""),
+        "Tag": sheet_column(df, "Tag", ""),
+        "Confidence": payload_confidence(sheet_column(df, "Confidence", 0)),
+        "WinProbability": sheet_column(df, "WinProbability", ""),
+        "GuruPotential": sheet_column(df, "Guru Potential", ""),
+        "MomentumTag": sheet_column(df, "Momentum Tag", ""),
+        "ZGuruTag": sheet_column(df, "Z-GURU Tag", ""),
+        "GuruConflict": sheet_column(df, "Guru Conflict", ""),
+        "LeanDirection": sheet_column(df, "Lean Direction", ""),
+        "MomentumPattern": sheet_column(df, "Momentum Pattern", ""),
+        "ConfirmedMomentum": sheet_column(df, "Confirmed Momentum", ""),
+        "AI Commentary": sheet_column(df, "AI Commentary", ""),
+        "Sport": sheet_column(df, "Sport", ""),
+        "GuruPick": sheet_column(df, "Guru Pick", ""),
+        "GuruMagic": sheet_column(df, "Guru Magic", ""),
+        "IsGuruPick": sheet_column(df, "IsGuru Pick", ""),
+        "GameTime": sheet_column(df, "GameTime", ""),
+        "Home/Away": sheet_column(df, "Home/Away", "home"),
+        "Matchup": df["Matchup"] if "Matchup" in df.columns else team + " vs " + opponent,
+        "Final Projection": df["Final Projection"] if "Final Projection" in df.columns else sheet_column(df, "FinalAdjustedScore"),
+        "Last5_vs_Season": rolling_stats.fill_missing(df["Last5_vs_Season"], rolling["Last5_vs_Season"]).to_numpy(),
+        "Last10_vs_Season": rolling_stats.fill_missing(df["Last10_vs_Season"], rolling["Last10_vs_Season"]).to_numpy(),
+        "opp_pitcher": sheet_column(df, "opp_pitcher", ""),
+        "opp_era": sheet_column(df, "opp_era"),
+        "opp_hand": sheet_column(df, "opp_hand", ""),
+    })
+    frame = payload_extras(frame, snap, keys, rolling)
+    unmapped = Counter()
+    lists = {"Last10Stats": log_stats(keys, pick_logs(snap)[0], "MLB", mlb_log_fields, unmapped)}
+    if unmapped:
+        logger.warning(
+            "⚠️ %d picks had unmapped stat columns: %s",
+            sum(unmapped.values()),
+            ", ".join(f"{k} ({v})" for k, v in unmapped.most_common()),
+        )
+    return frame, lists
+
+
+def build_mlb_props(snap):
+    return wire_formats.rows(*payload_table(snap, "mlb-props"))
+
+
 @app.route("/mlb-props")
 def get_mlb_props():
     try:
-        print("🚀 /mlb-props endpoint hit")
-        picks_df = pd.read_excel(MLB_FILE_PATH, sheet_name="All_Picks")
-        print("✅ MLB props loaded")
-        last10_batters_df = pd.read_excel(MLB_FILE_PATH, sheet_name="Last 10 Batters")
-        last10_batters_df.columns = last10_batters_df.columns.str.strip().str.lower()
-        print("✅ Last10 batters loaded")
-        last10_pitchers_df = pd.read_excel(MLB_FILE_PATH, sheet_name="Last 10 Pitchers")
-        last10_pitchers_df.columns = last10_pitchers_df.columns.str.strip().str.lower()
-        print("✅ Last10 pitchers loaded")
-
-        props = []
-
-        for _, row in picks_df.iterrows():
-            player = str(row.get("Player", ""))
-            team = str(row.get("Team", ""))
-            teamName = str(row.get("Team Name", ""))
-            opponent = str(row.get("Opponent", ""))
-            opponentName = str(row.get("Opponent Name", ""))
-            playerType = str(row.get("Player Type", ""))
-            prop_type = str(row.get("Prop Type", ""))
-            value = row.get("Prop Value", "")
-            tag = row.get("Tag", "")
-            conf = row.get("Confidence", "")
-            prob = row.get("WinProbability", "")
-            guruP = row.get("Guru Potential","")
-            momentumT = row.get("Momentum Tag","")
-            zgTag = row.get("Z-GURU Tag","")
-            gc = row.get("Guru Conflict","")
-            ld = row.get("Lean Direction","")
-            mp = row.get("Momentum Pattern","")
-            cm = row.get("Confirmed Momentum","")
-            ac = row.get("AI Commentary","")
-            sport = row.get("Sport","")
-            guruPick = row.get("Guru Pick","")
-            guruMagic = row.get("Guru Magic","")
-            isguruPick = row.get("IsGuru Pick","")
-            start = row.get("GameTime", "")
-            ha = row.get("Home/Away", "home")
-            last5_vs_Season = row.get("Last5_vs_Season", None)
-            last10_vs_Season = row.get("Last10_vs_Season", None)
-            ptype = playerType
-            final_projection = row.get("Final Projection", row.get("FinalAdjustedScore", None))
-            pitcher = row.get("opp_pitcher", "") 
-            era = row.get("opp_era", None)
-            hand = row.get("opp_hand", "")
-
-            if not ptype:
-                if player.lower() in last10_batters_df["player"].str.lower().values:
-                    ptype = "Batter"
-                elif player.lower() in last10_pitchers_df["player"].str.lower().values:
-                    ptype = "Pitcher"
-
-            last10_df = last10_batters_df if ptype == "Batter" else last10_pitchers_df
-            subset = last10_df[last10_df["player"].str.lower() == player.lower()]
-
-            last10stats = []
-            if not subset.empty:
-                subset = subset.sort_values(by="date", ascending=False).head(10)
-
-                stat_map = {
-                    "Hits+Runs+RBIs": ["hits", "runs", "rbi"],
-                    "Hits": "hits", "Runs": "runs", "RBIs": "rbi", "Home Runs": "homeruns",
-                    "Pitcher Strikeouts": "strikeouts", "Pitcher Fantasy Score": "pp_fantasy",
-                    "Hitter Fantasy Score": "pp_fantasy", "Total Bases": "totalbases",
-                    "Stolen Bases": "stolenbases", "Walks": "baseonballs", "Hits Allowed": "hits",
-                    "Earned Runs Allowed": "runs", "Doubles": "doubles", "Triples": "triples",
-                    "Singles": "singles", "Hitter Strikeouts": "strikeouts", "Pitching Outs": "outs",
-                    "Pitches Thrown": "numberofpitches", "Walks Allowed": "baseonballs"
-                }
-                stat_col = stat_map.get(prop_type)
-
-                if isinstance(stat_col, list):
-                    subset["value"] = subset[stat_col].sum(axis=1)
-                elif stat_col and stat_col in subset.columns:
-                    subset["value"] = subset[stat_col]
-                else:
-                    print(f"⚠️ Stat column not found: {stat_col} for {player} - {prop_type}")
-                    subset["value"] = None
-
-                for _, srow in subset.iterrows():
-                    last10stats.append({
-                        "Date": pd.to_datetime(srow.get("date")).strftime("%Y-%m-%d") if pd.notna(srow.get("date")) else None,
-                        "Opponent": srow.get("opponent", ""),
-                        "HomeAway": srow.get("home/away", "Home"),
-                        "Team": srow.get("team", ""),
-                        "Matchup": srow.get("matchup", f"{srow.get('team', '')} vs. {srow.get('opponent', '')}"),
-                        "Value": round(srow.get("value", 0), 2) if pd.notna(srow.get("value")) else None
-                    })
-
-            conf = row.get("Confidence", 0)
-            try:
-                conf = float(conf)
-                if conf <= 1:
-                    conf *= 10
-            except:
-                conf = 0
-
-            props.append({
-                "Player": player,
-                "Team": team,
-                "Team Name": teamName,
-                "Opponent": opponent,
-                "Opponent Name": opponentName,
-                "Prop Type": prop_type,
-                "Player Type": ptype,
-                "Prop Value": value,
-                "Tag": tag,
-                "Confidence": round(conf, 2),
-                "WinProbability": prob,
-                "GuruPotential": guruP,
-                "MomentumTag": momentumT,
-                "ZGuruTag":zgTag,
-                "GuruConflict": gc,
-                "LeanDirection": ld,
-                "MomentumPattern": mp,
-                "ConfirmedMomentum": cm,
-                "AI Commentary": ac,
-                "Sport": sport,
-                "GuruPick": guruPick,
-                "GuruMagic": guruMagic,
-                "IsGuruPick": isguruPick,
-                "GameTime": start,
-                "Home/Away": ha,
-                "Matchup": row.get("Matchup", f"{team} vs {opponent}"),
-                "Final Projection": final_projection,
-                "Last10Stats": last10stats,
-                "Last5_vs_Season": last5_vs_Season,
-                "Last10_vs_Season": last10_vs_Season,
-                "opp_pitcher": pitcher,
-                "opp_era": era,
-                "opp_hand": hand
-
-            })
-
-        return jsonify(pd.DataFrame(props).replace({np.nan: None}).to_dict(orient="records"))
+        logger.debug("🚀 /mlb-props endpoint hit")
+        return serve_payload("mlb-props")
     except Exception as e:
-        print(f"❌ Error loading MLB props: {e}")
+        warn_rate_limited(logger, "mlb-props-error", "❌ Error loading MLB props: %s", e)
         return jsonify({"error": str(e)})
 
 
+@app.route("/props/changes")
+def get_nba_prop_changes():
+    try:
+        return serve_changes("props")
+    except Exception as e:
+        warn_rate_limited(logger, "props-changes-error", "❌ Error diffing NBA props: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/mlb-props/changes")
+def get_mlb_prop_changes():
+    try:
+        return serve_changes("mlb-props")
+    except Exception as e:
+        warn_rate_limited(logger, "mlb-props-changes-error", "❌ Error diffing MLB props: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/events")
+def snapshot_events():
+    # SSE stream: "hello" with the current version of each payload, then a
+    # "snapshot" event whenever a reload (or a snapshot_store.py build)
+    # publishes a new one. With SSE_URL set, clients go to event_server.py.
+    last_id = request.headers.get("Last-Event-ID", type=int)
+    if events.SSE_URL:
+        target = events.SSE_URL if last_id is None else f"{events.SSE_URL}?lastEventId={last_id}"
+        return redirect(target, code=307)
+    if snapshot_store.SNAPSHOT_DIR:
+        prebuilt = snapshot_store.current()
+        hello = {name: prebuilt.payload_version(name) for name in PAYLOADS}
+    else:
+        hello = {name: prop_changes.latest(name) for name in PAYLOADS}
+    if not events.open_stream():
+        response = jsonify({"error": "Too many open event streams"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(events.RETRY_MS // 1000)
+        return response
+    response = Response(events.stream(hello, last_id), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
 @app.route("/generate-lineups", methods=["POST"])
+@limit_concurrency()
 def generate_lineups_api():
+    logger.debug("🚀 /generate-lineups endpoint hit")
+    config = request.get_json(silent=True)
+    if not isinstance(config, dict):
+        return jsonify({"error": "request body must be a JSON object"}), 400
+    try:
+        fmt = wire_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        slate = parse_slate(config.get("date"))
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+    if (config.get("weightBy") or None) not in (None, *WEIGHT_MODES):
+        return jsonify({"error": f"weightBy must be one of {', '.join(WEIGHT_MODES)}"}), 400
+    if config.get("maxCV") is not None:
+        try:
+            config["maxCV"] = float(config["maxCV"])
+        except (TypeError, ValueError):
+            return jsonify({"error": "maxCV must be a number"}), 400
+        if np.isnan(config["maxCV"]):
+            return jsonify({"error": "maxCV must be a number"}), 400
+    if config.get("minGames") is not None:
+        try:
+            min_games = float(config["minGames"])
+        except (TypeError, ValueError):
+            min_games = -1.0
+        if isinstance(config["minGames"], bool) or not min_games.is_integer() or min_games < 0:
+            return jsonify({"error": "minGames must be a whole number of at least 0"}), 400
+        config["minGames"] = int(min_games)
+
     try:
-        print("🚀 /generate-lineups endpoint hit")
-        config = request.get_json()
         filter_sports = config.get("sports", [])
 
         if not filter_sports:
@@ -326,29 +662,279 @@ def generate_lineups_api():
         dfs = []
         for sport in filter_sports:
             sport_upper = sport.upper()
-            if sport_upper == "NBA":
-                df = pd.read_excel(NBA_FILE_PATH, sheet_name="All_Picks")
-            elif sport_upper == "MLB":
-                df = pd.read_excel(MLB_FILE_PATH, sheet_name="All_Picks")
+            if sport_upper in ("NBA", "MLB"):
+                with metrics.stage("workbook_load"):
+                    snap = get_snapshot(sport_upper, slate)
+                # Volatility columns for the generator's filters and weights
+                df = snap["sheets"]["All_Picks"].assign(**{
+                    field: values.to_numpy() for field, values in pick_volatility(snap).items()
+                })
             else:
-                print(f"⚠️ Unsupported sport requested: {sport}")
+                warn_rate_limited(logger, f"unsupported-sport:{sport_upper}", "⚠️ Unsupported sport requested: %s", sport)
                 continue
             dfs.append(df)
 
         if not dfs:
             raise ValueError("No valid data loaded for selected sports.")
 
-        # ✅ Combine and proceed
-        df = pd.concat(dfs, ignore_index=True)
+        # ✅ Combine and proceed. Columns a sport leaves empty are dropped
+        # before the concat and put back after, so their dtypes come from
+        # the sports that have them on every pandas version.
+        columns = list(dict.fromkeys(column for frame in dfs for column in frame.columns))
+        df = pd.concat([frame.dropna(axis=1, how="all") for frame in dfs], ignore_index=True).reindex(columns=columns)
+        if fmt != "rows":
+            # One row per leg, numbered by Lineup, straight from the sampled frames
+            frames = generate_lineups_from_config(config, df, as_frames=True)
+            with metrics.stage("serialize"):
+                body = wire_formats.encode(fmt, lineup_table(frames))
+            response = Response(body, mimetype=wire_formats.MIMETYPES[fmt])
+            response.vary.add("Accept")
+            return response
         lineups = generate_lineups_from_config(config, df)
-        print("✅ Lineups generated:", lineups[:1])
-        return jsonify(lineups)
+        logger.debug("✅ Lineups generated: %d, first: %s", len(lineups), lineups[:1])
+        with metrics.stage("serialize"):
+            return jsonify(lineups)
 
+    except SlateNotFound as e:
+        return jsonify({"error": str(e)}), 404
     except Exception as e:
-        print(f"❌ Error generating lineups: {e}")
+        warn_rate_limited(logger, "lineups-error", "❌ Error generating lineups: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
+# Payloads served from a workbook snapshot: name -> (sport, builder). Also
+# what snapshot_store.py pre-renders offline.
+PAYLOADS = {
+    "props": ("NBA", build_nba_props),
+    "mlb-props": ("MLB", build_mlb_props),
+}
+
+
+# Payloads as (frame, list fields): the one implementation behind every
+# encoding, the row JSON of PAYLOADS included
+PAYLOAD_TABLES = {
+    "props": nba_props_table,
+    "mlb-props": mlb_props_table,
+}
+
+
+def payload_table(snap, name):
+    def build(s):
+        with metrics.stage("payload_table"):
+            return PAYLOAD_TABLES[name](s)
+
+    return derived(snap, f"table:{name}", build, depends=tuple(snap["sheets"]))
+
+
+def encoded_payload(snap, name, fmt):
+    # A payload in one of the wire_formats encodings, cached like the JSON
+    def build(s):
+        frame, lists = payload_table(s, name)
+        with metrics.stage("serialize"):
+            return wire_formats.encode(fmt, frame, lists, {"sport": s["sport"]})
+
+    return derived(snap, f"{name}:{fmt}", build, depends=tuple(snap["sheets"]))
+
+
+def warm_payloads():
+    # Called by gunicorn.conf.py in the master so forked workers share the
+    # rendered payloads, and what the other routes derive per snapshot, as
+    # well as the parsed sheets.
+    with app.app_context():
+        for name, (sport, build) in PAYLOADS.items():
+            try:
+                snap = get_snapshot(sport)
+                cached_json_response(snap, name, build)
+                # Workers forked after each reload inherit the master's
+                # change history, so it spans reloads
+                change_table(snap, name)
+            except Exception as e:
+                logger.error("❌ Error pre-rendering %s: %s", name, e)
+        derived_values = {
+            "volatility": pick_volatility,  # /generate-lineups
+            "pick_table": pick_table,  # /top-picks
+            "facets": lambda snap: cached_json_response(snap, "facets", facets.snapshot_facets),
+            "player_index": player_index,  # /players/search
+        }
+        for sport in data_store.WORKBOOKS:
+            for name, build in derived_values.items():
+                try:
+                    build(get_snapshot(sport))
+                except Exception as e:
+                    logger.error("❌ Error pre-building %s %s: %s", sport, name, e)
+
+
+@app.route("/slates")
+def list_slates():
+    loaded = {}
+    for snap in data_store.loaded_snapshots():
+        if snap["slate"] is not None:
+            loaded.setdefault(snap["sport"], []).append(snap["slate"])
+    return jsonify({
+        sport: {"dates": data_store.available_slates(sport), "loaded": sorted(loaded.get(sport, []), reverse=True)}
+        for sport in data_store.WORKBOOKS
+    })
+
+
+@app.route("/facets")
+def get_facets():
+    # Distinct values and counts of every filterable props field, so the
+    # dashboard can render its filters before the props arrive
+    sport = request.args.get("sport", "").upper()
+    if sport not in data_store.WORKBOOKS:
+        return jsonify({"error": f"sport must be one of {', '.join(data_store.WORKBOOKS)}"}), 400
+    try:
+        slate = parse_slate(request.args.get("date"))
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+    try:
+        snap = get_snapshot(sport, slate)
+    except SlateNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    return cached_json_response(snap, "facets", facets.snapshot_facets)
+
+
+def player_index(snap):
+    names = ("All_Picks", *history_db.GAME_LOGS[snap["sport"]])
+    return derived(snap, "player_index", player_search.build_index, depends=names)
+
+
+@app.route("/players/search")
+def search_players():
+    args = request.args
+    sport = args.get("sport", "").upper()
+    if sport not in data_store.WORKBOOKS:
+        return jsonify({"error": f"sport must be one of {', '.join(data_store.WORKBOOKS)}"}), 400
+    try:
+        slate = parse_slate(args.get("date"))
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+    limit = max(1, min(args.get("limit", 10, type=int), player_search.MAX_RESULTS))
+    try:
+        snap = get_snapshot(sport, slate)
+    except SlateNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    with metrics.stage("player_search"):
+        results = player_index(snap).search(args.get("q", ""), limit)
+    return jsonify({"query": args.get("q", ""), "results": results})
+
+
+@app.route("/top-picks")
+def get_top_picks():
+    # ?ranking=confidence|win_probability|hit_rate|edge&limit=&per_sport=
+    # &per_tag=&sports=NBA,MLB&tags=&date=
+    args = request.args
+    ranking = args.get("ranking", "confidence")
+    if ranking not in top_picks.RANKINGS:
+        return jsonify({"error": f"ranking must be one of {', '.join(top_picks.RANKINGS)}"}), 400
+    try:
+        slate = parse_slate(args.get("date"))
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+    sports = [s.strip().upper() for s in args.get("sports", "").split(",") if s.strip()] or list(data_store.WORKBOOKS)
+    if any(sport not in data_store.WORKBOOKS for sport in sports):
+        return jsonify({"error": f"sports must be among {', '.join(data_store.WORKBOOKS)}"}), 400
+    tags = tuple(t.strip() for t in args.get("tags", "").split(",") if t.strip())
+    limit = max(1, min(args.get("limit", top_picks.DEFAULT_LIMIT, type=int), top_picks.MAX_LIMIT))
+    # per_sport/per_tag cap the picks from one sport/tag, 1 to MAX_PER_GROUP
+    caps = {}
+    for name in ("per_sport", "per_tag"):
+        cap = args.get(name, type=int, default=0) if name in args else None
+        if cap is not None and cap < 1:
+            return jsonify({"error": f"{name} must be a whole number of at least 1"}), 400
+        caps[name] = min(cap, top_picks.MAX_PER_GROUP) if cap is not None else None
+    per_sport, per_tag = caps["per_sport"], caps["per_tag"]
+
+    # A dated slate may only exist for some of the sports
+    snaps = []
+    for sport in sports:
+        try:
+            snaps.append(get_snapshot(sport, slate))
+        except SlateNotFound:
+            continue
+    if not snaps:
+        return jsonify({"error": f"No slate for {slate}"}), 404
+
+    def build():
+        with metrics.stage("top_picks"):
+            table = pd.concat([pick_table(snap) for snap in snaps], ignore_index=True)
+            rows = top_picks.select(table, ranking, limit, per_sport, per_tag, tags)
+        return json_payload(top_picks.records(rows, ranking))
+
+    key = (tuple((snap["sport"], snap["slate"], snap["version"]) for snap in snaps), ranking, limit, per_sport, per_tag, tags)
+    return Response(top_picks.cached(key, build), mimetype=app.json.mimetype)
+
+
+def history_query(query):
+    # Shared by the /history routes: sport is required, everything else is
+    # an optional filter answered from the SQLite history indexes
+    sport = request.args.get("sport", "").upper()
+    if sport not in data_store.WORKBOOKS:
+        return jsonify({"error": f"sport must be one of {', '.join(data_store.WORKBOOKS)}"}), 400
+    try:
+        return jsonify(query(sport))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except history_db.HistoryUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+
+
+@app.route("/history/slates")
+def history_slates():
+    return history_query(history_db.slates)
+
+
+@app.route("/history/picks")
+def history_picks():
+    args = request.args
+    return history_query(lambda sport: history_db.find_picks(
+        sport,
+        slate=parse_slate(args.get("date")),
+        player=args.get("player"),
+        tag=args.get("tag"),
+        prop_type=args.get("prop_type"),
+        game=args.get("game"),
+        limit=args.get("limit", history_db.MAX_ROWS, type=int),
+    ))
+
+
+@app.route("/history/games")
+def history_games():
+    args = request.args
+    if not args.get("player"):
+        return jsonify({"error": "player is required"}), 400
+    return history_query(lambda sport: history_db.recent_games(
+        sport,
+        args["player"],
+        log=args.get("log"),
+        before=parse_slate(args.get("before")),
+        limit=args.get("limit", 10, type=int),
+    ))
+
+
+@app.route("/debug/memory")
+def debug_memory():
+    # Same token as the profiler: X-Profile-Token header or ?token=
+    if not token_ok(request.headers.get("X-Profile-Token") or request.args.get("token")):
+        return jsonify({"error": "Not Found"}), 404
+    # werkzeug falls back to the default on a bad value, hence the membership test
+    top = request.args.get("top", type=int) if "top" in request.args else 25
+    frames = request.args.get("frames", type=int) if "frames" in request.args else 1
+    if top is None or not 1 <= top <= 1000:
+        return jsonify({"error": "top must be a whole number from 1 to 1000"}), 400
+    if frames is None or not 1 <= frames <= 100:
+        return jsonify({"error": "frames must be a whole number from 1 to 100"}), 400
+    report = memory_report.memory_report()
+    action = request.args.get("tracemalloc")
+    if action:
+        report["tracemalloc"] = memory_report.tracemalloc_diff(action, top, frames)
+    return jsonify(report)
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
 
 if __name__ == "__main__":
     app.run(debug=True, port=5050)
@@ -0,0 +1,111 @@
+# gunicorn flask_app:app  (picks this file up automatically)
+#
+# The workbooks are parsed once in the master and shared copy-on-write with the
+# workers. A watcher thread in the master re-parses a workbook when it changes
+# and then sends itself SIGHUP: with preload_app the master keeps its in-memory
+# app, so the replacement workers fork with the fresh snapshot already loaded
+# and the reload happens once instead of once per worker.
+#
+# With SNAPSHOT_DIR set, /props and /mlb-props are served from the output of
+# `python snapshot_store.py` instead, and the master skips the workbook parse.
+#
+# /events streams are served by event_server.py, which the master starts on
+# SSE_BIND (empty disables it): route /events there, or set SSE_URL so the
+# app redirects to it. Without either, the app streams from request threads.
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+# Set before the app is imported: every process writes its metrics there and
+# /metrics merges them (see metrics.py)
+os.environ.setdefault("METRICS_DIR", "output/metrics")
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5050")
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+# gthread: the payload and lineup builds are CPU-bound pandas work that
+# never yields, so under a cooperative worker (gevent) one build would stall
+# every other request on the worker. Long-lived /events streams live in
+# event_server.py instead.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+preload_app = True
+
+RELOAD_INTERVAL = float(os.environ.get("PROPS_RELOAD_INTERVAL", "30"))
+SSE_BIND = os.environ.get("SSE_BIND", "0.0.0.0:5051")
+
+_event_server = None
+
+
+def on_starting(server):
+    import metrics
+
+    global _event_server
+    metrics.clear()
+    if SSE_BIND:
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "event_server.py")
+        _event_server = subprocess.Popen([sys.executable, script], env={**os.environ, "SSE_BIND": SSE_BIND})
+        server.log.info("Event server on %s (pid %s)", SSE_BIND, _event_server.pid)
+
+
+def on_exit(server):
+    if _event_server is not None:
+        _event_server.terminate()
+        _event_server.wait(10)
+
+
+def post_fork(server, worker):
+    import metrics
+
+    metrics.reset()
+    metrics.start_flusher()
+
+
+def worker_exit(server, worker):
+    import metrics
+
+    metrics.flush()
+
+
+def child_exit(server, worker):
+    import metrics
+
+    metrics.retire(worker.pid)
+
+
+def when_ready(server):
+    import data_store
+    import flask_app
+    import metrics
+    import snapshot_store
+
+    if snapshot_store.SNAPSHOT_DIR:
+        snap = snapshot_store.current()
+        server.log.info("Serving prebuilt snapshot %s from %s", snap.version, snapshot_store.SNAPSHOT_DIR)
+        return
+
+    data_store.preload_all(warm=flask_app.warm_payloads)
+    metrics.flush()
+    server.log.info("Workbooks preloaded in master (pid %s)", os.getpid())
+    threading.Thread(target=_watch_workbooks, args=(server,), daemon=True).start()
+
+
+def _watch_workbooks(server):
+    import data_store
+    import flask_app
+    import metrics
+
+    while True:
+        time.sleep(RELOAD_INTERVAL)
+        try:
+            changed = data_store.changed_sports()
+            if not changed:
+                continue
+            server.log.info("Workbooks changed (%s), reloading in master", ", ".join(changed))
+            data_store.preload_all(warm=flask_app.warm_payloads)
+            metrics.flush()
+            os.kill(os.getpid(), signal.SIGHUP)
+        except Exception as e:
+            server.log.error("Workbook reload failed: %s", e)
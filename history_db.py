@@ -0,0 +1,335 @@
+import argparse
+import collections
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextvars import ContextVar
+import pandas as pd
+import data_store
+from compact import day_to_date, to_day_numbers
+
+logger = logging.getLogger(__name__)
+
+# SQLite history of every ingested slate, for queries across dates that the
+# in-memory snapshots can't answer without re-reading old workbooks. Fill it
+# after each analysis run:
+#   python history_db.py                    current workbooks
+#   python history_db.py --date 2025-06-24  one slate from SLATE_DIR
+#   python history_db.py --all              current plus every dated slate
+# Picks are stored per slate (re-ingesting a slate replaces it); game logs
+# overlap heavily between slates and are kept once per player and game.
+HISTORY_DB = os.environ.get("HISTORY_DB", "output/history.db")
+
+# Hard cap on rows returned by one query
+MAX_ROWS = 1000
+
+# Game-log sheets and their player/date/matchup columns
+GAME_LOGS = {
+    "NBA": {
+        "Last10_GameLogs": ("Player", "Team", "Opponent", "Date"),
+        "Last10vsOpp_GameLogs": ("Player", "Team", "Opponent", "Date"),
+    },
+    "MLB": {
+        "Last 10 Batters": ("player", "team", "opponent", "date"),
+        "Last 10 Pitchers": ("player", "team", "opponent", "date"),
+    },
+}
+
+# Pick-sheet date column, used to date the current slate
+GAME_DATE_COLUMNS = ("GameDate", "Game Date")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slates (
+    sport TEXT NOT NULL,
+    slate TEXT NOT NULL,
+    version TEXT NOT NULL,
+    picks INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL,
+    PRIMARY KEY (sport, slate)
+);
+CREATE TABLE IF NOT EXISTS picks (
+    id INTEGER PRIMARY KEY,
+    sport TEXT NOT NULL,
+    slate TEXT NOT NULL,
+    player TEXT,
+    player_key TEXT,
+    team TEXT,
+    opponent TEXT,
+    game TEXT,
+    prop_type TEXT,
+    prop_value REAL,
+    tag TEXT,
+    confidence REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS picks_player ON picks (sport, player_key, slate);
+CREATE INDEX IF NOT EXISTS picks_slate ON picks (sport, slate);
+CREATE INDEX IF NOT EXISTS picks_tag ON picks (sport, tag);
+CREATE INDEX IF NOT EXISTS picks_game ON picks (game);
+CREATE INDEX IF NOT EXISTS picks_prop_type ON picks (prop_type);
+CREATE TABLE IF NOT EXISTS game_logs (
+    sport TEXT NOT NULL,
+    log TEXT NOT NULL,
+    player TEXT,
+    player_key TEXT NOT NULL,
+    date TEXT NOT NULL,
+    game TEXT NOT NULL,
+    game_number INTEGER NOT NULL,
+    slate TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (sport, log, player_key, game, game_number)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS game_logs_player ON game_logs (sport, player_key, date);
+CREATE INDEX IF NOT EXISTS game_logs_game ON game_logs (game);
+"""
+
+# (connection, inode) of this thread's reader: a sqlite3 connection may
+# only be used by the thread that opened it, and a gthread worker serves
+# requests from several.
+_reader_conn = ContextVar("history_db_reader", default=None)
+
+
+class HistoryUnavailable(LookupError):
+    pass
+
+
+def player_key(name):
+    return str(name).strip().lower()
+
+
+def game_key(date, team, opponent):
+    # Same key from either side of the matchup, so picks and logs line up
+    first, second = sorted((str(team), str(opponent)))
+    return f"{date} {first}-{second}"
+
+
+def connect(path=HISTORY_DB):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _reader():
+    # One read-only connection per thread; WAL lets reads run alongside an
+    # ingest. Reopened if the database file was replaced.
+    current = _reader_conn.get()
+    try:
+        st = os.stat(HISTORY_DB)
+    except FileNotFoundError:
+        raise HistoryUnavailable(f"No history database at {HISTORY_DB}; run history_db.py") from None
+    if current is None or current[1] != st.st_ino:
+        current = (sqlite3.connect(f"file:{HISTORY_DB}?mode=ro", uri=True, check_same_thread=False), st.st_ino)
+        _reader_conn.set(current)
+    return current[0]
+
+
+# =========================
+# 📥 INGEST
+# =========================
+def _records(df, date_column=None):
+    # Sheet rows as JSON strings, with day-number dates turned back into
+    # ISO dates and NaN as null
+    if date_column is not None:
+        df = df.assign(**{date_column: [
+            d.isoformat() if d else None for d in map(day_to_date, df[date_column])
+        ]})
+    return [json.dumps(row, separators=(",", ":")) for row in json.loads(df.to_json(orient="records"))]
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(value):
+    return None if value is None or value != value else str(value)
+
+
+def _is_date(value):
+    try:
+        return data_store.parse_slate(str(value)) is not None
+    except ValueError:
+        return False
+
+
+def slate_date(picks):
+    # The current workbooks aren't dated: use the most common game date
+    for col in GAME_DATE_COLUMNS:
+        if col in picks.columns:
+            dates = [str(v) for v in picks[col].dropna() if _is_date(v)]
+            if dates:
+                return collections.Counter(dates).most_common(1)[0][0]
+    return time.strftime("%Y-%m-%d")
+
+
+def _pick_rows(sport, slate, picks):
+    rows = []
+    game_dates = next((picks[c] for c in GAME_DATE_COLUMNS if c in picks.columns), None)
+    for i, (data, rec) in enumerate(zip(_records(picks), picks.to_dict("records"))):
+        team, opponent = rec.get("Team"), rec.get("Opponent")
+        game_date = str(game_dates.iat[i]) if game_dates is not None else slate
+        rows.append((
+            sport, slate, _text(rec.get("Player")), player_key(rec.get("Player", "")),
+            _text(team), _text(opponent), game_key(game_date, team, opponent),
+            _text(rec.get("Prop Type", rec.get("PropType"))),
+            _float(rec.get("Prop Value", rec.get("PropValue"))),
+            _text(rec.get("Tag")), _float(rec.get("Confidence")), data,
+        ))
+    return rows
+
+
+def _game_log_rows(sport, slate, log, df, columns):
+    player_col, team_col, opponent_col, date_col = columns
+    rows = []
+    # Doubleheaders give one player two rows for the same date and matchup;
+    # they're told apart by their order in the sheet
+    seen = collections.Counter()
+    records = df[[player_col, team_col, opponent_col, date_col]].to_numpy(object)
+    for (player, team, opponent, day), data in zip(records, _records(df, date_col)):
+        date = day_to_date(day)
+        if date is None or not isinstance(player, str):
+            continue
+        game = game_key(date.isoformat(), team, opponent)
+        key = (player_key(player), game)
+        seen[key] += 1
+        rows.append((sport, log, player, key[0], date.isoformat(), game, seen[key], slate, data))
+    return rows
+
+
+def ingest(sport, slate=None, path=HISTORY_DB, force=False):
+    # slate None ingests the current workbook under its game date
+    snap = data_store.load_snapshot(sport, slate=slate)
+    picks = snap["sheets"]["All_Picks"]
+    slate = slate or slate_date(picks)
+    conn = connect(path)
+    try:
+        known = conn.execute(
+            "SELECT version FROM slates WHERE sport = ? AND slate = ?", (sport, slate)
+        ).fetchone()
+        if known is not None and known[0] == snap["version"] and not force:
+            logger.info("✅ %s %s already ingested (version %s)", sport, slate, snap["version"])
+            return 0
+        pick_rows = _pick_rows(sport, slate, picks)
+        log_rows = []
+        for log, columns in GAME_LOGS[sport].items():
+            log_rows.extend(_game_log_rows(sport, slate, log, snap["sheets"][log], columns))
+        with conn:
+            conn.execute("DELETE FROM picks WHERE sport = ? AND slate = ?", (sport, slate))
+            conn.executemany(
+                "INSERT INTO picks (sport, slate, player, player_key, team, opponent, game, "
+                "prop_type, prop_value, tag, confidence, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                pick_rows,
+            )
+            # A later slate's copy of a game wins
+            conn.executemany(
+                "INSERT INTO game_logs (sport, log, player, player_key, date, game, game_number, slate, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (sport, log, player_key, game, game_number) DO UPDATE SET "
+                "player = excluded.player, date = excluded.date, slate = excluded.slate, data = excluded.data "
+                "WHERE excluded.slate >= game_logs.slate",
+                log_rows,
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO slates (sport, slate, version, picks, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                (sport, slate, snap["version"], len(pick_rows), time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())),
+            )
+        logger.info("📥 %s %s: %d picks, %d game-log rows", sport, slate, len(pick_rows), len(log_rows))
+        return len(pick_rows)
+    finally:
+        conn.close()
+
+
+# =========================
+# 🔎 QUERIES
+# =========================
+def _query(sql, params):
+    return _reader().execute(sql, params).fetchall()
+
+
+def _limit(limit):
+    return max(1, min(int(limit or MAX_ROWS), MAX_ROWS))
+
+
+def slates(sport):
+    rows = _query(
+        "SELECT slate, picks, ingested_at FROM slates WHERE sport = ? ORDER BY slate DESC", (sport,)
+    )
+    return [{"date": slate, "picks": picks, "ingested_at": at} for slate, picks, at in rows]
+
+
+def find_picks(sport, slate=None, player=None, tag=None, prop_type=None, game=None, limit=MAX_ROWS):
+    # Every filter is an equality on an indexed column
+    where = ["sport = ?"]
+    params = [sport]
+    for column, value in (
+        ("slate", slate), ("player_key", player and player_key(player)),
+        ("tag", tag), ("prop_type", prop_type), ("game", game),
+    ):
+        if value:
+            where.append(f"{column} = ?")
+            params.append(value)
+    rows = _query(
+        f"SELECT slate, game, data FROM picks WHERE {' AND '.join(where)} ORDER BY slate DESC, id LIMIT ?",
+        params + [_limit(limit)],
+    )
+    return [{"Slate": slate, "Game": game, **json.loads(data)} for slate, game, data in rows]
+
+
+def recent_games(sport, player, log=None, before=None, limit=10):
+    # A player's newest games, newest first, straight off (sport, player, date)
+    where = ["sport = ?", "player_key = ?"]
+    params = [sport, player_key(player)]
+    if log:
+        where.append("log = ?")
+        params.append(log)
+    if before:
+        where.append("date < ?")
+        params.append(before)
+    rows = _query(
+        f"SELECT log, game, data FROM game_logs WHERE {' AND '.join(where)} "
+        "ORDER BY date DESC, game_number DESC LIMIT ?",
+        params + [_limit(limit)],
+    )
+    return [{"Log": log, "Game": game, **json.loads(data)} for log, game, data in rows]
+
+
+def game_log_sheets(sport):
+    # Every stored game-log row, one frame per sheet shaped like the loaded
+    # sheets (dates as day numbers), oldest first
+    frames = {}
+    rows = _query(
+        "SELECT log, data FROM game_logs WHERE sport = ? ORDER BY log, date, game_number", (sport,)
+    )
+    for log in GAME_LOGS[sport]:
+        data = [json.loads(d) for name, d in rows if name == log]
+        if data:
+            df = pd.DataFrame(data)
+            date_col = GAME_LOGS[sport][log][3]
+            df[date_col] = to_day_numbers(df[date_col])
+            frames[log] = df
+    return frames
+
+
+if __name__ == "__main__":
+    from log_utils import configure_logging
+
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Ingest workbook slates into the SQLite history database")
+    parser.add_argument("--db", default=HISTORY_DB)
+    parser.add_argument("--sport", choices=sorted(data_store.WORKBOOKS), action="append")
+    parser.add_argument("--date", type=data_store.parse_slate, help="dated slate from SLATE_DIR (default: current workbooks)")
+    parser.add_argument("--all", action="store_true", help="current workbooks plus every dated slate")
+    parser.add_argument("--force", action="store_true", help="re-ingest slates whose workbook is unchanged")
+    args = parser.parse_args()
+
+    for sport in args.sport or data_store.WORKBOOKS:
+        targets = [args.date] if args.date else [None]
+        if args.all:
+            targets = [None] + data_store.available_slates(sport)
+        for slate in targets:
+            ingest(sport, slate, args.db, args.force)
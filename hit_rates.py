@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from stat_maps import stat_values
+
+# Line-clearance fields added to every prop, measured against the prop's
+# current line over the same game-log rows Last10Stats shows:
+#   Last5HitRate / Last10HitRate  share of games the value went over the line
+#   VsOppHitRate                  same, over games against the prop's opponent
+#   Last10AvgMargin               mean (value - line)
+#   LineStreak                    +n: the last n games went over, -n: under
+FIELDS = ["Last5HitRate", "Last10HitRate", "VsOppHitRate", "Last10AvgMargin", "LineStreak"]
+
+
+def ranked_games(sheet, recent):
+    # recent_games() index -> one frame of every player's rows, with
+    # player_key and rank (0 = most recent) in the order Last10Stats uses.
+    # The indexed frames keep the sheet's row labels, so this is a single
+    # take from the sheet rather than a concat of one frame per player.
+    if not recent:
+        return None
+    keys = list(recent)
+    lengths = [len(recent[k]) for k in keys]
+    labels = np.concatenate([recent[k].index.to_numpy() for k in keys])
+    df = sheet.take(sheet.index.get_indexer(labels)).reset_index(drop=True)
+    df["player_key"] = np.repeat(np.array(keys, dtype=object), lengths)
+    df["rank"] = np.concatenate([np.arange(n) for n in lengths])
+    return df
+
+
+def pick_games(picks, logs, sport, opponent_col):
+    # Every (pick, game) pair with the game's settled value for the pick's
+    # prop type; values are computed once per prop type over all the logs
+    pieces = []
+    for (role, prop_type), rows in picks.groupby(["role", "prop_type"], sort=False).indices.items():
+        games = logs.get(role)
+        if games is None:
+            continue
+        values = stat_values(games, sport, prop_type)
+        if values is None:
+            continue
+        table = pd.DataFrame({
+            "player_key": games["player_key"].to_numpy(),
+            "rank": games["rank"].to_numpy(),
+            "value": values.to_numpy(np.float64),
+            "game_opponent": games[opponent_col].astype(object).to_numpy() if opponent_col else None,
+        })
+        pieces.append(picks.iloc[rows][["pick", "player_key", "line", "opponent"]].merge(table, on="player_key"))
+    if not pieces:
+        return None
+    return pd.concat(pieces, ignore_index=True).sort_values(["pick", "rank"], kind="stable")
+
+
+def _hit(pairs):
+    diff = pairs["value"] - pairs["line"]
+    return diff, (diff > 0).astype(np.float64).where(diff.notna())
+
+
+def _streak(pick, diff):
+    # Length of the leading run of games on the same side of the line as
+    # the most recent one, signed by that side; a push or missing value
+    # ends the run
+    sign = pd.Series(np.sign(diff.to_numpy()), index=diff.index).fillna(0)
+    first = sign.groupby(pick).transform("first")
+    run = (sign != first).groupby(pick).cummax()
+    length = (~run).groupby(pick).sum()
+    return (sign.groupby(pick).first() * length).where(sign.groupby(pick).first() != 0, 0)
+
+
+def line_stats(picks, logs, sport, opponent_col=None, vs_logs=None):
+    # picks: one row per prop with player_key, prop_type, line, opponent and
+    # role (the key of logs, a dict of ranked_games() frames). Head-to-head
+    # rates come from vs_logs when the workbook has a dedicated sheet,
+    # otherwise from the rows of logs against the prop's opponent.
+    # Returns FIELDS aligned with picks; NaN where there's nothing to count.
+    picks = picks.reset_index(drop=True).assign(pick=np.arange(len(picks)))
+    picks["line"] = pd.to_numeric(picks["line"], errors="coerce")
+    out = pd.DataFrame(np.nan, index=picks.index, columns=FIELDS)
+
+    pairs = pick_games(picks, logs, sport, opponent_col)
+    if pairs is not None:
+        diff, hit = _hit(pairs)
+        pick = pairs["pick"]
+        out["Last10HitRate"] = hit.groupby(pick).mean()
+        out["Last5HitRate"] = hit.where(pairs["rank"] < 5).groupby(pick).mean()
+        out["Last10AvgMargin"] = diff.groupby(pick).mean()
+        out["LineStreak"] = _streak(pick, diff)
+        if vs_logs is None and opponent_col:
+            same = pairs["game_opponent"] == pairs["opponent"].astype(object)
+            out["VsOppHitRate"] = hit.where(same).groupby(pick).mean()
+
+    if vs_logs is not None:
+        vs_pairs = pick_games(picks, vs_logs, sport, None)
+        if vs_pairs is not None:
+            out["VsOppHitRate"] = _hit(vs_pairs)[1].groupby(vs_pairs["pick"]).mean()
+
+    rates = ["Last5HitRate", "Last10HitRate", "VsOppHitRate"]
+    out[rates] = out[rates].round(3)
+    out["Last10AvgMargin"] = out["Last10AvgMargin"].round(2)
+    return out
@@ -1,7 +1,39 @@
+import logging
 import numpy as np
 import pandas as pd
 import random
 from itertools import combinations
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Leg sampling weights built from the volatility columns (StatCV etc.):
+#   consistency  steadier stats first: 1 / (1 + StatCV)
+#   cushion      legs whose p10 (overs) / p90 (unders) clears the line,
+#                in standard deviations: exp(clearance / StatStd)
+WEIGHT_MODES = ("consistency", "cushion")
+MAX_CUSHION = 3.0
+
+
+def leg_weights(pool, weight_by, side):
+    # Sampling weights for a pool of legs, or None for uniform sampling.
+    # Legs without game logs get the pool's median weight.
+    if weight_by is None or pool.empty or "StatCV" not in pool.columns:
+        return None
+    if weight_by == "consistency":
+        weights = 1 / (1 + pd.to_numeric(pool["StatCV"], errors="coerce"))
+    else:
+        line = pd.to_numeric(pool["Prop Value"], errors="coerce")
+        if side == "over":
+            clearance = pd.to_numeric(pool["StatFloor"], errors="coerce") - line
+        else:
+            clearance = line - pd.to_numeric(pool["StatCeiling"], errors="coerce")
+        scale = pd.to_numeric(pool["StatStd"], errors="coerce")
+        scale = scale.where(scale > 0, 1.0)
+        weights = np.exp((clearance / scale).clip(-MAX_CUSHION, MAX_CUSHION))
+    if weights.isna().all():
+        return None
+    return weights.fillna(weights.median())
 
 # =========================
 # 🎯 CORE LINEUP GENERATOR
@@ -13,21 +45,24 @@ def generate_lineups(
     allowed_tags=None,
     filter_games=None,
     max_lineups=10,
-    seed=None
+    seed=None,
+    max_cv=None,
+    min_games=0,
+    weight_by=None
 ):
     if isinstance(df, list):
-        print("⚠️ Received a list instead of DataFrame, converting...")
+        logger.debug("⚠️ Received a list instead of DataFrame, converting...")
         try:
             df = pd.DataFrame(df)
-            print("✅ Converted to DataFrame — columns:", df.columns.tolist())
+            logger.debug("✅ Converted to DataFrame — columns: %s", df.columns.tolist())
         except Exception as e:
-            print("❌ Failed to convert list to DataFrame:", e)
+            logger.error("❌ Failed to convert list to DataFrame: %s", e)
             return []
 
     if seed is not None:
         random.seed(seed)
 
-    print(f"🎯 Generating lineups — Mix: {mix_type}, Size: {lineup_size}, Max: {max_lineups}")
+    logger.debug("🎯 Generating lineups — Mix: %s, Size: %s, Max: %s", mix_type, lineup_size, max_lineups)
 
     if allowed_tags is None:
         allowed_tags = ["MEGA SMASH", "SMASH", "GOOD", "LEAN", "FADE/UNDER"]
@@ -38,11 +73,21 @@ def generate_lineups(
     df_filtered["Player"] = df_filtered["Player"].astype(str).str.strip()
     df_filtered["Team"] = df_filtered["Team"].astype(str).str.strip()
     df_filtered["Opponent"] = df_filtered["Opponent"].astype(str).str.strip()
-    df_filtered["Game"] = df_filtered["Team"] + " vs " + df_filtered["Opponent"] + " (" + df_filtered["Sport"] + ")"
+    df_filtered["Game"] = df_filtered["Team"] + " vs " + df_filtered["Opponent"] + " (" + df_filtered["Sport"].astype(str) + ")"
 
     if filter_games:
         df_filtered = df_filtered[df_filtered["Game"].isin(filter_games)]
 
+    # Volatility filters only apply when the frame carries the columns; legs
+    # without game logs pass max_cv but not min_games
+    if "StatCV" in df_filtered.columns:
+        if max_cv is not None:
+            df_filtered = df_filtered[~(pd.to_numeric(df_filtered["StatCV"], errors="coerce") > max_cv)]
+        if min_games:
+            df_filtered = df_filtered[pd.to_numeric(df_filtered["StatGames"], errors="coerce").fillna(0) >= min_games]
+    if weight_by is not None and weight_by not in WEIGHT_MODES:
+        raise ValueError("Invalid weight_by. Valid modes: " + ", ".join(WEIGHT_MODES))
+
     over_tags = ["MEGA SMASH", "SMASH", "GOOD"]
     under_tags = ["FADE/UNDER"]
     if "LEAN" in allowed_tags:
@@ -59,15 +104,18 @@ def generate_lineups(
     overs = df_filtered[df_filtered["Tag"].isin(over_tags)]
     unders = df_filtered[df_filtered["Tag"].isin(under_tags)]
 
-    print(f"📦 Pool sizes — Over: {len(overs)}, Under: {len(unders)}")
+    over_weights = leg_weights(overs, weight_by, "over")
+    under_weights = leg_weights(unders, weight_by, "under")
+
+    logger.debug("📦 Pool sizes — Over: %d, Under: %d", len(overs), len(unders))
 
     lineups = []
     attempts = 0
     seen = set()
 
     while len(lineups) < max_lineups and attempts < 500:
-        over_sample = overs.sample(n=min(num_over, len(overs)), replace=False) if num_over > 0 else pd.DataFrame()
-        under_sample = unders.sample(n=min(num_under, len(unders)), replace=False) if num_under > 0 else pd.DataFrame()
+        over_sample = overs.sample(n=min(num_over, len(overs)), replace=False, weights=over_weights) if num_over > 0 else pd.DataFrame()
+        under_sample = unders.sample(n=min(num_under, len(unders)), replace=False, weights=under_weights) if num_under > 0 else pd.DataFrame()
         lineup_df = pd.concat([over_sample, under_sample])
 
         if len(lineup_df) != lineup_size:
@@ -92,25 +140,37 @@ def generate_lineups(
         lineups.append(lineup_df)
         attempts += 1
 
-    print(f"✅ {len(lineups)} lineups generated (from {attempts} attempts)")
+    logger.debug("✅ %d lineups generated (from %d attempts)", len(lineups), attempts)
     return lineups
 
-def generate_lineups_from_config(config, df):
-    print("📦 Config Received:")
+def lineup_table(lineups):
+    # Lineup frames as one frame of legs, numbered by Lineup from 1
+    if not lineups:
+        return pd.DataFrame({"Lineup": pd.Series(dtype=np.int64)})
+    legs = pd.concat(lineups, ignore_index=True)
+    legs.insert(0, "Lineup", np.repeat(np.arange(1, len(lineups) + 1), [len(lineup) for lineup in lineups]))
+    return legs
+
+
+def generate_lineups_from_config(config, df, as_frames=False):
+    # Lineups as lists of leg dicts, or the sampled frames with as_frames
     home_away_filter = config.get("homeAway", "")
     filter_games = config.get("filterGames", [])
     filter_tags = config.get("filterTags", [])
     selected_sports = config.get("sports", [])
     mix_type = config.get("mixType", "3_OVER_3_UNDER")
     max_lineups = config.get("maxLineups", 10)
+    max_cv = config.get("maxCV")
+    min_games = config.get("minGames", 0)
+    weight_by = config.get("weightBy") or None
 
-    print("  ▶️ homeAway:", home_away_filter)
-    print("  ▶️ filterGames:", filter_games)
-    print("  ▶️ filterTags:", filter_tags)
-    print("  ▶️ sports:", selected_sports)
+    logger.debug(
+        "📦 Config Received: homeAway=%s filterGames=%s filterTags=%s sports=%s",
+        home_away_filter, filter_games, filter_tags, selected_sports,
+    )
 
     if df is None:
-        print("❌ DataFrame 'df' is None. Cannot generate lineups.")
+        logger.error("❌ DataFrame 'df' is None. Cannot generate lineups.")
         return []
 
     if not isinstance(filter_games, list): filter_games = []
@@ -122,7 +182,7 @@ def generate_lineups_from_config(config, df):
         if selected_sports:
             df = df[df["Sport"].isin([s.lower() for s in selected_sports])]
     else:
-        print("⚠️ No 'Sport' column found in dataset — skipping sport filtering.")
+        logger.warning("⚠️ No 'Sport' column found in dataset — skipping sport filtering.")
 
     if home_away_filter in ["home", "away"]:
         df = df[df["Home/Away"].str.strip().str.lower() == home_away_filter]
@@ -134,35 +194,44 @@ def generate_lineups_from_config(config, df):
         df = df[df["Tag"].isin(filter_tags)]
 
     try:
-        print("🧪 Sample tags:", df["Tag"].dropna().unique()[:5])
-        print("🧪 Sample teams:", df["Team"].dropna().unique()[:5])
-        print("🧪 Sample opponents:", df["Opponent"].dropna().unique()[:5])
-        print("🧪 Tag counts:", df["Tag"].value_counts())
-
-        lineups = generate_lineups(
-            df,
-            lineup_size=6,
-            mix_type=mix_type,
-            max_lineups=max_lineups,
-            allowed_tags=["MEGA SMASH", "SMASH", "GOOD", "LEAN", "FADE/UNDER"]
-        )
+        # Only build the sample dumps when someone is going to read them
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🧪 Sample tags: %s", df["Tag"].dropna().unique()[:5])
+            logger.debug("🧪 Sample teams: %s", df["Team"].dropna().unique()[:5])
+            logger.debug("🧪 Sample opponents: %s", df["Opponent"].dropna().unique()[:5])
+            logger.debug("🧪 Tag counts: %s", df["Tag"].value_counts().to_dict())
+
+        with metrics.stage("lineup_sampling"):
+            lineups = generate_lineups(
+                df,
+                lineup_size=6,
+                mix_type=mix_type,
+                max_lineups=max_lineups,
+                max_cv=float(max_cv) if max_cv is not None else None,
+                min_games=int(min_games or 0),
+                weight_by=weight_by,
+                allowed_tags=["MEGA SMASH", "SMASH", "GOOD", "LEAN", "FADE/UNDER"]
+            )
 
         if not lineups:
-            print("⚠️ No lineups returned.")
+            logger.debug("⚠️ No lineups returned.")
             return []
+        if as_frames:
+            return lineups
 
         sanitized = []
-        for lineup in lineups:
-            if isinstance(lineup, pd.DataFrame):
-                df_clean = lineup.replace({np.nan: None, np.inf: None, -np.inf: None})
-                sanitized.append(df_clean.to_dict(orient="records"))
-            else:
-                print("⚠️ Unexpected lineup type:", type(lineup))
+        with metrics.stage("sanitize"):
+            for lineup in lineups:
+                if isinstance(lineup, pd.DataFrame):
+                    df_clean = lineup.replace({np.nan: None, np.inf: None, -np.inf: None})
+                    sanitized.append(df_clean.to_dict(orient="records"))
+                else:
+                    logger.warning("⚠️ Unexpected lineup type: %s", type(lineup))
 
         return sanitized
 
     except Exception as e:
-        print("❌ Failed inside generate_lineups_from_config:", e)
+        logger.error("❌ Failed inside generate_lineups_from_config: %s", e)
         return []
 
 # =========================
@@ -176,4 +245,4 @@ def write_lineups_to_excel(lineups_dict, writer):
                 rows.append({"Lineup": idx, **row})
         out_df = pd.DataFrame(rows)
         out_df.to_excel(writer, sheet_name=mix_name[:31], index=False)
-        print(f"🗕️ Saved {len(lineup_list)} lineups to sheet: {mix_name}")
+        logger.info("🗕️ Saved %d lineups to sheet: %s", len(lineup_list), mix_name)
@@ -0,0 +1,31 @@
+import logging
+import os
+import threading
+import time
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+_rate_lock = threading.Lock()
+_last_emit = {}
+
+
+def configure_logging():
+    # No-op when the host (gunicorn, tests) has already configured the root logger
+    logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+    logging.getLogger().setLevel(LOG_LEVEL)
+
+
+def warn_rate_limited(logger, key, msg, *args, interval=60.0):
+    # Logs at most one warning per key per interval; the next one that gets
+    # through reports how many were suppressed in between.
+    now = time.monotonic()
+    with _rate_lock:
+        last, suppressed = _last_emit.get(key, (None, 0))
+        if last is not None and now - last < interval:
+            _last_emit[key] = (last, suppressed + 1)
+            return
+        _last_emit[key] = (now, 0)
+    if suppressed:
+        msg = f"{msg} ({suppressed} similar warnings suppressed)"
+    logger.warning(msg, *args)
@@ -0,0 +1,170 @@
+import gc
+import resource
+import sys
+import tracemalloc
+import pandas as pd
+import data_store
+from compact import day_to_date
+import prop_changes
+import rolling_stats
+import top_picks
+
+_previous_trace = None
+
+
+def process_memory():
+    # Current RSS from /proc (Linux); ru_maxrss is the peak (KiB on Linux)
+    rss = None
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                    break
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak *= 1024
+    return {"rss_bytes": rss, "peak_rss_bytes": peak, "gc_frozen_objects": gc.get_freeze_count()}
+
+
+def deep_sizeof(obj, seen=None):
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True, index=True)
+        return int(usage.sum()) if isinstance(obj, pd.DataFrame) else int(usage)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    elif hasattr(obj, "nbytes"):
+        size += int(obj.nbytes)
+    return size
+
+
+def frame_memory(df):
+    usage = df.memory_usage(deep=True, index=True)
+    return {
+        "rows": len(df),
+        "bytes": int(usage.sum()),
+        "columns": {str(col): int(n) for col, n in usage.sort_values(ascending=False).items()},
+    }
+
+
+def _cache_layer(value):
+    # Rendered API payloads are bytes; everything else derived from a
+    # snapshot (lookup tables, indexes, frames) is grouped as an index.
+    return "responses" if isinstance(value, (bytes, bytearray, memoryview)) else "indexes"
+
+
+def snapshot_memory(snap):
+    sheets = {name: frame_memory(df) for name, df in snap["sheets"].items()}
+    layers = {}
+    for name, value in list(snap["derived"].items()):
+        layer = layers.setdefault(_cache_layer(value), {"bytes": 0, "entries": {}})
+        size = deep_sizeof(value)
+        layer["entries"][name] = size
+        layer["bytes"] += size
+    return {
+        "version": snap["version"],
+        "estimated_bytes": data_store.snapshot_bytes(snap),
+        "sheets_bytes": sum(s["bytes"] for s in sheets.values()),
+        "compaction": snap.get("compaction", {}),
+        "sheets": sheets,
+        "caches": layers,
+    }
+
+
+def process_caches():
+    # Caches that outlive snapshots: the incremental rolling-stats engines,
+    # the /top-picks results and the /props/changes version history
+    engines = {}
+    for sport, engine in rolling_stats.engines().items():
+        frames = engine.frames()
+        engines[sport] = {
+            "season_start": day_to_date(engine.season).isoformat() if engine.season is not None else None,
+            "game_rows": len(frames[0]) if frames[0] is not None else 0,
+            "bytes": deep_sizeof(frames),
+        }
+    results = top_picks.cached_results()
+    history = {
+        name: {"versions": len(versions), "bytes": deep_sizeof(versions)}
+        for name, versions in prop_changes.history().items()
+    }
+    return {
+        "rolling_stats": engines,
+        "top_picks": {"entries": len(results), "max_entries": top_picks.MAX_CACHED, "bytes": deep_sizeof(results)},
+        "prop_changes": history,
+    }
+
+
+def tracemalloc_diff(action, top=25, frames=1):
+    # start -> begin tracing; snapshot -> top-N growth since the previous
+    # snapshot (or since start); stop -> stop tracing and drop the baseline
+    global _previous_trace
+    if action == "start":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _previous_trace = tracemalloc.take_snapshot()
+        return {"tracing": True}
+    if action == "stop":
+        tracemalloc.stop()
+        _previous_trace = None
+        return {"tracing": False}
+    if not tracemalloc.is_tracing():
+        return {"tracing": False, "error": "tracemalloc is not running, call with tracemalloc=start first"}
+
+    current = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    stats = current.compare_to(_previous_trace, "lineno") if _previous_trace is not None else current.statistics("lineno")
+    _previous_trace = current
+    traced, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "traced_bytes": traced,
+        "traced_peak_bytes": peak,
+        "top": [
+            {
+                "location": str(stat.traceback[0]),
+                "size_bytes": stat.size,
+                "size_diff_bytes": getattr(stat, "size_diff", stat.size),
+                "count": stat.count,
+                "count_diff": getattr(stat, "count_diff", stat.count),
+            }
+            for stat in stats[:top]
+        ],
+    }
+
+
+def memory_report():
+    snapshots = {
+        snap["sport"] if snap["slate"] is None else f"{snap['sport']}@{snap['slate']}": snapshot_memory(snap)
+        for snap in data_store.loaded_snapshots()
+    }
+    caches = process_caches()
+    return {
+        "process": process_memory(),
+        "snapshots": snapshots,
+        "process_caches": caches,
+        "totals": {
+            "slate_budget_bytes": data_store.SLATE_MEMORY_BUDGET,
+            "sheets_bytes": sum(s["sheets_bytes"] for s in snapshots.values()),
+            "cache_bytes": {
+                layer: sum(s["caches"].get(layer, {}).get("bytes", 0) for s in snapshots.values())
+                for layer in ("responses", "indexes")
+            },
+            "process_cache_bytes": (
+                sum(engine["bytes"] for engine in caches["rolling_stats"].values())
+                + caches["top_picks"]["bytes"]
+                + sum(entry["bytes"] for entry in caches["prop_changes"].values())
+            ),
+        },
+    }
@@ -0,0 +1,302 @@
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Under gunicorn every process counts its own requests. With METRICS_DIR set
+# (gunicorn.conf.py does) each one writes its metrics to <pid>.json there,
+# from a thread that checks for changes every FLUSH_SECONDS, and a scrape of any worker merges all the
+# files: counters, histograms and gauges are summed across processes (the
+# gauges are per-pool in-flight and queue depths, which add up). The master
+# folds an exited worker's counters and histograms into RETIRED_FILE, so
+# totals never go backwards when workers restart. Unset, /metrics reports
+# the one process it runs in.
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", "1"))
+RETIRED_FILE = "retired.json"
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}
+_help = {}
+_changes = 0
+_flushed = None
+_flush_lock = threading.Lock()
+# Per-request stage timing, per context: the request threads of a gthread
+# worker each time their own request.
+_timing = ContextVar("metrics_timing", default=None)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def describe(name, help_text):
+    _help[name] = help_text
+
+
+describe("stage_duration_seconds", "Time spent in each stage of a request, excluding nested stages.")
+describe("http_request_duration_seconds", "End-to-end request handling time.")
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    global _changes
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+        _changes += 1
+
+
+def set_gauge(name, value, **labels):
+    global _changes
+    with _lock:
+        _gauges[_key(name, labels)] = value
+        _changes += 1
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    global _changes
+    key = _key(name, labels)
+    with _lock:
+        _changes += 1
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            _histograms[key] = hist
+        i = bisect.bisect_left(hist["buckets"], value)
+        if i < len(hist["counts"]):
+            hist["counts"][i] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+# =========================
+# ⏱️ PER-STAGE REQUEST TIMING
+# =========================
+def begin_request():
+    _timing.set({"stages": {}, "stack": [], "start": time.perf_counter()})
+
+
+@contextmanager
+def stage(name):
+    # Stages nest: a parent's time excludes its children, so the stages of a
+    # request add up to (at most) its total. Repeated stages accumulate.
+    # Outside a request they're observed one by one as route="background".
+    timing = _timing.get()
+    if timing is None:
+        timing = {"stages": None, "stack": [], "start": time.perf_counter()}
+        _timing.set(timing)
+    stack = timing["stack"]
+    frame = [time.perf_counter(), 0.0]
+    stack.append(frame)
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - frame[0]
+        stack.pop()
+        if stack:
+            stack[-1][1] += elapsed
+        own = elapsed - frame[1]
+        stages = timing["stages"]
+        if stages is None:
+            observe("stage_duration_seconds", own, route="background", stage=name)
+        else:
+            stages[name] = stages.get(name, 0.0) + own
+
+
+def end_request(route, method, status):
+    timing = _timing.get() or {}
+    stages = timing.get("stages") or {}
+    total = time.perf_counter() - timing.get("start", time.perf_counter())
+    _timing.set(None)
+    for name, seconds in stages.items():
+        observe("stage_duration_seconds", seconds, route=route, stage=name)
+    observe("http_request_duration_seconds", total, route=route, method=method, status=status)
+    return stages, total
+
+
+def server_timing_header(stages, total):
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in stages.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _header(lines, seen, name, kind):
+    if name in seen:
+        return
+    seen.add(name)
+    if name in _help:
+        lines.append(f"# HELP {name} {_help[name]}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+# =========================
+# 🧮 CROSS-PROCESS AGGREGATION
+# =========================
+def _state():
+    with _lock:
+        return _changes, {
+            "counters": [[name, labels, value] for (name, labels), value in _counters.items()],
+            "gauges": [[name, labels, value] for (name, labels), value in _gauges.items()],
+            "histograms": [[name, labels, h["buckets"], list(h["counts"]), h["sum"], h["count"]] for (name, labels), h in _histograms.items()],
+        }
+
+
+def _write(path, state):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _merge(totals, state, gauges=True):
+    # Adds a process state (as written to its file) into totals: dicts
+    # keyed like the module's own
+    counters, gauge_values, histograms = totals
+    for name, labels, value in state["counters"]:
+        key = (name, tuple(tuple(label) for label in labels))
+        counters[key] = counters.get(key, 0) + value
+    if gauges:
+        for name, labels, value in state["gauges"]:
+            key = (name, tuple(tuple(label) for label in labels))
+            gauge_values[key] = gauge_values.get(key, 0) + value
+    for name, labels, buckets, counts, total, count in state["histograms"]:
+        key = (name, tuple(tuple(label) for label in labels))
+        hist = histograms.setdefault(key, {"buckets": tuple(buckets), "counts": [0] * len(counts), "sum": 0.0, "count": 0})
+        hist["counts"] = [a + b for a, b in zip(hist["counts"], counts)]
+        hist["sum"] += total
+        hist["count"] += count
+
+
+def _totals(states, gauges=True):
+    totals = ({}, {}, {})
+    for state in states:
+        if state is not None:
+            _merge(totals, state, gauges)
+    return totals
+
+
+def _as_state(totals):
+    counters, gauges, histograms = totals
+    return {
+        "counters": [[name, labels, value] for (name, labels), value in counters.items()],
+        "gauges": [[name, labels, value] for (name, labels), value in gauges.items()],
+        "histograms": [[name, labels, h["buckets"], h["counts"], h["sum"], h["count"]] for (name, labels), h in histograms.items()],
+    }
+
+
+def flush():
+    # Writes this process's metrics to METRICS_DIR/<pid>.json if they
+    # changed since the last write
+    global _flushed
+    if not METRICS_DIR:
+        return
+    with _flush_lock:
+        changes, state = _state()
+        if changes == _flushed:
+            return
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        _write(os.path.join(METRICS_DIR, f"{os.getpid()}.json"), state)
+        _flushed = changes
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def start_flusher():
+    # Worker, after fork
+    if METRICS_DIR:
+        threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+
+
+def reset():
+    # For a freshly forked worker: what it inherited is the master's, which
+    # the master reports itself
+    global _flushed
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+    _flushed = None
+
+
+def retire(pid):
+    # Master, once a worker exited: its counters and histograms move into
+    # RETIRED_FILE and its gauges are dropped
+    if not METRICS_DIR:
+        return
+    path = os.path.join(METRICS_DIR, f"{pid}.json")
+    state = _read(path)
+    if state is not None:
+        retired = os.path.join(METRICS_DIR, RETIRED_FILE)
+        _write(retired, _as_state(_totals([_read(retired), state], gauges=False)))
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def clear():
+    # Master, at startup: files left by an earlier run
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.json")) if METRICS_DIR else []:
+        os.remove(path)
+
+
+def render_prometheus():
+    # Prometheus text exposition format (version 0.0.4)
+    if METRICS_DIR:
+        flush()
+        counters, gauges, histograms = _totals(_read(path) for path in glob.glob(os.path.join(METRICS_DIR, "*.json")))
+    else:
+        with _lock:
+            counters, gauges = dict(_counters), dict(_gauges)
+            histograms = {key: {**h, "counts": list(h["counts"])} for key, h in _histograms.items()}
+    lines = []
+    seen = set()
+    for (name, labels), value in sorted(counters.items()):
+        _header(lines, seen, name, "counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), value in sorted(gauges.items()):
+        _header(lines, seen, name, "gauge")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), hist in sorted(histograms.items(), key=lambda item: item[0]):
+        _header(lines, seen, name, "histogram")
+        cumulative = 0
+        for le, count in zip(hist["buckets"], hist["counts"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {hist['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {hist['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+    return "\n".join(lines) + "\n"
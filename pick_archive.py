@@ -0,0 +1,332 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import data_store
+import history_db
+from compact import MISSING_DAY, to_day_numbers
+from stat_maps import LOG_ROLES, stat_columns, stat_values
+
+logger = logging.getLogger(__name__)
+
+# Columnar archive of every slate, for grading picks once their games have
+# been played:
+#   python pick_archive.py archive [--date D | --all]
+#   python pick_archive.py backtest [--sport MLB] [--since D] [--until D] [--json out.json]
+# Layout (hive-style partitions, one directory per sport and slate date):
+#   archive/picks/sport=MLB/date=2025-06-24/picks.parquet
+#   archive/game_logs/sport=MLB/date=2025-06-24/<role>.parquet
+# A pick is graded against the player's game-log row for its game date,
+# taken from the latest archived slate whose game logs include that game.
+ARCHIVE_DIR = os.environ.get("PICK_ARCHIVE_DIR", "output/archive")
+
+# Days of game logs past the last graded slate that are read (--until)
+LOOKAHEAD_DAYS = int(os.environ.get("BACKTEST_LOOKAHEAD_DAYS", "7"))
+
+# Grading processes (0 = one per CPU)
+BACKTEST_WORKERS = int(os.environ.get("BACKTEST_WORKERS", "0")) or os.cpu_count() or 1
+
+# Direction a tag bets on; tags without one (COIN TOSS, INSUFFICIENT,
+# NO_PROP) are archived but not graded. A bare LEAN counts as an under,
+# as in the lineup generator.
+OVER_WORDS = ("OVER", "SMASH", "GOOD")
+UNDER_WORDS = ("UNDER", "FADE", "LEAN")
+
+# Displayed confidence (0-10 scale, as in the API) and win-probability buckets
+CONFIDENCE_BUCKETS = [0, 2, 4, 6, 8, 10, np.inf]
+WIN_PROBABILITY_BUCKETS = [0, 0.2, 0.4, 0.5, 0.6, 0.8, 1.0]
+
+PICK_COLUMNS = ["Player", "Prop Type", "Prop Value", "Tag", "Confidence", "WinProbability", "Player Type",
+                "player_key", "game_day"]
+REPORT_DIMENSIONS = ["Sport", "Tag", "Confidence Bucket", "Win Probability Bucket", "Prop Type"]
+
+
+def _partition(root, table, sport, date):
+    return os.path.join(root, table, f"sport={sport}", f"date={date}")
+
+
+def partitions(root, table, sport):
+    path = os.path.join(root, table, f"sport={sport}")
+    if not os.path.isdir(path):
+        return []
+    return sorted(d.split("=", 1)[1] for d in os.listdir(path) if d.startswith("date="))
+
+
+# =========================
+# 🗄️ ARCHIVE
+# =========================
+def _arrow_frame(df):
+    # Parquet needs one type per column: object columns mixing strings with
+    # numbers or timestamps are stored as strings
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            values = df[col].dropna()
+            if not values.map(type).eq(str).all():
+                df[col] = df[col].map(lambda v: v if v is None or v != v else str(v))
+    df.columns = [str(c) for c in df.columns]
+    return df
+
+
+def _write(df, directory, name):
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, f".{name}.tmp")
+    _arrow_frame(df).to_parquet(tmp, engine="pyarrow", index=False)
+    os.replace(tmp, os.path.join(directory, name))
+
+
+def _game_days(picks, slate):
+    # Picks without a usable game date ("TBD") are dated to their slate
+    dates = next((picks[c] for c in history_db.GAME_DATE_COLUMNS if c in picks.columns), None)
+    if dates is None:
+        return np.full(len(picks), to_day_numbers(pd.Series([slate]))[0], dtype=np.int32)
+    parsed = pd.to_datetime(dates.astype(object), errors="coerce", format="%Y-%m-%d")
+    days = to_day_numbers(parsed.fillna(pd.Timestamp(slate)))
+    return days
+
+
+def archive_slate(sport, slate=None, root=ARCHIVE_DIR):
+    # slate None archives the current workbook under its game date
+    snap = data_store.load_snapshot(sport, slate=slate)
+    picks = snap["sheets"]["All_Picks"]
+    slate = slate or history_db.slate_date(picks)
+    picks = picks.assign(
+        player_key=[history_db.player_key(p) for p in picks["Player"]],
+        game_day=_game_days(picks, slate),
+    )
+    _write(picks, _partition(root, "picks", sport, slate), "picks.parquet")
+
+    for log in history_db.GAME_LOGS[sport]:
+        player_col, _, _, date_col = history_db.GAME_LOGS[sport][log]
+        df = snap["sheets"][log]
+        df = df.assign(player_key=[history_db.player_key(p) for p in df[player_col]], day=df[date_col])
+        df = df[df["day"] != MISSING_DAY]
+        # Doubleheaders: number a player's games on the same day in sheet order
+        df = df.assign(game_number=df.groupby(["player_key", "day"], sort=False).cumcount() + 1)
+        _write(df, _partition(root, "game_logs", sport, slate), f"{log}.parquet")
+    logger.info("🗄️ Archived %s %s: %d picks", sport, slate, len(picks))
+    return slate
+
+
+# =========================
+# ✅ GRADING
+# =========================
+def _read(path, wanted):
+    # Only the wanted columns that this partition has (sheets gain columns
+    # over a season)
+    import pyarrow.parquet as pq
+
+    f = pq.ParquetFile(path)
+    available = set(f.schema_arrow.names)
+    return f.read(columns=[c for c in wanted if c in available]).to_pandas()
+
+
+def _read_picks(root, sport, date):
+    picks = _read(os.path.join(_partition(root, "picks", sport, date), "picks.parquet"), PICK_COLUMNS)
+    for col in ("Player Type", "Confidence", "WinProbability"):
+        if col not in picks.columns:
+            picks[col] = pd.Series(np.nan if col != "Player Type" else "", index=picks.index, dtype=object)
+    for col in ("Prop Type", "Tag", "Player Type"):
+        picks[col] = picks[col].astype(object)
+    return picks.assign(Sport=sport, Slate=date)
+
+
+def _read_logs(root, sport, date):
+    # One slate's game logs, the first row of each doubleheader only (sheet
+    # order), pruned to the columns grading reads
+    wanted = ["player_key", "day", "game_number"] + stat_columns(sport)
+    directory = _partition(root, "game_logs", sport, date)
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".parquet"):
+            df = _read(os.path.join(directory, name), wanted)
+            df = df[df["game_number"] == 1].drop(columns="game_number")
+            frames.append(df.assign(role=LOG_ROLES.get(name[:-len(".parquet")], ""), slate=date))
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def tag_direction(tags):
+    # +1 over, -1 under, 0 none; worked out once per distinct tag
+    codes, uniques = pd.factorize(tags)
+    names = pd.Series(uniques, dtype=object).fillna("").astype(str).str.upper()
+    under = names.str.contains("|".join(UNDER_WORDS))
+    over = names.str.contains("|".join(OVER_WORDS)) & ~names.str.contains("UNDER|FADE")
+    # Missing tags factorize to -1, which picks the trailing 0
+    directions = np.append(np.select([over, under], [1, -1], 0), 0)
+    return directions[codes]
+
+
+def grade(picks, logs, sport):
+    # Picks with the settled value and outcome of each: hit / miss / push,
+    # or ungraded when the tag has no direction, the prop isn't mapped or
+    # the game never showed up in a later game log. Every step is a
+    # whole-column operation; the only loop is over prop types.
+    picks = picks.reset_index(drop=True)
+    actual = np.full(len(picks), np.nan)
+    if logs is not None and len(logs):
+        # The latest slate's copy of each game wins
+        logs = logs.sort_values("slate", kind="stable").drop_duplicates(["role", "player_key", "day"], keep="last")
+        logs = logs.reset_index(drop=True)
+        keys = logs[["role", "player_key", "day"]].assign(row=np.arange(len(logs)))
+        row = np.full(len(picks), -1)
+        if sport == "NBA":
+            candidates = [""]
+        else:
+            # Exact role first; picks without one take whichever log has the player
+            role = picks["Player Type"].where(picks["Player Type"].isin(["Batter", "Pitcher"]), None)
+            candidates = [role, "Batter", "Pitcher"]
+        for candidate in candidates:
+            found = picks[["player_key", "game_day"]].assign(role=candidate).merge(
+                keys, how="left", left_on=["role", "player_key", "game_day"], right_on=["role", "player_key", "day"],
+            )["row"].to_numpy()
+            fill = (row < 0) & ~np.isnan(found)
+            row[fill] = found[fill]
+
+        matched = np.flatnonzero(row >= 0)
+        prop_types = picks["Prop Type"].to_numpy()[matched]
+        for prop_type, positions in pd.Series(np.arange(len(matched))).groupby(prop_types).indices.items():
+            rows = matched[positions]
+            values = stat_values(logs.iloc[row[rows]], sport, prop_type)
+            if values is not None:
+                actual[rows] = values.to_numpy()
+
+    line = pd.to_numeric(picks["Prop Value"], errors="coerce").to_numpy(np.float64)
+    direction = tag_direction(picks["Tag"])
+    margin = (actual - line) * direction
+    graded = ~np.isnan(margin) & (direction != 0)
+    return picks.assign(
+        line=line,
+        actual=actual,
+        direction=np.select([direction == 1, direction == -1], ["over", "under"], ""),
+        margin=np.where(graded, margin, np.nan),
+        outcome=np.select([~graded, margin > 0, margin < 0], ["ungraded", "hit", "miss"], "push"),
+    )
+
+
+def grade_all(root=ARCHIVE_DIR, sports=None, since=None, until=None, workers=BACKTEST_WORKERS,
+              lookahead=LOOKAHEAD_DAYS):
+    # Reading and decoding the partitions is the expensive part and is
+    # spread over processes; grading then runs once per sport over the
+    # whole range. Game logs are read up to lookahead days past the last
+    # slate so its games are covered.
+    last_log = None
+    if until is not None:
+        last_log = (pd.Timestamp(until) + pd.Timedelta(days=lookahead)).strftime("%Y-%m-%d")
+    jobs = []
+    for sport in sports or data_store.WORKBOOKS:
+        for date in partitions(root, "picks", sport):
+            if (since is None or date >= since) and (until is None or date <= until):
+                jobs.append((_read_picks, root, sport, date))
+        for date in partitions(root, "game_logs", sport):
+            if (since is None or date > since) and (last_log is None or date <= last_log):
+                jobs.append((_read_logs, root, sport, date))
+    if not jobs:
+        return pd.DataFrame()
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+            frames = list(pool.map(_run, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+    else:
+        frames = [_run(job) for job in jobs]
+
+    graded = []
+    for sport in sports or data_store.WORKBOOKS:
+        picks = [f for job, f in zip(jobs, frames) if job[0] is _read_picks and job[2] == sport]
+        logs = [f for job, f in zip(jobs, frames) if job[0] is _read_logs and job[2] == sport and f is not None]
+        if picks:
+            graded.append(grade(pd.concat(picks, ignore_index=True), pd.concat(logs, ignore_index=True) if logs else None, sport))
+    return pd.concat(graded, ignore_index=True)
+
+
+def _run(job):
+    fn, *args = job
+    return fn(*args)
+
+
+# =========================
+# 📊 BACKTEST REPORT
+# =========================
+def _confidence(values):
+    # Same scaling as the API: 0-1 confidences are shown out of 10
+    values = pd.to_numeric(values, errors="coerce")
+    return values.where(values > 1, values * 10)
+
+
+def backtest_report(graded):
+    if graded.empty:
+        return {"picks": 0, "by": {}}
+    graded = graded.assign(**{
+        "Confidence Bucket": pd.cut(_confidence(graded["Confidence"]), CONFIDENCE_BUCKETS, right=False).astype(str),
+        "Win Probability Bucket": pd.cut(
+            pd.to_numeric(graded["WinProbability"], errors="coerce"), WIN_PROBABILITY_BUCKETS, include_lowest=True
+        ).astype(str),
+        "Tag": graded["Tag"].astype(object).fillna("(none)"),
+        "hit": graded["outcome"] == "hit",
+        "miss": graded["outcome"] == "miss",
+        "push": graded["outcome"] == "push",
+    })
+    report = {"picks": int(len(graded)), "graded": int((graded["outcome"] != "ungraded").sum()), "by": {}}
+    for dimension in REPORT_DIMENSIONS:
+        table = graded.groupby(dimension, observed=True).agg(
+            picks=("outcome", "size"), hits=("hit", "sum"), misses=("miss", "sum"),
+            pushes=("push", "sum"), avg_margin=("margin", "mean"),
+        )
+        decided = table["hits"] + table["misses"]
+        table["hit_rate"] = (table["hits"] / decided.where(decided > 0)).round(4)
+        table["avg_margin"] = table["avg_margin"].round(3)
+        table = table.sort_values(["hit_rate", "picks"], ascending=False)
+        table = table.reset_index().astype(object)
+        report["by"][dimension] = table.where(table.notna(), None).to_dict(orient="records")
+    return report
+
+
+def _print_report(report):
+    print(f"{report['picks']} picks, {report.get('graded', 0)} graded")
+    for dimension, rows in report["by"].items():
+        print(f"\n== {dimension} ==")
+        print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    from log_utils import configure_logging
+
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Archive slates and backtest how picks performed")
+    parser.add_argument("--root", default=ARCHIVE_DIR)
+    parser.add_argument("--sport", choices=sorted(data_store.WORKBOOKS), action="append")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive = commands.add_parser("archive", help="archive the current workbooks (or dated slates)")
+    archive.add_argument("--date", type=data_store.parse_slate, help="dated slate from SLATE_DIR")
+    archive.add_argument("--all", action="store_true", help="current workbooks plus every dated slate")
+    backtest = commands.add_parser("backtest", help="grade archived picks and report hit rates")
+    backtest.add_argument("--since", type=data_store.parse_slate)
+    backtest.add_argument("--until", type=data_store.parse_slate)
+    backtest.add_argument("--workers", type=int, default=BACKTEST_WORKERS)
+    backtest.add_argument("--lookahead", type=int, default=LOOKAHEAD_DAYS)
+    backtest.add_argument("--json", help="also write the report (and graded picks as <name>.parquet) here")
+    args = parser.parse_args()
+
+    sports = args.sport or list(data_store.WORKBOOKS)
+    if args.command == "archive":
+        for sport in sports:
+            targets = [args.date] if args.date else [None]
+            if args.all:
+                targets = [None] + data_store.available_slates(sport)
+            for slate in targets:
+                archive_slate(sport, slate, args.root)
+    else:
+        start = time.perf_counter()
+        graded = grade_all(args.root, sports, args.since, args.until, args.workers, args.lookahead)
+        report = backtest_report(graded)
+        logger.info("📊 Graded %d picks in %.2fs", len(graded), time.perf_counter() - start)
+        _print_report(report)
+        if args.json:
+            out_dir = os.path.dirname(os.path.abspath(args.json))
+            os.makedirs(out_dir, exist_ok=True)
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+            _write(graded, out_dir, os.path.splitext(os.path.basename(args.json))[0] + ".parquet")
@@ -0,0 +1,115 @@
+import bisect
+import re
+import unicodedata
+from collections import Counter
+import pandas as pd
+import history_db
+
+# Player autocomplete over every name in a snapshot: All_Picks plus the
+# game-log sheets. Names are matched accent- and case-insensitively, first
+# on a sorted prefix index (of the full name and of every word in it), then
+# by trigram overlap for typos and mid-word fragments.
+MAX_RESULTS = 50
+# Match scores; trigram matches score the share of the query's trigrams the
+# name has, always below these
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+WORD_PREFIX_SCORE = 1.5
+MIN_TRIGRAM_SCORE = 0.4
+MIN_TRIGRAM_QUERY = 3
+
+
+def normalize(name):
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = re.sub(r"[^\w\s]", "", re.sub(r"[-_/+]", " ", text))
+    return " ".join(text.split())
+
+
+def trigrams(text):
+    # Each word padded on its own, so word starts match wherever they are
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class PlayerIndex:
+    def __init__(self, players):
+        # players: [{"player", "team", "props"}], one per normalized name
+        self.players = players
+        self.names = [normalize(p["player"]) for p in players]
+        prefixes = sorted(
+            (" ".join(words[start:]), i)
+            for i, words in enumerate(name.split() for name in self.names)
+            for start in range(len(words))
+        )
+        self.prefix_keys = [key for key, _ in prefixes]
+        self.prefix_ids = [i for _, i in prefixes]
+        self.grams = {}
+        for i, name in enumerate(self.names):
+            for gram in trigrams(name):
+                self.grams.setdefault(gram, []).append(i)
+
+    def __len__(self):
+        return len(self.players)
+
+    def search(self, query, limit=10):
+        query = normalize(query)
+        if not query:
+            return []
+        scores = {}
+        lo = bisect.bisect_left(self.prefix_keys, query)
+        hi = bisect.bisect_left(self.prefix_keys, query + "\U0010ffff", lo)
+        for i in self.prefix_ids[lo:hi]:
+            name = self.names[i]
+            score = EXACT_SCORE if name == query else PREFIX_SCORE if name.startswith(query) else WORD_PREFIX_SCORE
+            scores[i] = max(scores.get(i, 0), score)
+
+        # Trigrams only to fill up what the prefixes didn't
+        if len(scores) < limit and len(query) >= MIN_TRIGRAM_QUERY:
+            grams = trigrams(query)
+            shared = Counter(i for gram in grams for i in self.grams.get(gram, ()))
+            for i, count in shared.items():
+                if i in scores:
+                    continue
+                overlap = count / len(grams)
+                if overlap >= MIN_TRIGRAM_SCORE:
+                    scores[i] = round(overlap, 3)
+
+        ranked = sorted(scores, key=lambda i: (-scores[i], -self.players[i]["props"], self.names[i]))
+        return [{**self.players[i], "score": scores[i]} for i in ranked[:limit]]
+
+
+def _names(df, player_col, team_col):
+    # (name, first team, rows) for each distinct name in a sheet
+    if df is None or player_col not in df.columns:
+        return []
+    names = df[player_col].astype(object)
+    teams = df[team_col].astype(object) if team_col in df.columns else pd.Series(None, index=df.index, dtype=object)
+    grouped = teams.groupby(names, sort=False)
+    firsts, sizes = grouped.first(), grouped.size()
+    return [(name, firsts.get(name), int(size)) for name, size in sizes.items()]
+
+
+def build_index(snap):
+    # Pick-sheet names come first, so their spelling and team win
+    players = {}
+    sheets = snap["sheets"]
+    sources = [(sheets.get("All_Picks"), "Player", "Team", True)]
+    sources += [
+        (sheets.get(sheet), player_col, team_col, False)
+        for sheet, (player_col, team_col, _, _) in history_db.GAME_LOGS[snap["sport"]].items()
+    ]
+    for df, player_col, team_col, picks in sources:
+        for name, team, rows in _names(df, player_col, team_col):
+            key = normalize(name)
+            if not key:
+                continue
+            entry = players.setdefault(key, {"player": str(name).strip(), "team": None, "props": 0})
+            if entry["team"] is None and team is not None and str(team).strip() not in ("", "nan"):
+                entry["team"] = str(team).strip()
+            if picks:
+                entry["props"] += rows
+    return PlayerIndex(list(players.values()))
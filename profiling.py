@@ -0,0 +1,177 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qs, urlencode, urlsplit
+import data_store
+
+# Profiling is off unless PROFILE_TOKEN is set. Callers then pass the token in
+# an X-Profile-Token header (or _profile_token=) and either:
+#   GET /any/route?_profile=1                      deterministic cProfile report
+#   GET /any/route?_profile=sample                 sampling profiler report
+#   GET /debug/profile?route=/mlb-props&mode=sample&format=collapsed
+# Extra knobs (prefixed with _profile_ when used on a normal route): sort=
+# (pstats key, default cumulative), limit= (rows, 1-1000, default 40), interval=
+# (sampling interval in ms, 0.1-1000, default 5), format=collapsed (flamegraph collapsed
+# stacks, sampling only) and cold=1 (re-parse the workbook and rebuild cached
+# payloads instead of profiling a cache hit).
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_PATH = "/debug/profile"
+
+
+def token_ok(token):
+    # Shared by every /debug endpoint
+    return bool(PROFILE_TOKEN) and hmac.compare_digest((token or "").encode(), PROFILE_TOKEN.encode())
+
+
+def _authorized(environ, params):
+    return token_ok(environ.get("HTTP_X_PROFILE_TOKEN") or params.get("_profile_token", [""])[0])
+
+
+def _option(params, name, default):
+    return params.get(name, [default])[0]
+
+
+def _number(params, name, default, kind, low, high):
+    # A numeric option within [low, high]; ValueError names the option
+    try:
+        value = kind(_option(params, name, default))
+    except ValueError:
+        value = None
+    if value is None or not low <= value <= high:
+        raise ValueError(f"{name} must be a number from {low} to {high}")
+    return value
+
+
+def _frame_label(code):
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}:{code.co_firstlineno}"
+
+
+class StackSampler:
+    # Samples one thread's Python stack at a fixed interval from a helper thread.
+    # Stacks are cut at root_code so the server's own frames don't show up.
+    def __init__(self, thread_id, interval, root_code=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root_code = root_code
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                if frame.f_code is self.root_code:
+                    break
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def report(self, limit):
+        total = sum(self.stacks.values()) or 1
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                inclusive[label] += count
+        lines = [f"{total} samples at {self.interval * 1000:.1f} ms", "", f"{'self%':>7} {'total%':>7}  function"]
+        for label, count in own.most_common(limit):
+            lines.append(f"{100 * count / total:7.1f} {100 * inclusive[label] / total:7.1f}  {label}")
+        return "\n".join(lines) + "\n"
+
+
+class ProfilerMiddleware:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        params = parse_qs(environ.get("QUERY_STRING", ""))
+        if path != PROFILE_PATH and "_profile" not in params:
+            return self.wsgi_app(environ, start_response)
+        if not _authorized(environ, params):
+            start_response("404 NOT FOUND", [("Content-Type", "text/plain")])
+            return [b"Not Found\n"]
+
+        if path == PROFILE_PATH:
+            target = urlsplit(params.get("route", ["/props"])[0])
+            mode = params.get("mode", ["cprofile"])[0]
+            inner = dict(environ, PATH_INFO=target.path, QUERY_STRING=target.query, REQUEST_METHOD="GET")
+        else:
+            mode = params["_profile"][0]
+            mode = "cprofile" if mode in ("1", "true", "cprofile") else mode
+            query = {k: v for k, v in params.items() if not k.startswith("_profile")}
+            inner = dict(environ, QUERY_STRING=urlencode(query, doseq=True))
+
+        # /debug/profile takes plain option names; on other routes they are
+        # prefixed so they can't collide with the route's own parameters
+        prefix = "" if path == PROFILE_PATH else "_profile_"
+        fmt = _option(params, prefix + "format", "text")
+        sort = _option(params, prefix + "sort", "cumulative")
+        try:
+            limit = _number(params, prefix + "limit", "40", int, 1, 1000)
+            interval = _number(params, prefix + "interval", "5", float, 0.1, 1000) / 1000
+            if sort not in pstats.Stats.sort_arg_dict_default:
+                raise ValueError(f"{prefix}sort must be one of {', '.join(sorted(pstats.Stats.sort_arg_dict_default))}")
+        except ValueError as e:
+            start_response("400 BAD REQUEST", [("Content-Type", "text/plain; charset=utf-8")])
+            return [f"{e}\n".encode()]
+        cold = _option(params, prefix + "cold", "0") == "1"
+        if fmt == "collapsed":
+            mode = "sample"
+
+        status = {}
+
+        def capture(status_line, headers, exc_info=None):
+            status["line"] = status_line
+            return lambda data: None
+
+        def run():
+            result = self.wsgi_app(inner, capture)
+            try:
+                for _ in result:
+                    pass
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+
+        start = time.perf_counter()
+        with data_store.uncached(cold):
+            if mode == "sample":
+                with StackSampler(threading.get_ident(), interval, run.__code__) as sampler:
+                    run()
+                report = sampler.collapsed() if fmt == "collapsed" else sampler.report(limit)
+            else:
+                profiler = cProfile.Profile()
+                profiler.runcall(run)
+                out = io.StringIO()
+                stats = pstats.Stats(profiler, stream=out)
+                stats.sort_stats(sort).print_stats(limit)
+                report = out.getvalue()
+        elapsed = time.perf_counter() - start
+
+        header = f"# {inner['REQUEST_METHOD']} {inner['PATH_INFO']} -> {status.get('line', '?')} in {elapsed * 1000:.1f} ms ({mode})\n"
+        body = report if fmt == "collapsed" else header + report
+        start_response("200 OK", [("Content-Type", "text/plain; charset=utf-8"), ("Cache-Control", "no-store")])
+        return [body.encode()]
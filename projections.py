@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+from hit_rates import pick_games
+
+# Opponent-adjusted expectation of every prop's stat:
+#   base      blend of the player's Last5 / Last10 / season averages
+#   vs_opp    the player's average against this opponent over their
+#             season average, shrunk toward 1 when there are few such games
+#   defense   opponent defensive rating over the league's (scoring props)
+#   pace      both teams' pace over the league's
+#   blowout   trims the expectation when the spread is lopsided (starters
+#             sit late)
+# Projection = base * vs_opp * defense * pace * blowout. The matchup factors
+# come from the Spreads / League Averages sheets and are 1 without them.
+FIELDS = ["Projection", "ProjectionMargin"]
+BASE_WEIGHTS = {"Last5Avg": 0.3, "Last10Avg": 0.3, "SeasonAvg": 0.4}
+VS_OPP_SHRINK_GAMES = 5
+FACTOR_RANGE = (0.75, 1.25)
+BLOWOUT_SPREAD = 10
+BLOWOUT_PER_POINT = 0.01
+BLOWOUT_FLOOR = 0.9
+# Prop types that score points, which is what a defensive rating measures
+SCORING_WORDS = ("Pts", "Points", "Fantasy", "FG", "3-PT", "Free Throws", "Two Pointers")
+
+
+def base_projection(rolling):
+    # Weighted mean of the rolling averages a player has; NaN with none
+    weights = pd.DataFrame({field: np.where(rolling[field].notna(), w, 0.0) for field, w in BASE_WEIGHTS.items()})
+    total = weights.sum(axis=1)
+    blended = (rolling[list(BASE_WEIGHTS)].fillna(0).to_numpy() * weights.to_numpy()).sum(axis=1)
+    return pd.Series(blended, index=rolling.index) / total.where(total > 0)
+
+
+def vs_opp_factor(picks, logs, sport, season, opponent_col=None):
+    # Without opponent_col every row of logs is against the pick's opponent
+    # (the Last10vsOpp sheet); with it, rows are matched on that column
+    pairs = pick_games(picks, logs, sport, opponent_col)
+    if pairs is None:
+        return pd.Series(1.0, index=picks.index)
+    if opponent_col:
+        pairs = pairs[pairs["game_opponent"] == pairs["opponent"].astype(object)]
+    grouped = pairs["value"].groupby(pairs["pick"])
+    mean, games = grouped.mean(), grouped.count()
+    season = season.reindex(mean.index)
+    ratio = mean / season.where(season > 0)
+    shrunk = 1 + games / (games + VS_OPP_SHRINK_GAMES) * (ratio - 1)
+    return shrunk.reindex(picks.index).fillna(1).clip(*FACTOR_RANGE)
+
+
+def _text(values):
+    return values.astype(object).astype(str).str.strip().to_numpy()
+
+
+def matchup_factors(picks, spreads, league):
+    # defense * pace * blowout per pick, from the team's row in Spreads
+    factor = pd.Series(1.0, index=picks.index)
+    if spreads is None or spreads.empty:
+        return factor
+    games = pd.DataFrame({
+        "team": _text(spreads["Team"]),
+        "opponent": _text(spreads["Opponent"]),
+        "spread": pd.to_numeric(spreads["Spread"], errors="coerce").to_numpy(),
+        "def_rating": pd.to_numeric(spreads["Opponent Def Rating"], errors="coerce").to_numpy(),
+        "opp_pace": pd.to_numeric(spreads["Opponent Pace"], errors="coerce").to_numpy(),
+    }).drop_duplicates(["team", "opponent"])
+    # Each team's own pace is the "Opponent Pace" of the row it's the opponent in
+    games["team_pace"] = games["team"].map(games.drop_duplicates("opponent").set_index("opponent")["opp_pace"])
+
+    league_rating = league_pace = np.nan
+    if league is not None and not league.empty:
+        league_rating = pd.to_numeric(league.get("League Avg Defensive Rating"), errors="coerce").iloc[0]
+        league_pace = pd.to_numeric(league.get("League Avg Pace"), errors="coerce").iloc[0]
+    if pd.isna(league_pace) and "League Avg Pace" in spreads.columns:
+        league_pace = pd.to_numeric(spreads["League Avg Pace"], errors="coerce").mean()
+
+    matched = pd.DataFrame({"team": picks["team"].to_numpy(), "opponent": picks["opponent"].to_numpy()}).merge(
+        games, on=["team", "opponent"], how="left"
+    )
+    defense = (matched["def_rating"] / league_rating).clip(*FACTOR_RANGE).fillna(1)
+    scoring = picks["prop_type"].astype(str).str.contains("|".join(SCORING_WORDS), regex=True).to_numpy()
+    defense = defense.where(scoring, 1.0)
+    pace = (matched[["team_pace", "opp_pace"]].mean(axis=1) / league_pace).clip(*FACTOR_RANGE).fillna(1)
+    blowout = (1 - BLOWOUT_PER_POINT * (matched["spread"].abs() - BLOWOUT_SPREAD).clip(lower=0)).clip(lower=BLOWOUT_FLOOR).fillna(1)
+    return pd.Series((defense * pace * blowout).to_numpy(), index=picks.index)
+
+
+def projections(picks, rolling, logs, sport, vs_logs=None, opponent_col=None, spreads=None, league=None):
+    # picks: hit_rates.line_stats picks plus team; rolling: rolling_stats
+    # FIELDS aligned with picks. Returns FIELDS aligned with picks, NaN
+    # where the player has no games to project from.
+    picks = picks.reset_index(drop=True).assign(pick=np.arange(len(picks)))
+    rolling = rolling.reset_index(drop=True)
+    base = base_projection(rolling)
+    if vs_logs is not None:
+        vs_opp = vs_opp_factor(picks, vs_logs, sport, rolling["SeasonAvg"])
+    else:
+        vs_opp = vs_opp_factor(picks, logs, sport, rolling["SeasonAvg"], opponent_col)
+    projection = base * vs_opp * matchup_factors(picks, spreads, league)
+    line = pd.to_numeric(picks["line"], errors="coerce")
+    return pd.DataFrame({
+        "Projection": projection.round(2),
+        "ProjectionMargin": (projection - line).round(2),
+    })
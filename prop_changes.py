@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Deltas between props payloads, for clients that poll: every record has a
+# PropId (sport, player, prop type, game) and every snapshot a version
+# number, and /props/changes?since=<version> returns only the records
+# added, modified or removed since then. Each payload keeps the PropIds and
+# record hashes of its last HISTORY versions; an older or unknown since
+# (or one seen by another worker only) gets the whole payload with
+# reset: true.
+HISTORY = int(os.environ.get("PROP_CHANGES_HISTORY", "16"))
+
+_history = {}
+_history_lock = threading.Lock()
+
+
+def version_number(snap):
+    # Workbook mtime in ms: the same in every worker and across restarts
+    return int(snap["version"].split("-")[0]) // 1_000_000
+
+
+def prop_ids(df, sport):
+    # PropId per payload row; a repeat of the same identity within a slate
+    # gets a #n suffix
+    teams = np.sort(np.stack([df["Team"].astype(str).to_numpy(), df["Opponent"].astype(str).to_numpy()], axis=1), axis=1)
+    ids = pd.Series(
+        f"{sport}|" + df["Player"].astype(str).to_numpy() + "|" + df["Prop Type"].astype(str).to_numpy()
+        + "|" + teams[:, 0] + " vs " + teams[:, 1],
+        index=df.index,
+    )
+    repeat = ids.groupby(ids.to_numpy(), sort=False).cumcount()
+    return ids.where(repeat == 0, ids + "#" + (repeat + 1).astype(str))
+
+
+def record_table(body, dumps):
+    # Serialized payload -> PropIds, each record's own JSON and its hash
+    records = json.loads(body)
+    strings = np.array([dumps(record) for record in records], dtype=object)
+    return {
+        "ids": pd.Index([record.get("PropId") for record in records]),
+        "strings": strings,
+        "hashes": pd.util.hash_array(strings) if len(strings) else np.array([], dtype=np.uint64),
+    }
+
+
+def remember(name, version, table):
+    with _history_lock:
+        versions = _history.setdefault(name, OrderedDict())
+        versions[version] = (table["ids"], table["hashes"])
+        versions.move_to_end(version)
+        while len(versions) > HISTORY:
+            versions.popitem(last=False)
+
+
+def history():
+    # Payload -> the (PropIds, hashes) of each remembered version
+    with _history_lock:
+        return {name: list(versions.values()) for name, versions in _history.items()}
+
+
+def latest(name):
+    # Most recent version remembered for a payload, or None
+    with _history_lock:
+        versions = _history.get(name)
+        return next(reversed(versions)) if versions else None
+
+
+def summary(changes, table):
+    # Counts for a snapshot event; None changes means no earlier version
+    if changes is None:
+        return {"added": len(table["ids"]), "modified": 0, "removed": 0, "total": len(table["ids"])}
+    added, modified, removed = changes
+    return {"added": len(added), "modified": len(modified), "removed": len(removed), "total": len(table["ids"])}
+
+
+def event(name, sport, version, previous, changes, table):
+    # Data of the /events "snapshot" event for a new version of a payload
+    return {"payload": name, "sport": sport, "version": version, "previous": previous, **summary(changes, table)}
+
+
+def diff(name, since, table):
+    # Changes against version since from the history, or None when since
+    # isn't in it
+    with _history_lock:
+        old = _history.get(name, {}).get(since)
+    return compare(old, table) if old is not None else None
+
+
+def compare(old, table):
+    # (added, modified, removed) against an older (PropIds, hashes): positions
+    # into table for the first two, PropIds for the last
+    old_ids, old_hashes = old
+    ids, hashes = table["ids"], table["hashes"]
+    positions = old_ids.get_indexer(ids)
+    found = positions >= 0
+    added = np.flatnonzero(~found)
+    modified = np.flatnonzero(found & (old_hashes[np.where(found, positions, 0)] != hashes))
+    removed = old_ids[~old_ids.isin(ids)]
+    return added, modified, removed
+
+
+def dump_table(version, table):
+    # A change table as a prebuilt snapshot stores it: a header line with the
+    # version, PropIds and hashes, then each record's JSON on its own line
+    header = json.dumps({"version": version, "ids": list(table["ids"]), "hashes": table["hashes"].tolist()})
+    return ("\n".join([header, *table["strings"]]) + "\n").encode()
+
+
+def load_table(path, records=True):
+    # (version, table) from a dump_table() file; records=False reads only
+    # the header, which is all an older version is diffed with
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        strings = np.array([line.rstrip("\n") for line in f], dtype=object) if records else None
+    return header["version"], {
+        "ids": pd.Index(header["ids"], dtype=object),
+        "hashes": np.array(header["hashes"], dtype=np.uint64),
+        "strings": strings,
+    }
+
+
+def render(version, since, table, changes):
+    # Response body; records are spliced in from their cached JSON
+    if changes is None:
+        added, modified, removed, reset = np.arange(len(table["ids"])), [], [], True
+    else:
+        (added, modified, removed), reset = changes, False
+    strings = table["strings"]
+    return (
+        '{"added":[' + ",".join(strings[added]) + '],"modified":[' + ",".join(strings[modified])
+        + '],"removed":' + json.dumps(list(removed)) + ',"reset":' + json.dumps(reset)
+        + ',"since":' + json.dumps(since) + ',"version":' + json.dumps(version) + "}\n"
+    ).encode()
@@ -0,0 +1,246 @@
+import datetime
+import logging
+import os
+import threading
+import numpy as np
+import pandas as pd
+import history_db
+from compact import EPOCH, MISSING_DAY, day_to_date, lower_keys
+from data_store import derived
+from stat_maps import LOG_ROLES, STATS, stat_values
+
+logger = logging.getLogger(__name__)
+
+# Per-player, per-stat rolling figures derived from the game-log sheets, so
+# props don't depend on upstream Season_Avg / Last5_Avg / Last10_Avg (which
+# come through as 0 when upstream misses a player):
+#   Last5Avg / Last10Avg, Last5Std / Last10Std   trailing 5- and 10-game windows
+#   SeasonAvg / SeasonStd / SeasonGames          every game of the current season
+#   Last5_vs_Season / Last10_vs_Season           (window avg - season) / season
+# The engine for the current slate lives for the life of the process and
+# only refolds the players whose games changed: a game it hasn't seen, or a
+# revised value for one it has. Games from before the season of the newest
+# game are dropped. It's seeded from the history database when one exists,
+# which is what makes the season figures cover more than the sheets' last
+# 10 games.
+SEED_FROM_HISTORY = os.environ.get("ROLLING_SEED_HISTORY", "1") == "1"
+
+# The logs of every game a player played. Not Last10vsOpp_GameLogs: that's
+# the head-to-head games against tonight's opponent over past seasons.
+SHEETS = {
+    "NBA": ("Last10_GameLogs",),
+    "MLB": ("Last 10 Batters", "Last 10 Pitchers"),
+}
+# (month, day) a season starts on; NBA seasons straddle the new year
+SEASON_START = {"NBA": (8, 1), "MLB": (1, 1)}
+
+WINDOWS = (5, 10)
+FIELDS = ["Last5Avg", "Last10Avg", "SeasonAvg", "Last5Std", "Last10Std", "SeasonStd", "SeasonGames",
+          "Last5_vs_Season", "Last10_vs_Season"]
+# What the payloads add per prop; the trend ratios fill the upstream ones
+PAYLOAD_FIELDS = FIELDS[:7]
+KEYS = ["role", "player_key", "day", "game_number"]
+PLAYER = ["role", "player_key"]
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def season_start(sport, day):
+    # Day number of the first day of the season that day falls in
+    date = day_to_date(day)
+    month, first = SEASON_START[sport]
+    year = date.year if (date.month, date.day) >= (month, first) else date.year - 1
+    return (datetime.date(year, month, first) - EPOCH).days
+
+
+def game_rows(sport, sheet, df):
+    # One row per game with the settled value of every mapped prop type,
+    # indexed by (role, player_key, day, game_number)
+    player_col, _, _, date_col = history_db.GAME_LOGS[sport][sheet]
+    df = df[df[date_col].to_numpy() != MISSING_DAY]
+    keys = pd.Series(lower_keys(df[player_col]), index=df.index)
+    df, keys = df[keys.notna().to_numpy()], keys[keys.notna()]
+    days = df[date_col].to_numpy(np.int32)
+    # Sheets list games newest first, so of two games on one day the first
+    # row is the later one; numbering runs the other way so it sorts by time
+    game_number = pd.Series(0, index=df.index).groupby([keys.to_numpy(), days], sort=False).cumcount(ascending=False) + 1
+    values = {}
+    for prop_type in STATS[sport]:
+        series = stat_values(df, sport, prop_type)
+        if series is not None:
+            values[prop_type] = series.to_numpy(np.float64)
+    index = pd.MultiIndex.from_arrays(
+        [np.full(len(df), LOG_ROLES.get(sheet, ""), dtype=object), keys.to_numpy(object), days, game_number.to_numpy()],
+        names=KEYS,
+    )
+    return pd.DataFrame(values, index=index, columns=list(STATS[sport]), dtype=np.float64)
+
+
+class RollingStats:
+    def __init__(self, sport):
+        self.sport = sport
+        self.rows = None
+        self.count = self.total = self.squares = None
+        self.windows = None
+        self.season = None
+        # sheet -> the checksum (or tag) it was last fed with
+        self.seen = {}
+        self._table = None
+        self.lock = threading.Lock()
+
+    def update(self, new):
+        # Folds in the rows whose game key hasn't been seen or whose values
+        # were revised; returns how many
+        new = new[~new.index.duplicated(keep="first")]
+        if new.empty:
+            return 0
+        days = new.index.get_level_values("day")
+        newest = days.max() if self.rows is None else max(days.max(), self.rows.index.get_level_values("day").max())
+        season = season_start(self.sport, newest)
+        new = new[days >= season]
+        stale = None
+        if self.rows is not None:
+            known = new.index.isin(self.rows.index)
+            old = self.rows.reindex(new.index[known])
+            same = ((old.to_numpy() == new[known].to_numpy()) | (old.isna() & new[known].isna()).to_numpy()).all(axis=1)
+            changed = known.copy()
+            changed[known] = ~same
+            new = new[~known | changed]
+            if season != self.season:
+                stale = self.rows[self.rows.index.get_level_values("day") < season]
+        if new.empty and (stale is None or stale.empty):
+            self.season = season
+            return 0
+
+        if self.rows is None:
+            self.rows = new.sort_index()
+        else:
+            drop = new.index.intersection(self.rows.index)
+            if stale is not None:
+                drop = drop.append(stale.index)
+            self.rows = pd.concat([self.rows.drop(index=drop), new]).sort_index()
+        self.season = season
+
+        # Season sums and trailing windows are refolded for the players
+        # whose games changed
+        players = new.index.droplevel(["day", "game_number"]).unique()
+        if stale is not None:
+            players = players.union(stale.index.droplevel(["day", "game_number"]).unique())
+        affected = self.rows[self.rows.index.droplevel(["day", "game_number"]).isin(players)]
+        grouped = affected.groupby(level=PLAYER)
+        fresh = {"count": grouped.count(), "total": grouped.sum(), "squares": (affected ** 2).groupby(level=PLAYER).sum()}
+        windows = {}
+        for window in WINDOWS:
+            tail = affected.groupby(level=PLAYER).tail(window).groupby(level=PLAYER)
+            windows[f"Last{window}Avg"] = tail.mean()
+            windows[f"Last{window}Std"] = tail.std()
+        fresh["windows"] = pd.concat(windows, axis=1)
+        for name, part in fresh.items():
+            current = getattr(self, name)
+            setattr(self, name, part if current is None else pd.concat([current.drop(index=players, errors="ignore"), part]))
+        self._table = None
+        return len(new)
+
+    def observe(self, sheets, checksums=None, tag=None):
+        # Feeds a snapshot's game-log sheets; a sheet already fed (same
+        # checksum) is skipped without looking at its rows
+        added = 0
+        with self.lock:
+            for sheet in SHEETS[self.sport]:
+                df = sheets.get(sheet)
+                if df is None:
+                    continue
+                key = (checksums or {}).get(sheet) or tag or id(df)
+                if self.seen.get(sheet) == key:
+                    continue
+                added += self.update(game_rows(self.sport, sheet, df))
+                self.seen[sheet] = key
+        return added
+
+    def seed_from_history(self):
+        try:
+            sheets = history_db.game_log_sheets(self.sport)
+        except (history_db.HistoryUnavailable, OSError) as e:
+            logger.debug("No history to seed %s rolling stats: %s", self.sport, e)
+            return 0
+        added = self.observe(sheets, tag="history")
+        logger.info("📈 Seeded %s rolling stats with %d games from history", self.sport, added)
+        return added
+
+    def frames(self):
+        # What the engine holds, for the memory report
+        with self.lock:
+            return [self.rows, self.count, self.total, self.squares, self.windows, self._table]
+
+    def table(self):
+        # (role, player_key, prop_type) -> FIELDS, rebuilt after updates
+        with self.lock:
+            if self._table is not None or self.count is None:
+                return self._table
+            count = self.count.where(self.count > 0)
+            mean = self.total / count
+            variance = ((self.squares - self.total ** 2 / count) / (count - 1)).clip(lower=0)
+            wide = {
+                "SeasonAvg": mean,
+                "SeasonStd": np.sqrt(variance.where(count > 1)),
+                "SeasonGames": self.count,
+            }
+            for field in ("Last5Avg", "Last10Avg", "Last5Std", "Last10Std"):
+                wide[field] = self.windows[field].reindex(self.count.index)
+            for window in WINDOWS:
+                wide[f"Last{window}_vs_Season"] = (wide[f"Last{window}Avg"] - mean) / mean.where(mean != 0)
+            table = pd.concat(
+                {field: frame.rename_axis(columns="prop_type").stack(future_stack=True) for field, frame in wide.items()},
+                axis=1,
+            )
+            self._table = table[FIELDS]
+            return self._table
+
+
+def engines():
+    with _engines_lock:
+        return dict(_engines)
+
+
+def _engine(sport):
+    with _engines_lock:
+        engine = _engines.get(sport)
+        if engine is None:
+            engine = _engines[sport] = RollingStats(sport)
+            if SEED_FROM_HISTORY:
+                engine.seed_from_history()
+        return engine
+
+
+def rolling_table(snap):
+    # The current slate shares the long-lived incremental engine; a dated
+    # slate gets a one-off engine over its own sheets
+    sport = snap["sport"]
+    sheets = list(SHEETS[sport])
+
+    def build(s):
+        engine = _engine(sport) if s["slate"] is None else RollingStats(sport)
+        added = engine.observe(s["sheets"], s.get("checksums"), tag=s["version"])
+        if added:
+            logger.info("📈 %s rolling stats: %d new games", sport, added)
+        return engine.table()
+
+    return derived(snap, "rolling_stats", build, depends=sheets)
+
+
+def lookup(table, roles, player_keys, prop_types):
+    # FIELDS for each (role, player, prop type), NaN where there are no games
+    index = pd.MultiIndex.from_arrays(
+        [np.asarray(roles, dtype=object), np.asarray(player_keys, dtype=object), np.asarray(prop_types, dtype=object)]
+    )
+    if table is None:
+        return pd.DataFrame(np.nan, index=range(len(index)), columns=FIELDS)
+    return table.reindex(index).reset_index(drop=True)
+
+
+def fill_missing(values, derived_values):
+    # Upstream figures that are missing or 0 take the derived value instead
+    values = pd.to_numeric(pd.Series(values), errors="coerce").reset_index(drop=True)
+    missing = values.isna() | (values == 0)
+    return values.mask(missing & derived_values.notna(), derived_values)
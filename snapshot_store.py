@@ -0,0 +1,240 @@
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import events
+import prop_changes
+
+logger = logging.getLogger(__name__)
+
+# Prebuilt API payloads. Run right after the analysis job writes output/*.xlsx:
+#   python snapshot_store.py [--out snapshots] [--keep 5]
+# It renders every payload offline into snapshots/<version>/ (JSON, gzip
+# variant, change table and manifest.json), points snapshots/CURRENT at it
+# and publishes the /events snapshot events. With SNAPSHOT_DIR set, the app
+# serves those files directly (sendfile under gunicorn) and never parses a
+# workbook to answer /props, /mlb-props or their /changes: deltas are
+# diffed against the change tables of the builds still kept.
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "")
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+KEEP_VERSIONS = 5
+
+# Seconds between checks of the CURRENT pointer for a newer build
+CHECK_INTERVAL = float(os.environ.get("SNAPSHOT_CHECK_INTERVAL", "1"))
+
+_lock = threading.Lock()
+_loaded = None
+_checked = 0.0
+
+
+class PrebuiltSnapshot:
+    # One build directory, described by its manifest. Bodies are opened per
+    # request and streamed from the page cache, so workers hold no copy.
+    def __init__(self, root, version):
+        self.root = root
+        self.version = version
+        self.path = os.path.join(root, version)
+        with open(os.path.join(self.path, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        self._tables = {}
+        self._tables_lock = threading.Lock()
+
+    def payload_version(self, name):
+        # The payload's X-Props-Version; None for builds that predate it
+        return self.manifest["payloads"][name].get("version")
+
+    def change_table(self, name):
+        # The payload's prop_changes table, read on first use
+        with self._tables_lock:
+            if name not in self._tables:
+                changes = self.manifest["payloads"][name]["changes"]
+                self._tables[name] = prop_changes.load_table(os.path.join(self.path, changes["file"]))[1]
+            return self._tables[name]
+
+    def previous_table(self, name, since):
+        # PropIds and hashes of the payload at version since, from whichever
+        # kept build has it; None when none does
+        for build in _builds(self.root):
+            manifest = _manifest(self.root, build)
+            entry = (manifest or {}).get("payloads", {}).get(name, {})
+            if entry.get("version") == since and "changes" in entry:
+                table = prop_changes.load_table(os.path.join(self.root, build, entry["changes"]["file"]), records=False)[1]
+                return table["ids"], table["hashes"]
+        return None
+
+    def etag(self, name):
+        return self.manifest["payloads"][name]["sha256"][:20]
+
+    def open(self, name, encoding="identity"):
+        # Returns (file, size), or None when the build has no such variant
+        variant = self.manifest["payloads"][name]["files"].get(encoding)
+        if variant is None:
+            return None
+        return open(os.path.join(self.path, variant["file"]), "rb"), variant["bytes"]
+
+
+def _builds(root):
+    return sorted(
+        d for d in os.listdir(root)
+        if not d.startswith(".") and os.path.isfile(os.path.join(root, d, MANIFEST_FILE))
+    )
+
+
+_manifests = {}
+
+
+def _manifest(root, build):
+    # Builds never change once renamed into place, so their manifests are cached
+    path = os.path.join(root, build, MANIFEST_FILE)
+    if path not in _manifests:
+        try:
+            with open(path) as f:
+                _manifests[path] = json.load(f)
+        except (OSError, ValueError):
+            return None
+    return _manifests[path]
+
+
+def read_pointer(root):
+    with open(os.path.join(root, CURRENT_FILE)) as f:
+        return f.read().strip()
+
+
+def current():
+    # The CURRENT pointer is re-read at most once per CHECK_INTERVAL, so a new
+    # build is picked up by every worker without a restart.
+    global _loaded, _checked
+    now = time.monotonic()
+    if _loaded is not None and now - _checked < CHECK_INTERVAL:
+        return _loaded
+    with _lock:
+        if _loaded is None or now - _checked >= CHECK_INTERVAL:
+            version = read_pointer(SNAPSHOT_DIR)
+            if _loaded is None or _loaded.version != version:
+                _loaded = PrebuiltSnapshot(SNAPSHOT_DIR, version)
+                logger.info("🗺️ Serving prebuilt snapshot %s", version)
+            _checked = now
+    return _loaded
+
+
+# =========================
+# 🏗️ OFFLINE BUILD
+# =========================
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _prune(root, keep, current_version):
+    versions = _builds(root)
+    for version in versions[:-keep] if keep > 0 else []:
+        if version != current_version:
+            shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+            logger.info("🧹 Removed old snapshot %s", version)
+
+
+def build_snapshot(root="snapshots", keep=KEEP_VERSIONS):
+    # Runs the same pipelines the routes use and publishes the result
+    # atomically: the build directory is renamed into place before CURRENT
+    # is switched to it.
+    import data_store
+    import flask_app
+
+    payloads = {}
+    sources = {}
+    tables = {}
+    with flask_app.app.app_context():
+        for name, (sport, build) in flask_app.PAYLOADS.items():
+            snap = data_store.get_snapshot(sport)
+            sources[sport] = {
+                "path": data_store.WORKBOOKS[sport]["path"],
+                "version": snap["version"],
+                "checksums": snap["checksums"],
+            }
+            payloads[name] = flask_app.render_payload(snap, build)
+            tables[name] = (sport, prop_changes.version_number(snap), prop_changes.record_table(payloads[name], flask_app.app.json.dumps))
+
+    digests = {name: hashlib.sha256(body).hexdigest() for name, body in payloads.items()}
+    content = hashlib.sha256(json.dumps(digests, sort_keys=True).encode()).hexdigest()
+
+    os.makedirs(root, exist_ok=True)
+    try:
+        previous = read_pointer(root)
+        with open(os.path.join(root, previous, MANIFEST_FILE)) as f:
+            previous_manifest = json.load(f)
+        if previous_manifest["content_sha256"] == content:
+            logger.info("✅ Payloads unchanged, keeping snapshot %s", previous)
+            return previous
+    except (OSError, KeyError, ValueError):
+        previous, previous_manifest = None, None
+
+    version = f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{content[:10]}"
+    staging = os.path.join(root, f".build-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    manifest = {
+        "version": version,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "content_sha256": content,
+        "sources": sources,
+        "payloads": {},
+    }
+    for name, body in payloads.items():
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        _write(os.path.join(staging, f"{name}.json"), body)
+        _write(os.path.join(staging, f"{name}.json.gz"), compressed)
+        _, payload_version, table = tables[name]
+        _write(os.path.join(staging, f"{name}.changes.jsonl"), prop_changes.dump_table(payload_version, table))
+        manifest["payloads"][name] = {
+            "sha256": digests[name],
+            "version": payload_version,
+            "files": {
+                "identity": {"file": f"{name}.json", "bytes": len(body)},
+                "gzip": {"file": f"{name}.json.gz", "bytes": len(compressed)},
+            },
+            "changes": {"file": f"{name}.changes.jsonl"},
+        }
+        logger.info("📦 %s: %.2f MB (%.2f MB gzip)", name, len(body) / 1e6, len(compressed) / 1e6)
+    _write(os.path.join(staging, MANIFEST_FILE), json.dumps(manifest, indent=2).encode())
+
+    os.rename(staging, os.path.join(root, version))
+    pointer = os.path.join(root, f".{CURRENT_FILE}.tmp")
+    _write(pointer, version.encode())
+    os.replace(pointer, os.path.join(root, CURRENT_FILE))
+    logger.info("✅ Published snapshot %s", version)
+    _publish_events(root, previous, previous_manifest, tables)
+    _prune(root, keep, version)
+    return version
+
+
+def _publish_events(root, previous, previous_manifest, tables):
+    # /events snapshot events for the payloads whose version moved, with
+    # what changed against the build that was current before
+    for name, (sport, payload_version, table) in tables.items():
+        entry = (previous_manifest or {}).get("payloads", {}).get(name, {})
+        previous_version = entry.get("version")
+        if previous_version == payload_version:
+            continue
+        changes = None
+        if "changes" in entry:
+            old = prop_changes.load_table(os.path.join(root, previous, entry["changes"]["file"]), records=False)[1]
+            changes = prop_changes.compare((old["ids"], old["hashes"]), table)
+        events.publish("snapshot", prop_changes.event(name, sport, payload_version, previous_version, changes, table))
+
+
+if __name__ == "__main__":
+    from log_utils import configure_logging
+
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Pre-render API payloads into a versioned snapshot directory")
+    parser.add_argument("--out", default=SNAPSHOT_DIR or "snapshots")
+    parser.add_argument("--keep", type=int, default=KEEP_VERSIONS, help="build directories to keep (0 keeps all)")
+    args = parser.parse_args()
+    build_snapshot(args.out, args.keep)
@@ -0,0 +1,82 @@
+import pandas as pd
+
+# Prop type -> game-log column(s) that settle it. A list is summed; a
+# callable takes a row (or a whole frame) and returns the value.
+NBA_STATS = {
+    "Points": "Points",
+    "Rebounds": "Rebounds",
+    "Assists": "Assists",
+    "Pts+Rebs": ["Points", "Rebounds"],
+    "Pts+Asts": ["Points", "Assists"],
+    "Rebs+Asts": ["Rebounds", "Assists"],
+    "Pts+Rebs+Asts": ["Points", "Rebounds", "Assists"],
+    "3-PT Attempted": "3PT Attempted",
+    "3-PT Made": "3PT Made",
+    "Turnovers": "Turnovers",
+    "Blocked Shots": "Blocks",
+    "Steals": "Steals",
+    "Free Throws Attempted": "Free Throws Attempted",
+    "Free Throws Made": "Free Throws Made",
+    "Offensive Rebounds": "OREB",
+    "Defensive Rebounds": "DREB",
+    "Personal Fouls": "PF",
+    "Fantasy Score": "FantasyScore_PP",
+    "FG Attempted": "Field Goals Attempted",
+    "FG Made": "Field Goals Made",
+    "Two Pointers Made": lambda row: row.get("Field Goals Made", 0) - row.get("3PT Made", 0),
+    "Two Pointers Attempted": lambda row: row.get("Field Goals Attempted", 0) - row.get("3PT Attempted", 0)
+}
+
+# MLB game-log columns are lowercased on load
+MLB_STATS = {
+    "Hits+Runs+RBIs": ["hits", "runs", "rbi"],
+    "Hits": "hits", "Runs": "runs", "RBIs": "rbi", "Home Runs": "homeruns",
+    "Pitcher Strikeouts": "strikeouts", "Pitcher Fantasy Score": "pp_fantasy",
+    "Hitter Fantasy Score": "pp_fantasy", "Total Bases": "totalbases",
+    "Stolen Bases": "stolenbases", "Walks": "baseonballs", "Hits Allowed": "hits",
+    "Earned Runs Allowed": "runs", "Doubles": "doubles", "Triples": "triples",
+    "Singles": "singles", "Hitter Strikeouts": "strikeouts", "Pitching Outs": "outs",
+    "Pitches Thrown": "numberofpitches", "Walks Allowed": "baseonballs"
+}
+
+STATS = {"NBA": NBA_STATS, "MLB": MLB_STATS}
+
+# Game-log sheet -> the "Player Type" whose props it settles ("" for any)
+LOG_ROLES = {
+    "Last10_GameLogs": "",
+    "Last10vsOpp_GameLogs": "",
+    "Last 10 Batters": "Batter",
+    "Last 10 Pitchers": "Pitcher",
+}
+
+
+def stat_columns(sport):
+    # Every plain column the map reads, for column-pruned reads
+    columns = set()
+    for stat_def in STATS[sport].values():
+        if isinstance(stat_def, list):
+            columns.update(stat_def)
+        elif isinstance(stat_def, str):
+            columns.add(stat_def)
+    if sport == "NBA":
+        columns.update(["Field Goals Made", "3PT Made", "Field Goals Attempted", "3PT Attempted"])
+    return sorted(columns)
+
+
+def stat_values(logs, sport, prop_type):
+    # The settled value of prop_type for every row of a game-log frame, or
+    # None when the prop isn't mapped or its columns are missing. Sums
+    # follow each sport's Last10Stats: NBA propagates missing values, MLB
+    # skips them.
+    stat_def = STATS[sport].get(prop_type)
+    if stat_def is None:
+        return None
+    if callable(stat_def):
+        return pd.Series(stat_def(logs), index=logs.index, dtype="float64")
+    columns = stat_def if isinstance(stat_def, list) else [stat_def]
+    if not set(columns).issubset(logs.columns):
+        return None
+    values = logs[columns].astype("float64")
+    if sport == "MLB":
+        return values.sum(axis=1)
+    return values.sum(axis=1, min_count=len(columns)) if len(columns) > 1 else values[columns[0]]
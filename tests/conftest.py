@@ -0,0 +1,21 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# The app reads its workbooks (output/, *.xlsx) relative to the repo root
+os.chdir(ROOT)
+
+# Everything the app writes goes to a scratch directory instead of output/.
+# Set before any test module imports the app: the modules read these once.
+SCRATCH = tempfile.mkdtemp(prefix="props-tests-")
+atexit.register(shutil.rmtree, SCRATCH, ignore_errors=True)
+os.environ["SSE_EVENTS_FILE"] = os.path.join(SCRATCH, "events.jsonl")
+os.environ["METRICS_DIR"] = os.path.join(SCRATCH, "metrics")
+os.environ["HISTORY_DB"] = os.path.join(SCRATCH, "history.db")
+os.environ["PICK_ARCHIVE_DIR"] = os.path.join(SCRATCH, "archive")
+os.environ.pop("SNAPSHOT_DIR", None)
+os.environ.pop("SSE_URL", None)
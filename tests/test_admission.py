@@ -0,0 +1,58 @@
+import threading
+
+from flask import Flask
+
+from admission import ConcurrencyLimiter, limit_concurrency
+
+
+def test_queue_full_is_rejected_without_waiting():
+    limiter = ConcurrencyLimiter("test-full", max_concurrent=1, max_queue=0, queue_timeout=5)
+    assert limiter.acquire()
+    assert not limiter.acquire()
+    limiter.release()
+    assert limiter.acquire()
+    limiter.release()
+
+
+def test_queued_request_gets_the_freed_slot():
+    limiter = ConcurrencyLimiter("test-queue", max_concurrent=1, max_queue=1, queue_timeout=5)
+    assert limiter.acquire()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(limiter.acquire()))
+    waiter.start()
+    limiter.release()
+    waiter.join(5)
+    assert acquired == [True]
+    limiter.release()
+
+
+def test_queue_timeout_is_rejected():
+    limiter = ConcurrencyLimiter("test-timeout", max_concurrent=1, max_queue=1, queue_timeout=0.05)
+    assert limiter.acquire()
+    assert not limiter.acquire()
+    limiter.release()
+
+
+def test_busy_route_answers_429():
+    limiter = ConcurrencyLimiter("test-route", max_concurrent=1, max_queue=0, queue_timeout=1)
+    app = Flask(__name__)
+    inside, release = threading.Event(), threading.Event()
+
+    @app.route("/heavy")
+    @limit_concurrency(limiter)
+    def heavy():
+        inside.set()
+        release.wait(5)
+        return "done"
+
+    client = app.test_client()
+    first = []
+    thread = threading.Thread(target=lambda: first.append(client.get("/heavy").status_code))
+    thread.start()
+    inside.wait(5)
+    busy = client.get("/heavy")
+    release.set()
+    thread.join(5)
+    assert busy.status_code == 429
+    assert busy.headers["Retry-After"]
+    assert first == [200]
@@ -0,0 +1,77 @@
+import os
+import threading
+
+import pytest
+
+import data_store
+
+
+@pytest.fixture(scope="module")
+def snap():
+    if not os.path.isfile(data_store.workbook_path("NBA")):
+        pytest.skip("no NBA workbook")
+    return data_store.load_snapshot("NBA")
+
+
+def without(snap, sheet):
+    # The snapshot as an earlier workbook lacking one (optional) sheet
+    return {
+        **snap,
+        "sheets": {name: df for name, df in snap["sheets"].items() if name != sheet},
+        "checksums": {name: value for name, value in snap["checksums"].items() if name != sheet},
+        "compaction": {name: value for name, value in snap["compaction"].items() if name != sheet},
+        "derived": {},
+        "derived_depends": {},
+    }
+
+
+def test_derived_values_carry_over_unchanged_sheets(snap):
+    previous = without(snap, None)
+    data_store.derived(previous, "picks", lambda s: "built", depends=("All_Picks",))
+    reloaded = data_store.load_snapshot("NBA", previous=previous)
+    assert reloaded["derived"] == {"picks": "built"}
+
+
+def test_optional_sheet_appearing_drops_derived_values(snap):
+    assert "Spreads" in snap["sheets"]
+    previous = without(snap, "Spreads")
+    data_store.derived(previous, "picks", lambda s: "built", depends=("All_Picks",))
+    data_store.derived(previous, "all", lambda s: "built", depends=tuple(previous["sheets"]))
+    reloaded = data_store.load_snapshot("NBA", previous=previous)
+    assert "Spreads" in reloaded["sheets"]
+    assert reloaded["derived"] == {}
+
+
+def test_concurrent_derived_builds_run_once():
+    snap = {"sport": "NBA", "slate": None, "version": "single-flight", "derived": {}, "derived_depends": {}}
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def build(s):
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(data_store.derived(snap, "slow", build))) for _ in range(8)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+
+
+def test_failed_derived_build_is_retried():
+    snap = {"sport": "NBA", "slate": None, "version": "retry", "derived": {}, "derived_depends": {}}
+
+    def broken(s):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        data_store.derived(snap, "value", broken)
+    assert data_store.derived(snap, "value", lambda s: 42) == 42
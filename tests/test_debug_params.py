@@ -0,0 +1,35 @@
+import pytest
+
+import flask_app
+import profiling
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    return flask_app.app.test_client()
+
+
+@pytest.mark.parametrize("query", ["top=many", "top=0", "frames=x", "frames=1000"])
+def test_memory_report_options_are_checked(client, query):
+    response = client.get(f"/debug/memory?token=secret&tracemalloc=stop&{query}")
+    assert response.status_code == 400
+    assert "must be a whole number" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("query", ["limit=lots", "limit=0", "interval=fast&mode=sample", "sort=nope"])
+def test_profiler_options_are_checked(client, query):
+    response = client.get(f"/debug/profile?route=/slates&_profile_token=secret&{query}")
+    assert response.status_code == 400
+
+
+def test_profiler_runs_with_good_options(client):
+    response = client.get("/debug/profile?route=/slates&_profile_token=secret&limit=5&sort=tottime")
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).startswith("# GET /slates -> 200")
+
+
+def test_unparsable_since_is_rejected(client):
+    response = client.get("/props/changes?since=abc")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "since must be a version number"
@@ -0,0 +1,97 @@
+import asyncio
+import json
+from collections import deque
+
+import pytest
+
+import event_server
+import events
+import flask_app
+import prop_changes
+
+
+@pytest.fixture(autouse=True)
+def events_file(tmp_path, monkeypatch):
+    path = tmp_path / "events.jsonl"
+    monkeypatch.setattr(events, "EVENTS_FILE", str(path))
+    monkeypatch.setattr(events, "_recent", deque(maxlen=events.EVENTS_KEPT))
+    return path
+
+
+def parse(text):
+    # SSE text -> [(event, id, data)]
+    out = []
+    for block in text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":") and ": " in line)
+        if "event" in fields:
+            out.append((fields["event"], int(fields["id"]) if "id" in fields else None, json.loads(fields["data"])))
+    return out
+
+
+def test_stream_replays_after_last_event_id():
+    first, second, third = (events.publish("snapshot", {"payload": "props", "version": v}) for v in (1, 2, 3))
+    assert events.open_stream()
+    stream = events.stream({"props": 3}, first["id"])
+    sent = parse("".join(next(stream) for _ in range(4)))
+    stream.close()
+    assert sent == [
+        ("hello", None, {"props": 3}),
+        ("snapshot", second["id"], second["data"]),
+        ("snapshot", third["id"], third["data"]),
+    ]
+
+
+def test_event_server_replays_and_greets_with_versions():
+    first = events.publish("snapshot", {"payload": "props", "version": 1})
+    second = events.publish("snapshot", {"payload": "mlb-props", "version": 7})
+
+    async def fetch():
+        changed = asyncio.Condition()
+        events.load_new()
+        server = await asyncio.start_server(lambda r, w: event_server._handle(r, w, changed), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET /events?lastEventId={first['id']} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+        await writer.drain()
+        text = b""
+        while b"event: snapshot" not in text:
+            text += await asyncio.wait_for(reader.read(4096), 5)
+        writer.close()
+        server.close()
+        return text.decode()
+
+    text = asyncio.run(fetch())
+    assert text.startswith("HTTP/1.1 200 OK")
+    assert parse(text.split("\r\n\r\n", 1)[1]) == [
+        ("hello", None, {"props": 1, "mlb-props": 7}),
+        ("snapshot", second["id"], second["data"]),
+    ]
+
+
+def test_trim_keeps_each_payloads_newest_snapshot(monkeypatch):
+    monkeypatch.setattr(events, "EVENTS_KEPT", 3)
+    events.publish("snapshot", {"payload": "mlb-props", "version": 5})
+    for version in range(10):
+        events.publish("snapshot", {"payload": "props", "version": version})
+    entries = [json.loads(line) for line in events._read_lines()]
+    assert len(entries) < 10
+    assert [entry["id"] for entry in entries] == sorted(entry["id"] for entry in entries)
+    assert events.versions() == {"mlb-props": 5, "props": 9}
+
+
+def test_restart_on_unchanged_snapshot_publishes_nothing(events_file, monkeypatch):
+    monkeypatch.setattr(prop_changes, "_history", {})
+    snap = {"sport": "NBA", "version": "1700000000000000000-1"}
+    table = prop_changes.record_table(json.dumps([{"PropId": "a", "Line": 1.5}]), json.dumps)
+    assert flask_app.publish_snapshot(snap, "props", table)
+
+    # a new process: nothing in memory, the events file as it was left
+    monkeypatch.setattr(prop_changes, "_history", {})
+    assert not flask_app.publish_snapshot(snap, "props", table)
+    assert prop_changes.latest("props") == prop_changes.version_number(snap)
+    assert len(events._read_lines()) == 1
+
+    changed = {**snap, "version": "1700000000500000000-1"}
+    assert flask_app.publish_snapshot(changed, "props", table)
+    last = json.loads(events._read_lines()[-1])["data"]
+    assert last["previous"] == prop_changes.version_number(snap)
@@ -0,0 +1,50 @@
+import os
+
+import pandas as pd
+import pytest
+
+import data_store
+import facets
+import player_search
+
+
+@pytest.fixture(scope="module")
+def snap():
+    if not os.path.isfile(data_store.workbook_path("NBA")):
+        pytest.skip("no NBA workbook")
+    return data_store.load_snapshot("NBA")
+
+
+def test_listing_skips_blanks_and_counts_categoricals_alike():
+    values = pd.Series(["PTS", "AST", None, "PTS", " ", "nan"], dtype=object)
+    listing = facets._listing(facets.value_counts(values))
+    assert listing == [{"value": "AST", "count": 1}, {"value": "PTS", "count": 2}]
+    assert facets._listing(facets.value_counts(values.astype("category"))) == listing
+
+
+def test_facet_counts_cover_the_props_rows(snap):
+    result = facets.snapshot_facets(snap)
+    picks = snap["sheets"]["All_Picks"]
+    assert result["total"] == int(picks["Tag"].notna().sum())
+    for listing in result["facets"].values():
+        assert sum(entry["count"] for entry in listing) <= result["total"]
+
+
+def test_partial_and_misspelt_names_are_found():
+    index = player_search.PlayerIndex([
+        {"player": "LeBron James", "team": "LAL", "props": 12},
+        {"player": "James Harden", "team": "LAC", "props": 8},
+        {"player": "Jalen Brunson", "team": "NYK", "props": 10},
+    ])
+    assert index.search("lebron james")[0]["score"] == player_search.EXACT_SCORE
+    assert [p["player"] for p in index.search("james")] == ["James Harden", "LeBron James"]
+    assert index.search("brunsen")[0]["player"] == "Jalen Brunson"
+    assert index.search("  ") == []
+
+
+def test_index_has_every_pick_player(snap):
+    index = player_search.build_index(snap)
+    picks = snap["sheets"]["All_Picks"]
+    player = picks["Player"].dropna().iloc[0]
+    assert index.search(player)[0]["player"] == str(player).strip()
+    assert sum(p["props"] for p in index.players) == int(picks["Player"].notna().sum())
@@ -0,0 +1,34 @@
+import pytest
+
+import flask_app
+
+
+@pytest.fixture
+def client():
+    return flask_app.app.test_client()
+
+
+def test_unknown_weight_by_is_rejected(client):
+    response = client.post("/generate-lineups", json={"sports": ["NBA"], "weightBy": "vibes"})
+    assert response.status_code == 400
+    assert "weightBy must be one of consistency, cushion" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("max_cv", ["loose", [0.3], "nan"])
+def test_non_numeric_max_cv_is_rejected(client, max_cv):
+    response = client.post("/generate-lineups", json={"sports": ["NBA"], "maxCV": max_cv})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "maxCV must be a number"
+
+
+def test_missing_slate_is_not_found(client):
+    response = client.post("/generate-lineups", json={"sports": ["NBA"], "date": "1999-01-01"})
+    assert response.status_code == 404
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("min_games", ["abc", -1, 2.5, [3]])
+def test_bad_min_games_is_rejected(client, min_games):
+    response = client.post("/generate-lineups", json={"sports": ["NBA"], "minGames": min_games})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "minGames must be a whole number of at least 0"
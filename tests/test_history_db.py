@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+import data_store
+import history_db
+
+
+@pytest.fixture(scope="module")
+def database(tmp_path_factory):
+    if not os.path.isfile(data_store.workbook_path("NBA")):
+        pytest.skip("no NBA workbook")
+    path = str(tmp_path_factory.mktemp("history") / "history.db")
+    picks = history_db.ingest("NBA", path=path)
+    return path, picks
+
+
+@pytest.fixture
+def reader(database, monkeypatch):
+    monkeypatch.setattr(history_db, "HISTORY_DB", database[0])
+    return database
+
+
+def test_ingest_is_skipped_for_an_unchanged_workbook(reader):
+    path, picks = reader
+    assert picks > 0
+    assert history_db.ingest("NBA", path=path) == 0
+    [slate] = history_db.slates("NBA")
+    assert slate["picks"] == picks
+
+
+def test_picks_and_games_read_back(reader):
+    sheets = data_store.get_snapshot("NBA")["sheets"]
+    player = sheets["All_Picks"]["Player"].iloc[0]
+    found = history_db.find_picks("NBA", player=player)
+    assert len(found) == int((sheets["All_Picks"]["Player"] == player).sum())
+    assert {row["Player"] for row in found} == {player}
+
+    games = history_db.recent_games("NBA", player, log="Last10_GameLogs")
+    assert 0 < len(games) <= 10
+    dates = [row["Date"] for row in games]
+    assert dates == sorted(dates, reverse=True)
+
+
+def test_game_log_sheets_round_trip(reader):
+    sheets = data_store.get_snapshot("NBA")["sheets"]
+    stored = history_db.game_log_sheets("NBA")
+    assert set(stored) == set(history_db.GAME_LOGS["NBA"])
+    for log, df in stored.items():
+        assert len(df) <= len(sheets[log])
+        assert df["Date"].dtype == sheets[log]["Date"].dtype
+
+
+def test_missing_database_is_unavailable(monkeypatch, tmp_path):
+    monkeypatch.setattr(history_db, "HISTORY_DB", str(tmp_path / "none.db"))
+    with pytest.raises(history_db.HistoryUnavailable):
+        history_db.slates("NBA")
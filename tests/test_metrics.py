@@ -0,0 +1,68 @@
+import multiprocessing
+import os
+import re
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "_gauges", {})
+    monkeypatch.setattr(metrics, "_histograms", {})
+    monkeypatch.setattr(metrics, "_flushed", None)
+    return tmp_path
+
+
+def worker(requests):
+    # What a forked gunicorn worker does: start clean, count, flush
+    metrics.reset()
+    for _ in range(requests):
+        metrics.inc("test_requests_total", route="/props")
+        metrics.observe("test_seconds", 0.02, route="/props")
+    metrics.set_gauge("test_in_flight", 1, pool="heavy")
+    metrics.flush()
+
+
+def run_worker(requests):
+    process = multiprocessing.get_context("fork").Process(target=worker, args=(requests,))
+    process.start()
+    process.join(10)
+    assert process.exitcode == 0
+    return process.pid
+
+
+def value(text, name):
+    match = re.search(rf"^{name}(?:\{{[^}}]*\}})? (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def test_workers_are_summed(metrics_dir):
+    run_worker(3)
+    run_worker(4)
+    metrics.inc("test_requests_total", route="/props")
+    text = metrics.render_prometheus()
+    assert value(text, "test_requests_total") == 8
+    assert value(text, "test_seconds_count") == 7
+    assert value(text, "test_in_flight") == 2
+
+
+def test_retired_workers_keep_their_counts(metrics_dir):
+    first = run_worker(3)
+    run_worker(4)
+    metrics.retire(first)
+    assert not os.path.exists(metrics_dir / f"{first}.json")
+    text = metrics.render_prometheus()
+    assert value(text, "test_requests_total") == 7
+    assert value(text, "test_seconds_count") == 7
+    # a gone worker's gauges are dropped
+    assert value(text, "test_in_flight") == 1
+
+
+def test_clear_removes_earlier_runs(metrics_dir):
+    run_worker(2)
+    metrics.clear()
+    assert value(metrics.render_prometheus(), "test_requests_total") is None
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+import pick_archive
+
+
+def test_tag_direction():
+    tags = pd.Series(["SMASH", "Lean Under", "FADE", "GOOD OVER", None, "coin flip"], dtype=object)
+    assert list(pick_archive.tag_direction(tags)) == [1, -1, -1, 1, 0, 0]
+
+
+def test_grade_outcomes():
+    picks = pd.DataFrame({
+        "Player": ["A", "A", "B", "B", "C"],
+        "player_key": ["a", "a", "b", "b", "c"],
+        "game_day": ["2025-03-01"] * 5,
+        "Prop Type": ["Points", "Pts+Rebs", "Points", "Assists", "Points"],
+        "Prop Value": [20.5, 30, 10, 5, 12],
+        "Tag": ["SMASH", "SMASH", "FADE", None, "SMASH"],
+        "Player Type": [""] * 5,
+    })
+    logs = pd.DataFrame({
+        "player_key": ["a", "b", "a"],
+        "day": ["2025-03-01", "2025-03-01", "2025-03-01"],
+        "Points": [25.0, 10.0, 3.0],
+        "Rebounds": [5.0, 2.0, 1.0],
+        "Assists": [1.0, 9.0, 1.0],
+        "role": ["", "", ""],
+        # A later slate's copy of A's game wins
+        "slate": ["2025-03-01", "2025-03-01", "2025-03-02"],
+    })
+    graded = pick_archive.grade(picks, logs, "NBA")
+    assert list(graded["outcome"]) == ["miss", "miss", "push", "ungraded", "ungraded"]
+    assert list(graded["actual"][:4]) == [3.0, 4.0, 10.0, 9.0]
+    assert np.isnan(graded["actual"][4])
+
+
+def test_archived_slate_is_graded(tmp_path):
+    if not os.path.isfile(data_store.workbook_path("NBA")):
+        pytest.skip("no NBA workbook")
+    slate = pick_archive.archive_slate("NBA", root=str(tmp_path))
+    assert pick_archive.partitions(str(tmp_path), "picks", "NBA") == [slate]
+    graded = pick_archive.grade_all(root=str(tmp_path), sports=["NBA"], workers=1)
+    picks = data_store.load_snapshot("NBA")["sheets"]["All_Picks"]
+    assert len(graded) == len(picks)
+    assert set(graded["outcome"]) <= {"hit", "miss", "push", "ungraded"}
+    report = pick_archive.backtest_report(graded)
+    assert report["picks"] == len(picks)
+    assert set(report["by"]) == set(pick_archive.REPORT_DIMENSIONS)
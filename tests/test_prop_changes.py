@@ -0,0 +1,26 @@
+import json
+
+import prop_changes
+
+
+def table(records):
+    return prop_changes.record_table(json.dumps(records), json.dumps)
+
+
+def test_dumped_table_diffs_like_the_live_one(tmp_path):
+    old = table([{"PropId": "a", "Line": 1.5}, {"PropId": "b", "Line": 2.5}, {"PropId": "c", "Line": 3.5}])
+    new = table([{"PropId": "a", "Line": 1.5}, {"PropId": "b", "Line": 3.0}, {"PropId": "d", "Line": 4.5}])
+    path = tmp_path / "props.changes.jsonl"
+    path.write_bytes(prop_changes.dump_table(1000, old))
+
+    version, header = prop_changes.load_table(path, records=False)
+    assert version == 1000 and header["strings"] is None
+    added, modified, removed = prop_changes.compare((header["ids"], header["hashes"]), new)
+    assert list(new["ids"][added]) == ["d"]
+    assert list(new["ids"][modified]) == ["b"]
+    assert list(removed) == ["c"]
+
+    _, loaded = prop_changes.load_table(path)
+    body = json.loads(prop_changes.render(1000, None, loaded, None))
+    assert body["added"] == [{"PropId": "a", "Line": 1.5}, {"PropId": "b", "Line": 2.5}, {"PropId": "c", "Line": 3.5}]
+    assert body["reset"] is True
@@ -0,0 +1,95 @@
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+import rolling_stats
+from compact import EPOCH
+
+
+def day(year, month, date):
+    return (datetime.date(year, month, date) - EPOCH).days
+
+
+def games(players=6, per_player=12, first=None, seed=0):
+    # game_rows()-shaped frame: a few players' games on consecutive days
+    rng = np.random.default_rng(seed)
+    first = day(2025, 1, 2) if first is None else first
+    index = pd.MultiIndex.from_tuples(
+        [("", f"player {p}", first + g, 1) for p in range(players) for g in range(per_player)],
+        names=rolling_stats.KEYS,
+    )
+    values = rng.integers(0, 40, size=(len(index), 3)).astype(np.float64)
+    values[rng.random(values.shape) < 0.1] = np.nan
+    return pd.DataFrame(values, index=index, columns=["Points", "Rebounds", "Assists"])
+
+
+def table(rows):
+    engine = rolling_stats.RollingStats("NBA")
+    engine.update(rows)
+    return engine.table()
+
+
+def assert_tables_equal(left, right):
+    pd.testing.assert_frame_equal(left.sort_index(), right.sort_index(), check_exact=False, rtol=1e-9)
+
+
+def test_incremental_updates_match_a_full_recompute():
+    rows = games()
+    engine = rolling_stats.RollingStats("NBA")
+    days = rows.index.get_level_values("day")
+    for start in range(days.min(), days.max() + 1, 4):
+        engine.update(rows[(days >= start) & (days < start + 4)])
+    assert_tables_equal(engine.table(), table(rows))
+
+
+def test_revised_values_replace_the_old_ones():
+    rows = games()
+    revised = rows.copy()
+    revised.iloc[3, 0] = 99.0
+    revised.iloc[-1, int(rows.iloc[-1].notna().argmax())] = np.nan
+    engine = rolling_stats.RollingStats("NBA")
+    engine.update(rows)
+    assert engine.update(revised) == 2
+    assert_tables_equal(engine.table(), table(revised))
+
+
+def test_games_before_the_season_are_dropped():
+    last_season = games(first=day(2025, 3, 1))
+    this_season = games(per_player=3, first=day(2025, 10, 20), seed=1)
+    engine = rolling_stats.RollingStats("NBA")
+    engine.update(last_season)
+    engine.update(this_season)
+    assert engine.season == day(2025, 8, 1)
+    assert len(engine.rows) == len(this_season)
+    assert_tables_equal(engine.table(), table(this_season))
+    assert engine.table()["SeasonGames"].max() == 3
+
+
+def test_head_to_head_logs_are_left_out():
+    if not os.path.isfile(data_store.workbook_path("NBA")):
+        pytest.skip("no NBA workbook")
+    sheets = data_store.load_snapshot("NBA")["sheets"]
+    assert "Last10vsOpp_GameLogs" in sheets
+    everything = rolling_stats.RollingStats("NBA")
+    everything.observe(sheets)
+    own = rolling_stats.RollingStats("NBA")
+    own.observe({"Last10_GameLogs": sheets["Last10_GameLogs"]})
+    assert_tables_equal(everything.table(), own.table())
+    assert everything.table()["SeasonGames"].max() <= 10
+
+
+def test_engines_show_in_the_memory_report(monkeypatch):
+    import memory_report
+
+    engine = rolling_stats.RollingStats("NBA")
+    engine.update(games())
+    monkeypatch.setattr(rolling_stats, "_engines", {"NBA": engine})
+    caches = memory_report.process_caches()
+    assert caches["rolling_stats"]["NBA"]["game_rows"] == len(engine.rows)
+    assert caches["rolling_stats"]["NBA"]["season_start"] == "2024-08-01"
+    assert caches["rolling_stats"]["NBA"]["bytes"] > 0
+    assert {"top_picks", "prop_changes"} <= set(caches)
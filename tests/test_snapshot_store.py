@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+
+import data_store
+import flask_app
+import snapshot_store
+
+
+@pytest.fixture(scope="module")
+def built(tmp_path_factory):
+    if not all(os.path.isfile(data_store.workbook_path(sport)) for sport in data_store.WORKBOOKS):
+        pytest.skip("no workbooks")
+    root = str(tmp_path_factory.mktemp("snapshots"))
+    return root, snapshot_store.build_snapshot(root)
+
+
+@pytest.fixture
+def serving(built, monkeypatch):
+    root, version = built
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_DIR", root)
+    monkeypatch.setattr(snapshot_store, "_loaded", None)
+    return root, version
+
+
+def test_unchanged_rebuild_keeps_the_build(built):
+    root, version = built
+    assert snapshot_store.build_snapshot(root) == version
+    assert snapshot_store.read_pointer(root) == version
+    assert snapshot_store._builds(root) == [version]
+
+
+def test_build_has_bodies_versions_and_change_tables(built):
+    root, version = built
+    prebuilt = snapshot_store.PrebuiltSnapshot(root, version)
+    for name, (sport, build) in flask_app.PAYLOADS.items():
+        body, _ = prebuilt.open(name)
+        with body:
+            records = json.load(body)
+        with flask_app.app.app_context():
+            assert records == json.loads(flask_app.app.json.dumps(build(data_store.get_snapshot(sport))))
+        assert prebuilt.payload_version(name) is not None
+        assert list(prebuilt.change_table(name)["ids"]) == [record["PropId"] for record in records]
+
+
+def test_prebuilt_props_are_served_with_their_version(serving):
+    root, version = serving
+    prebuilt = snapshot_store.PrebuiltSnapshot(root, version)
+    client = flask_app.app.test_client()
+    response = client.get("/props")
+    assert response.status_code == 200
+    assert response.headers["X-Props-Version"] == str(prebuilt.payload_version("props"))
+    changes = client.get(f"/props/changes?since={prebuilt.payload_version('props')}").get_json()
+    assert changes["reset"] is False
+    assert changes["added"] == changes["modified"] == changes["removed"] == []
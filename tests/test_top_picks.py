@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+import data_store
+import flask_app
+import top_picks
+
+
+@pytest.fixture
+def client():
+    return flask_app.app.test_client()
+
+
+@pytest.mark.parametrize("name", ["per_sport", "per_tag"])
+@pytest.mark.parametrize("value", ["0", "-3", "two"])
+def test_group_cap_below_one_is_rejected(client, name, value):
+    response = client.get(f"/top-picks?{name}={value}")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == f"{name} must be a whole number of at least 1"
+
+
+@pytest.mark.parametrize("name", ["per_sport", "per_tag"])
+def test_group_cap_is_clamped(client, monkeypatch, name):
+    if not os.path.isfile(data_store.workbook_path("NBA")):
+        pytest.skip("no NBA workbook")
+    calls = []
+    select = top_picks.select
+
+    def spy(table, ranking, limit, per_sport, per_tag, tags):
+        calls.append({"per_sport": per_sport, "per_tag": per_tag})
+        return select(table, ranking, limit, per_sport, per_tag, tags)
+
+    monkeypatch.setattr(top_picks, "select", spy)
+    # a ranking no other test asks for, so the result isn't cached yet
+    response = client.get(f"/top-picks?sports=NBA&ranking=edge&{name}=1000000")
+    assert response.status_code == 200
+    assert calls and calls[-1][name] == top_picks.MAX_PER_GROUP
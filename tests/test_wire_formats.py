@@ -0,0 +1,114 @@
+import datetime
+import json
+import math
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import wire_formats
+
+
+def decode(columns, length):
+    # columnar "columns" back into one dict per record
+    records = [{} for _ in range(length)]
+    for name, column in columns.items():
+        if isinstance(column, dict) and "codes" in column:
+            values = [None if code is None else column["dictionary"][code] for code in column["codes"]]
+        elif isinstance(column, dict) and "offsets" in column:
+            items = decode(column["columns"], column["length"])
+            offsets = column["offsets"]
+            values = [items[offsets[i]:offsets[i + 1]] for i in range(length)]
+        else:
+            values = column
+        for record, value in zip(records, values):
+            record[name] = value
+    return records
+
+
+def normalized(value):
+    # Dates as the columnar encodings give them; floats compared loosely
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, list):
+        return [normalized(v) for v in value]
+    if isinstance(value, dict):
+        return {k: normalized(v) for k, v in value.items()}
+    if isinstance(value, float) and not math.isnan(value):
+        return pytest.approx(value)
+    return value
+
+
+def sample_table():
+    frame = pd.DataFrame({
+        "Player": pd.Categorical(["A", "B", None, "A"]),
+        "Tag": pd.Series(["SMASH", None, "LEAN", "SMASH"], dtype=object),
+        "Prop Value": [1.5, np.nan, 3.0, np.inf],
+        "LineStreak": pd.array([2, None, -1, 0], dtype="Int64"),
+        "IsGuruPick": [True, False, False, True],
+        "Mixed": pd.Series([1, "x", None, 2.5], dtype=object),
+        "Empty": pd.Series([None] * 4, dtype=object),
+    })
+    games = pd.DataFrame({
+        "Date": [datetime.date(2025, 6, 1), None, datetime.date(2025, 6, 3)],
+        "Team": pd.Categorical(["OKC", "IND", "OKC"]),
+        "Value": [9.0, np.nan, 11.0],
+    })
+    return frame, {"Last10Stats": (np.array([0, 2, 2, 3, 3], dtype=np.int32), games)}
+
+
+def test_columnar_decodes_to_rows():
+    frame, lists = sample_table()
+    rows = wire_formats.rows(frame, lists)
+    body = json.loads(wire_formats.encode("columnar", frame, lists))
+    assert body["length"] == len(rows)
+    assert decode(body["columns"], body["length"]) == [normalized(row) for row in rows]
+    assert rows[1]["Prop Value"] is None and rows[3]["Prop Value"] is None
+    assert rows[1]["LineStreak"] is None
+    assert [len(row["Last10Stats"]) for row in rows] == [2, 0, 1, 0]
+
+
+def test_msgpack_matches_columnar():
+    msgpack = pytest.importorskip("msgpack")
+    frame, lists = sample_table()
+    packed = msgpack.unpackb(wire_formats.encode("msgpack", frame, lists))
+    assert packed == json.loads(wire_formats.encode("columnar", frame, lists))
+
+
+def test_arrow_decodes_to_rows():
+    pa = pytest.importorskip("pyarrow")
+    frame, lists = sample_table()
+    table = pa.ipc.open_stream(wire_formats.encode("arrow", frame, lists, {"sport": "NBA"})).read_all()
+    assert table.schema.metadata == {b"sport": b'"NBA"'}
+    assert pa.types.is_dictionary(table.schema.field("Player").type)
+    rows = [normalized(row) for row in wire_formats.rows(frame, lists)]
+    # Arrow columns have one type, so the mixed one comes as strings
+    assert table.column("Mixed").to_pylist() == ["1", "x", None, "2.5"]
+    assert table.drop_columns(["Mixed"]).to_pylist() == [{k: v for k, v in row.items() if k != "Mixed"} for row in rows]
+
+
+def test_negotiate():
+    from werkzeug.datastructures import MIMEAccept
+
+    assert wire_formats.negotiate(None, MIMEAccept()) == "rows"
+    assert wire_formats.negotiate(None, MIMEAccept([("*/*", 1)])) == "rows"
+    assert wire_formats.negotiate(None, MIMEAccept([(wire_formats.ARROW, 1)])) == "arrow"
+    assert wire_formats.negotiate(None, MIMEAccept([("application/x-msgpack", 1)])) == "msgpack"
+    assert wire_formats.negotiate("columnar", MIMEAccept([(wire_formats.ARROW, 1)])) == "columnar"
+    assert wire_formats.negotiate("xml", MIMEAccept()) is None
+
+
+@pytest.mark.parametrize("path", ["/props", "/mlb-props"])
+def test_payload_rows_match_columnar(path):
+    # The served payloads, when this checkout has the workbooks
+    import data_store
+    import flask_app
+
+    sport = flask_app.PAYLOADS[path.strip("/")][0]
+    if not os.path.isfile(data_store.workbook_path(sport)):
+        pytest.skip(f"no {sport} workbook")
+    client = flask_app.app.test_client()
+    rows = flask_app.build_nba_props if sport == "NBA" else flask_app.build_mlb_props
+    records = rows(data_store.get_snapshot(sport))
+    assert client.get(path).get_json() == json.loads(flask_app.app.json.dumps(records))
+    body = client.get(path + "?format=columnar").get_json()
+    assert decode(body["columns"], body["length"]) == [normalized(record) for record in records]
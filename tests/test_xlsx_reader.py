@@ -0,0 +1,65 @@
+import datetime
+import os
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import data_store
+import xlsx_reader
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    # Shared strings, numbers, booleans, dates, blanks and a ragged row
+    path = tmp_path / "book.xlsx"
+    book = openpyxl.Workbook()
+    picks = book.active
+    picks.title = "All_Picks"
+    picks.append(["Player", "Prop Value", "Confidence", "Home", "GameDate", "Note"])
+    picks.append(["A. Player", 24.5, 7, True, datetime.datetime(2025, 3, 1), "lean"])
+    picks.append(["B. Player", 3, None, False, datetime.datetime(2025, 3, 2), None])
+    picks.append(["A. Player", 0.5, 8.25, None, None, "smash"])
+    picks.append(["C. Player"])
+    logs = book.create_sheet("Last10_GameLogs")
+    logs.append(["Player", "Date", "PTS"])
+    for day in range(1, 21):
+        logs.append([f"Player {day % 4}", datetime.datetime(2025, 2, day), day * 1.5])
+    book.save(path)
+    return str(path)
+
+
+def test_sheets_match_read_excel(workbook):
+    frames, checksums = xlsx_reader.read_sheets(workbook, ["All_Picks", "Last10_GameLogs"], workers=1)
+    for sheet, frame in frames.items():
+        pd.testing.assert_frame_equal(frame, pd.read_excel(workbook, sheet_name=sheet), check_exact=True)
+    assert set(checksums) == {"All_Picks", "Last10_GameLogs"}
+
+
+def test_parallel_parse_matches_serial(workbook, monkeypatch):
+    monkeypatch.setattr(xlsx_reader, "PARALLEL_MIN_BYTES", 0)
+    serial, _ = xlsx_reader.read_sheets(workbook, ["All_Picks", "Last10_GameLogs"], workers=1)
+    parallel, _ = xlsx_reader.read_sheets(workbook, ["All_Picks", "Last10_GameLogs"], workers=2)
+    for sheet in serial:
+        pd.testing.assert_frame_equal(parallel[sheet], serial[sheet], check_exact=True)
+
+
+def test_known_checksums_skip_unchanged_sheets(workbook):
+    _, checksums = xlsx_reader.read_sheets(workbook, ["All_Picks", "Last10_GameLogs"], workers=1)
+    frames, again = xlsx_reader.read_sheets(
+        workbook, ["All_Picks", "Last10_GameLogs", "Spreads"], workers=1,
+        known={"All_Picks": checksums["All_Picks"]}, optional=["Spreads"],
+    )
+    assert list(frames) == ["Last10_GameLogs"]
+    assert again == checksums
+
+
+@pytest.mark.parametrize("sport", ["NBA", "MLB"])
+def test_workbook_sheets_match_read_excel(sport):
+    path = data_store.workbook_path(sport)
+    if not os.path.isfile(path):
+        pytest.skip(f"no {sport} workbook")
+    book = data_store.WORKBOOKS[sport]
+    frames, _ = xlsx_reader.read_sheets(path, book["sheets"] + book.get("optional", []), workers=1, optional=book.get("optional", []))
+    for sheet, frame in frames.items():
+        pd.testing.assert_frame_equal(frame, pd.read_excel(path, sheet_name=sheet), check_exact=True)
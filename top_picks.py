@@ -0,0 +1,120 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from pick_archive import tag_direction
+
+# /top-picks: the best picks across sports by one ranking, picked with a
+# partial selection (argpartition) over a table of precomputed scores
+# rather than a full sort. Every ranking is read in the pick's direction:
+#   confidence       Confidence (0-10, as in the props payloads)
+#   win_probability  WinProbability
+#   hit_rate         share of the last 10 games that cleared the line the
+#                    way the tag bets
+#   edge             Final Projection vs the line, as a share of the line,
+#                    in the tag's direction
+# Picks whose tag bets on neither side (COIN TOSS, INSUFFICIENT...) are
+# never ranked.
+RANKINGS = ("confidence", "win_probability", "hit_rate", "edge")
+DEFAULT_LIMIT = 25
+MAX_LIMIT = 200
+# per_sport/per_tag caps above this are clamped to it; no group can fill
+# more than a whole response anyway
+MAX_PER_GROUP = MAX_LIMIT
+# Distinct query results kept (per set of snapshot versions)
+MAX_CACHED = 64
+
+_results = OrderedDict()
+_results_lock = threading.Lock()
+
+
+def score_table(table):
+    # Adds Direction and one Score:<ranking> column per ranking to a pick
+    # table (Sport, Player, Team, Opponent, Prop Type, Prop Value, Tag,
+    # Confidence, WinProbability, Final Projection, Projection, Last10HitRate)
+    direction = tag_direction(table["Tag"])
+    line = pd.to_numeric(table["Prop Value"], errors="coerce")
+    rate = table["Last10HitRate"].to_numpy(np.float64)
+    edge = (table["Final Projection"] - line) / line.where(line > 0)
+    scores = {
+        "confidence": table["Confidence"].to_numpy(np.float64),
+        "win_probability": table["WinProbability"].to_numpy(np.float64),
+        "hit_rate": np.where(direction < 0, 1 - rate, rate),
+        "edge": direction * edge.to_numpy(np.float64),
+    }
+    table = table.assign(Direction=np.select([direction > 0, direction < 0], ["OVER", "UNDER"], ""))
+    for ranking, values in scores.items():
+        table[f"Score:{ranking}"] = np.where(direction != 0, values, np.nan)
+    return table
+
+
+def top_k(scores, k, candidates=None):
+    # Positions of the k best non-NaN scores, best first; only the k
+    # selected are sorted
+    positions = np.flatnonzero(~np.isnan(scores)) if candidates is None else candidates[~np.isnan(scores[candidates])]
+    if k < len(positions):
+        positions = positions[np.argpartition(-scores[positions], k - 1)[:k]]
+    return positions[np.argsort(-scores[positions], kind="stable")]
+
+
+def _per_group(scores, groups, k, candidates):
+    # The best k of each group among candidates
+    codes = pd.factorize(groups)[0][candidates]
+    return np.concatenate([top_k(scores, k, candidates[codes == code]) for code in np.unique(codes)] or [candidates[:0]])
+
+
+def select(table, ranking, limit=DEFAULT_LIMIT, per_sport=None, per_tag=None, tags=None):
+    # Rows of a score_table() frame, best first
+    scores = table[f"Score:{ranking}"].to_numpy(np.float64)
+    keep = ~np.isnan(scores)
+    if tags:
+        keep &= table["Tag"].isin(tags).to_numpy()
+    candidates = np.flatnonzero(keep)
+    if per_tag:
+        candidates = _per_group(scores, table["Tag"].to_numpy(), per_tag, candidates)
+    if per_sport:
+        candidates = _per_group(scores, table["Sport"].to_numpy(), per_sport, candidates)
+    return table.iloc[top_k(scores, limit, np.sort(candidates))]
+
+
+def records(rows, ranking):
+    # The fields TopPicksPanel reads, plus what the rankings use
+    out = pd.DataFrame({
+        "Rank": np.arange(1, len(rows) + 1),
+        "Sport": rows["Sport"].to_numpy(),
+        "Player": rows["Player"].to_numpy(),
+        "Team": rows["Team"].to_numpy(),
+        "Opponent": rows["Opponent"].to_numpy(),
+        "Prop Type": rows["Prop Type"].to_numpy(),
+        "Prop Value": rows["Prop Value"].to_numpy(),
+        "Tag": rows["Tag"].to_numpy(),
+        "Direction": rows["Direction"].to_numpy(),
+        "Confidence Score": rows["Confidence"].to_numpy(),
+        "WinProbability": rows["WinProbability"].to_numpy(),
+        "Last10HitRate": rows["Last10HitRate"].to_numpy(),
+        "Final Projection": rows["Final Projection"].round(2).to_numpy(),
+        "Weighted Projection": rows["Projection"].fillna(rows["Final Projection"]).round(2).to_numpy(),
+        "Edge": rows["Score:edge"].round(4).to_numpy(),
+        "Score": rows[f"Score:{ranking}"].round(4).to_numpy(),
+    })
+    return out.astype(object).replace({np.nan: None}).to_dict(orient="records")
+
+
+def cached_results():
+    with _results_lock:
+        return list(_results.values())
+
+
+def cached(key, build):
+    # LRU of rendered results; key carries the snapshot versions, so a
+    # reload never serves a stale ranking
+    with _results_lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key]
+    value = build()
+    with _results_lock:
+        _results[key] = value
+        while len(_results) > MAX_CACHED:
+            _results.popitem(last=False)
+    return value
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from hit_rates import pick_games
+
+# How steady a prop's stat has been, over the same game-log rows as
+# Last10Stats, for weighing lineup legs:
+#   StatStd / StatCV          spread of the stat, and spread / |mean|
+#   StatIQR                   p75 - p25
+#   StatFloor / StatCeiling   p10 / p90 of the stat
+#   StatGames                 games with a value
+FIELDS = ["StatStd", "StatCV", "StatIQR", "StatFloor", "StatCeiling", "StatGames"]
+FLOOR_QUANTILE = 0.1
+CEILING_QUANTILE = 0.9
+
+
+def volatility(picks, logs, sport):
+    # picks and logs as for hit_rates.line_stats; returns FIELDS aligned
+    # with picks, NaN where there are no games to measure
+    picks = picks.reset_index(drop=True).assign(pick=np.arange(len(picks)))
+    out = pd.DataFrame(np.nan, index=picks.index, columns=FIELDS)
+    pairs = pick_games(picks, logs, sport, None)
+    if pairs is None:
+        return out
+
+    grouped = pairs["value"].groupby(pairs["pick"])
+    mean = grouped.mean()
+    quantiles = grouped.quantile([FLOOR_QUANTILE, 0.25, 0.75, CEILING_QUANTILE]).unstack()
+    out["StatStd"] = grouped.std()
+    out["StatCV"] = out["StatStd"] / mean.abs().where(mean != 0)
+    out["StatIQR"] = quantiles[0.75] - quantiles[0.25]
+    out["StatFloor"] = quantiles[FLOOR_QUANTILE]
+    out["StatCeiling"] = quantiles[CEILING_QUANTILE]
+    out["StatGames"] = grouped.count()
+    out["StatGames"] = out["StatGames"].fillna(0)
+    return out.round(3)
@@ -0,0 +1,168 @@
+import json
+import numpy as np
+import pandas as pd
+
+# Encodings of the list endpoints' tables. Row-per-record JSON (rows) is
+# the default; it repeats every key and every team/tag string in each
+# record, so there are also:
+#   columnar  JSON with one array per field; strings are dictionary-encoded
+#             as {"dictionary": [...], "codes": [...]} (null code = missing)
+#   msgpack   the same layout as MessagePack
+#   arrow     an Arrow IPC stream, strings as dictionary arrays; a column
+#             mixing strings and numbers is sent as strings
+# A table is a frame of scalar columns plus list fields (Last10Stats...),
+# each an offsets array (rows offsets[i]:offsets[i + 1] belong to record i)
+# and a child frame; columnar/msgpack give those as {"offsets", "length",
+# "columns"}, Arrow as list<struct> columns.
+ARROW = "application/vnd.apache.arrow.stream"
+MSGPACK = "application/msgpack"
+FORMATS = ("rows", "columnar", "msgpack", "arrow")
+# Accept media types, best first for an Accept: */* client
+MEDIA_TYPES = {
+    "application/json": "rows",
+    ARROW: "arrow",
+    MSGPACK: "msgpack",
+    "application/x-msgpack": "msgpack",
+}
+MIMETYPES = {"columnar": "application/json", "msgpack": MSGPACK, "arrow": ARROW}
+
+
+def negotiate(format_arg, accept):
+    # ?format= wins over the Accept header (werkzeug MIMEAccept); None when
+    # ?format= names no format
+    if format_arg:
+        return format_arg if format_arg in FORMATS else None
+    return MEDIA_TYPES[accept.best_match(list(MEDIA_TYPES), default="application/json")]
+
+
+def _encoding(values, mixed=False):
+    # (kind, data, missing) for one column; kind is dictionary (data is
+    # (categories, codes)), bool, int, float, null or, when mixed is allowed,
+    # mixed (an object array of whatever scalars the column holds).
+    # Otherwise mixed columns are dictionary-encoded as strings, and dates
+    # always are, as YYYY-MM-DD.
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        values = values.cat.remove_unused_categories()
+        codes = values.cat.codes.to_numpy()
+        return "dictionary", (values.cat.categories, codes), codes < 0
+    if dtype == object:
+        inferred = pd.api.types.infer_dtype(values, skipna=True)
+        if inferred == "empty":
+            return "null", None, np.ones(len(values), dtype=bool)
+        if inferred == "boolean":
+            values = values.astype("boolean")
+        elif inferred in ("integer", "floating", "mixed-integer-float", "decimal"):
+            values = pd.to_numeric(values, errors="coerce")
+        elif mixed and inferred.startswith("mixed"):
+            data = values.to_numpy(object)
+            return "mixed", data, values.isna().to_numpy()
+        else:
+            if inferred != "string":
+                values = values.where(values.isna(), values.astype(str))
+            codes, categories = pd.factorize(values)
+            return "dictionary", (categories, codes), codes < 0
+        dtype = values.dtype
+    missing = values.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool", values.to_numpy(bool, na_value=False), missing
+    if pd.api.types.is_integer_dtype(dtype):
+        return "int", values.to_numpy(np.int64, na_value=0), missing
+    numbers = values.to_numpy(np.float64, na_value=np.nan)
+    return "float", numbers, ~np.isfinite(numbers)
+
+
+def _values(data, missing):
+    # Python list with None where missing
+    if not missing.any():
+        return data.tolist()
+    out = data.astype(object)
+    out[missing] = None
+    return out.tolist()
+
+
+def rows(frame, lists=None):
+    # The row-per-record layout: one dict per record, None where missing
+    # (infinities included, as in the other encodings)
+    floats = frame.select_dtypes("floating").columns
+    if len(floats):
+        frame = frame.assign(**{name: frame[name].where(np.isfinite(frame[name])) for name in floats})
+    records = frame.astype(object).where(frame.notna(), None).to_dict(orient="records")
+    for name, (offsets, child) in (lists or {}).items():
+        items = rows(child)
+        for record, start, end in zip(records, offsets[:-1], offsets[1:]):
+            record[name] = items[start:end]
+    return records
+
+
+def _columns(frame):
+    out = {}
+    for name in frame.columns:
+        kind, data, missing = _encoding(frame[name], mixed=True)
+        if kind == "dictionary":
+            categories, codes = data
+            out[name] = {"dictionary": pd.Index(categories).tolist(), "codes": _values(codes, missing)}
+        elif kind == "null":
+            out[name] = [None] * len(frame)
+        else:
+            out[name] = _values(data, missing)
+    return out
+
+
+def columnar(frame, lists=None, meta=None):
+    # The columnar layout as a dict of Python lists
+    columns = _columns(frame)
+    for name, (offsets, child) in (lists or {}).items():
+        columns[name] = {"offsets": np.asarray(offsets).tolist(), "length": len(child), "columns": _columns(child)}
+    return {**(meta or {}), "format": "columnar", "length": len(frame), "columns": columns}
+
+
+def columnar_json(frame, lists=None, meta=None):
+    return json.dumps(columnar(frame, lists, meta), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def msgpack_body(frame, lists=None, meta=None):
+    import msgpack
+
+    return msgpack.packb(columnar(frame, lists, meta), use_bin_type=True)
+
+
+def _arrow_array(values):
+    import pyarrow as pa
+
+    kind, data, missing = _encoding(values)
+    if kind == "dictionary":
+        categories, codes = data
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, type=pa.int32(), mask=missing),
+            pa.array(np.asarray(categories, dtype=object)),
+        )
+    if kind == "null":
+        return pa.nulls(len(values))
+    types = {"bool": pa.bool_(), "int": pa.int64(), "float": pa.float64()}
+    return pa.array(data, type=types[kind], mask=missing)
+
+
+def arrow_stream(frame, lists=None, meta=None):
+    # One record batch; meta goes in the schema metadata
+    import pyarrow as pa
+
+    arrays = [_arrow_array(frame[name]) for name in frame.columns]
+    names = [str(name) for name in frame.columns]
+    for name, (offsets, child) in (lists or {}).items():
+        items = pa.StructArray.from_arrays([_arrow_array(child[c]) for c in child.columns], names=[str(c) for c in child.columns])
+        arrays.append(pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), items))
+        names.append(name)
+    batch = pa.RecordBatch.from_arrays(arrays, names=names)
+    schema = batch.schema.with_metadata({key: json.dumps(value) for key, value in (meta or {}).items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch.replace_schema_metadata(schema.metadata))
+    return sink.getvalue().to_pybytes()
+
+
+ENCODERS = {"columnar": columnar_json, "msgpack": msgpack_body, "arrow": arrow_stream}
+
+
+def encode(fmt, frame, lists=None, meta=None):
+    return ENCODERS[fmt](frame, lists, meta)
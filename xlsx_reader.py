@@ -0,0 +1,430 @@
+import logging
+import multiprocessing
+import os
+import posixpath
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from xml.etree.ElementTree import fromstring, iterparse
+from xml.parsers import expat
+import numpy as np
+import pandas as pd
+from pandas._libs import lib, ops as libops, parsers as libparsers
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+logger = logging.getLogger(__name__)
+
+# Streaming reader for the analysis workbooks. Sheet XML is fed from the zip
+# through expat and each cell goes straight into a row list, then into NumPy
+# column arrays, without building an openpyxl cell object per value. The
+# result matches pd.read_excel(path, sheet_name=...) exactly; run
+#   python xlsx_reader.py --validate output/*.xlsx
+# after changing the workbook writer.
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+DOC_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# expat reports namespaced names as "<uri> <local name>"
+ROW = f"{MAIN_NS} row"
+CELL = f"{MAIN_NS} c"
+VALUE = f"{MAIN_NS} v"
+TEXT = f"{MAIN_NS} t"
+PHONETIC = f"{MAIN_NS} rPh"
+
+# pandas' default na_values for read_excel
+NA_STRINGS = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+])
+
+# read_excel also treats a float NaN as missing
+NA_VALUES = set(NA_STRINGS) | {np.nan}
+
+_column_cache = {}
+
+READ_CHUNK = 1 << 20
+
+# Processes used to parse a workbook's sheets (default: one per CPU); 1
+# parses them in-process
+PARSE_WORKERS = int(os.environ.get("XLSX_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+
+# Below this much sheet XML the pool's start-up costs more than it saves
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+
+
+def _column_index(ref):
+    letters = ref.rstrip("0123456789")
+    index = _column_cache.get(letters)
+    if index is None:
+        index = 0
+        for ch in letters:
+            index = index * 26 + ord(ch) - 64
+        index -= 1
+        _column_cache[letters] = index
+    return index
+
+
+def _tag(ns, name):
+    return "{%s}%s" % (ns, name)
+
+
+class _SheetParser:
+    # expat callbacks for one worksheet. Only the text of <v> and of <t>
+    # (inline strings, outside phonetic hints) is collected.
+    def __init__(self, shared_strings, date_styles, epoch):
+        self.shared_strings = shared_strings
+        self.date_styles = date_styles
+        self.epoch = epoch
+        self.rows = []
+        self.width = 0
+        self.last_data_row = 0
+        self.values = None
+        self.number = 0
+        self.column = -1
+        self.text = []
+        self.capture = False
+        self.phonetic = False
+        self.kind = self.style = None
+
+    def start(self, name, attrs):
+        if name == CELL:
+            ref = attrs.get("r")
+            self.column = _column_index(ref) if ref else self.column + 1
+            self.kind = attrs.get("t")
+            self.style = attrs.get("s")
+            self.text.clear()
+        elif name == VALUE or (name == TEXT and not self.phonetic):
+            self.capture = True
+        elif name == ROW:
+            number = attrs.get("r")
+            self.number = int(number) if number else len(self.rows) + 1
+            self.values = []
+            self.column = -1
+        elif name == PHONETIC:
+            self.phonetic = True
+
+    def chars(self, data):
+        if self.capture:
+            self.text.append(data)
+
+    def end(self, name):
+        if name == CELL:
+            values = self.values
+            if self.column > len(values):
+                values.extend([""] * (self.column - len(values)))
+            values.append(self._value())
+        elif name == VALUE or name == TEXT:
+            self.capture = False
+        elif name == ROW:
+            self._end_row()
+        elif name == PHONETIC:
+            self.phonetic = False
+
+    def _value(self):
+        # Same conversion openpyxl's reader followed by pandas' _convert_cell
+        # applies: integral numbers become int, errors NaN, blanks ""
+        kind = self.kind
+        raw = "".join(self.text)
+        if kind == "inlineStr":
+            return raw
+        if not raw:
+            return ""
+        if kind is None or kind == "n":
+            is_float = "." in raw or "E" in raw or "e" in raw
+            if self.style in self.date_styles:
+                return _date_value(float(raw) if is_float else int(raw), self.epoch)
+            if is_float:
+                value = float(raw)
+                return int(value) if value.is_integer() else value
+            return int(raw)
+        if kind == "s":
+            return self.shared_strings[int(raw)]
+        if kind == "str":
+            return raw
+        if kind == "b":
+            return bool(int(raw))
+        if kind == "e":
+            return np.nan
+        if kind == "d":
+            return from_ISO8601(raw)
+        return raw
+
+    def _end_row(self):
+        # Blank rows between data rows are kept, trailing empty cells and
+        # rows are dropped, and rows are padded to the widest one
+        rows = self.rows
+        while len(rows) < self.number - 1:
+            rows.append([])
+        values = self.values
+        while values and values[-1] == "":
+            values.pop()
+        if values:
+            self.last_data_row = self.number
+            self.width = max(self.width, len(values))
+        rows.append(values)
+
+    def result(self):
+        rows = self.rows
+        del rows[self.last_data_row:]
+        for values in rows:
+            if len(values) < self.width:
+                values.extend([""] * (self.width - len(values)))
+        return rows
+
+
+def _date_value(value, epoch):
+    try:
+        return from_excel(value, epoch)
+    except (OverflowError, ValueError):
+        return np.nan
+
+
+def parse_sheet(source, shared_strings, date_styles, epoch):
+    # Sheet XML (bytes or a file object) -> DataFrame with the same columns,
+    # dtypes and values pd.read_excel(sheet_name=...) produces
+    handler = _SheetParser(shared_strings, date_styles, epoch)
+    parser = expat.ParserCreate(namespace_separator=" ")
+    parser.buffer_text = True
+    parser.StartElementHandler = handler.start
+    parser.EndElementHandler = handler.end
+    parser.CharacterDataHandler = handler.chars
+    if isinstance(source, bytes):
+        parser.Parse(source, True)
+    else:
+        while True:
+            chunk = source.read(READ_CHUNK)
+            parser.Parse(chunk, not chunk)
+            if not chunk:
+                break
+    return _frame(handler.result())
+
+
+class Workbook:
+    # Opens the zip once and resolves sheet paths, shared strings and date
+    # styles up front; parse() then streams one sheet at a time.
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path)
+        self.sheet_paths = self._sheet_paths()
+        self.shared_strings = self._shared_strings()
+        self.date_styles = self._styles()
+        # A sheet's cell values also depend on the shared strings and styles
+        self.shared_crc = "-".join(
+            f"{self.zip.getinfo(name).CRC:08x}" if name in self.zip.NameToInfo else "0"
+            for name in ("xl/sharedStrings.xml", "xl/styles.xml")
+        )
+
+    def close(self):
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_xml(self, name):
+        return fromstring(self.zip.read(name))
+
+    def _sheet_paths(self):
+        workbook = self._read_xml("xl/workbook.xml")
+        pr = workbook.find(_tag(MAIN_NS, "workbookPr"))
+        self.epoch = CALENDAR_WINDOWS_1900
+        if pr is not None and pr.get("date1904", "0").lower() in ("1", "true"):
+            self.epoch = CALENDAR_MAC_1904
+        targets = {}
+        for rel in self._read_xml("xl/_rels/workbook.xml.rels").iter(_tag(PKG_REL_NS, "Relationship")):
+            target = rel.get("Target")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join("xl", target))
+            targets[rel.get("Id")] = target
+        return {
+            sheet.get("name"): targets[sheet.get(_tag(DOC_REL_NS, "id"))]
+            for sheet in workbook.iter(_tag(MAIN_NS, "sheet"))
+        }
+
+    def _shared_strings(self):
+        # Plain <t> plus the <t> of each rich-text run; phonetic hints skipped
+        if "xl/sharedStrings.xml" not in self.zip.namelist():
+            return []
+        si_tag, t_tag, r_tag = _tag(MAIN_NS, "si"), _tag(MAIN_NS, "t"), _tag(MAIN_NS, "r")
+        strings = []
+        with self.zip.open("xl/sharedStrings.xml") as f:
+            for _, si in iterparse(f):
+                if si.tag != si_tag:
+                    continue
+                parts = []
+                for child in si:
+                    if child.tag == r_tag:
+                        child = child.find(t_tag)
+                    if child is not None and child.tag == t_tag:
+                        parts.append(child.text or "")
+                strings.append("".join(parts))
+                si.clear()
+        return strings
+
+    def _styles(self):
+        if "xl/styles.xml" not in self.zip.namelist():
+            return frozenset()
+        styles = self._read_xml("xl/styles.xml")
+        formats = dict(BUILTIN_FORMATS)
+        numfmts = styles.find(_tag(MAIN_NS, "numFmts"))
+        if numfmts is not None:
+            for fmt in numfmts.iter(_tag(MAIN_NS, "numFmt")):
+                formats[int(fmt.get("numFmtId"))] = fmt.get("formatCode")
+        # Style ids are kept as the attribute strings so cells can be looked
+        # up without converting them. Like openpyxl's read-only reader (which
+        # read_excel uses), duration formats are read as plain dates.
+        dates = set()
+        xfs = styles.find(_tag(MAIN_NS, "cellXfs"))
+        for i, xf in enumerate(xfs.iter(_tag(MAIN_NS, "xf")) if xfs is not None else ()):
+            code = formats.get(int(xf.get("numFmtId", 0)))
+            if code and is_date_format(code):
+                dates.add(str(i))
+        return frozenset(dates)
+
+    def parse(self, sheet):
+        with self.zip.open(self.sheet_paths[sheet]) as f:
+            return parse_sheet(f, self.shared_strings, self.date_styles, self.epoch)
+
+    def checksum(self, sheet):
+        # CRC32 and size of the sheet's XML as recorded in the zip directory,
+        # so unchanged sheets are detected without decompressing them
+        info = self.zip.getinfo(self.sheet_paths[sheet])
+        return f"{info.CRC:08x}-{info.file_size}-{self.shared_crc}"
+
+    def xml_size(self, sheet):
+        return self.zip.getinfo(self.sheet_paths[sheet]).file_size
+
+    def parse_parallel(self, sheets, workers):
+        # The zip is only read here; workers get each sheet's XML plus the
+        # shared strings and styles. Largest sheets are submitted first.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context()) as pool:
+            futures = {
+                sheet: pool.submit(
+                    parse_sheet, self.zip.read(self.sheet_paths[sheet]),
+                    self.shared_strings, self.date_styles, self.epoch,
+                )
+                for sheet in sorted(sheets, key=self.xml_size, reverse=True)
+            }
+            return {sheet: futures[sheet].result() for sheet in sheets}
+
+
+# =========================
+# 🧮 COLUMN TYPE INFERENCE
+# =========================
+def _column_names(header):
+    # Same naming as pandas: blank headers become "Unnamed: i" and repeats
+    # get .1, .2, ... suffixes
+    names = []
+    counts = {}
+    for i, name in enumerate(header):
+        if name == "":
+            name = f"Unnamed: {i}"
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        counts[name] = count + 1
+        names.append(name)
+    return names
+
+
+def _object_array(values):
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    return arr
+
+
+def _column(values):
+    # The same steps TextParser._infer_types applies to each column: numeric
+    # conversion (numeric strings included), else NA strings -> NaN, then
+    # bool conversion. Datetime columns are inferred by the DataFrame
+    # constructor, as with read_excel.
+    arr = _object_array(values)
+    try:
+        result, _ = lib.maybe_convert_numeric(arr, NA_VALUES, False)
+    except (ValueError, TypeError):
+        libparsers.sanitize_objects(arr, NA_VALUES)
+        result = arr
+    if result.dtype == np.object_:
+        result, _ = libops.maybe_convert_bool(arr, true_values=None, false_values=None)
+    return result
+
+
+def _frame(rows):
+    if not rows:
+        return pd.DataFrame()
+    names = _column_names(rows[0])
+    body = rows[1:]
+    columns = {}
+    for i, name in enumerate(names):
+        columns[name] = _column([row[i] for row in body])
+    return pd.DataFrame(columns, columns=pd.Index(names, dtype=object))
+
+
+# =========================
+# 🧵 PARALLEL SHEET PARSING
+# =========================
+def _mp_context():
+    # Never plain fork: the gunicorn master that loads workbooks has running
+    # threads. forkserver children start from a process that has already
+    # imported pandas, so each load only pays for the fork.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["xlsx_reader"])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def read_sheets(path, sheets, workers=None, known=None, optional=()):
+    # Every sheet is read from a single open of the workbook. With more than
+    # one worker the sheets are parsed in a process pool, so a cold load is
+    # bounded by the largest sheet rather than the sum of all of them.
+    # known maps sheet -> checksum for frames the caller already holds; those
+    # sheets are skipped while their checksum still matches.
+    # Optional sheets the workbook doesn't have are skipped.
+    # Returns (frames, checksums).
+    known = known or {}
+    with Workbook(path) as book:
+        sheets = [sheet for sheet in sheets if sheet in book.sheet_paths or sheet not in optional]
+        checksums = {sheet: book.checksum(sheet) for sheet in sheets}
+        todo = [sheet for sheet in sheets if known.get(sheet) != checksums[sheet]]
+        workers = min(PARSE_WORKERS if workers is None else workers, len(todo))
+        if workers > 1 and sum(map(book.xml_size, todo)) >= PARALLEL_MIN_BYTES:
+            try:
+                return book.parse_parallel(todo, workers), checksums
+            except (OSError, BrokenProcessPool) as e:
+                logger.warning("⚠️ Parallel parse of %s failed (%s), parsing sheets serially", path, e)
+        return {sheet: book.parse(sheet) for sheet in todo}, checksums
+
+
+# =========================
+# ✅ VALIDATION
+# =========================
+def validate(path, sheets=None):
+    # Compares every sheet against pd.read_excel and prints both timings
+    with Workbook(path) as book:
+        names = sheets or list(book.sheet_paths)
+        for sheet in names:
+            start = time.perf_counter()
+            fast = book.parse(sheet)
+            fast_s = time.perf_counter() - start
+            start = time.perf_counter()
+            expected = pd.read_excel(path, sheet_name=sheet)
+            slow_s = time.perf_counter() - start
+            pd.testing.assert_frame_equal(fast, expected, check_exact=True)
+            print(f"✅ {path} [{sheet}] {fast.shape}: {fast_s:.2f}s vs read_excel {slow_s:.2f}s")
+
+
+if __name__ == "__main__":
+    # python xlsx_reader.py --validate output/NBA_PropAnalysis_Output.xlsx [...]
+    args = [a for a in sys.argv[1:] if a != "--validate"]
+    for workbook_path in args:
+        validate(workbook_path)